@@ -0,0 +1,102 @@
+"""Throughput of the streaming lxml main-content extractor against the
+previous BeautifulSoup(html.parser) path used by WebResearchTool.
+
+Usage (from pitch-main/):
+    python benchmarks/html_extraction.py [--corpus DIR] [--pages 200] [--repeat 3]
+
+--corpus is a directory of saved pages (*.html / *.htm, searched
+recursively). Without it, a synthetic corpus of article-like pages with
+navigation, scripts and long bodies is generated. Both paths keep the same
+number of characters (WEB_CONTENT_CHARS).
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from pitch.tools.html_extract import WEB_CONTENT_CHARS, extract_main_content
+
+WORDS = "startup market revenue growth customers platform funding team product investors scale churn pricing".split()
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def synthetic_page(rng: random.Random) -> str:
+    nav = "".join(f'<li><a href="/s{i}">Section {i}</a></li>' for i in range(40))
+    body = "".join(
+        f"<p>{' '.join(sentence(rng, rng.randint(8, 25)) for _ in range(rng.randint(2, 6)))}</p>"
+        + (f"<figure><img src='/i{i}.png'><figcaption>{sentence(rng, 5)}</figcaption></figure>" if i % 7 == 0 else "")
+        for i in range(rng.randint(40, 200))
+    )
+    script = "var data = {" + ",".join(f'"k{i}": {i}' for i in range(2000)) + "};"
+    return (
+        "<!doctype html><html><head>"
+        f"<title>{sentence(rng, 6)}</title>"
+        '<link rel="canonical" href="/articles/example">'
+        '<meta property="article:published_time" content="2024-05-01T09:00:00Z">'
+        f"<script>{script}</script><style>body {{ margin: 0 }}</style>"
+        f"</head><body><header><nav><ul>{nav}</ul></nav></header>"
+        f"<main><article><h1>{sentence(rng, 6)}</h1>{body}</article></main>"
+        f"<aside><p>{sentence(rng, 20)}</p></aside><footer><p>{sentence(rng, 12)}</p></footer>"
+        f"<script>{script}</script></body></html>"
+    )
+
+def load_corpus(directory: str, limit: int):
+    paths = sorted(glob.glob(os.path.join(directory, "**", "*.htm*"), recursive=True))[:limit]
+    pages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pages.append(f.read().decode("utf-8", errors="replace"))
+    return pages
+
+def soup_path(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    return " ".join(p.get_text() for p in soup.find_all("p"))[:WEB_CONTENT_CHARS]
+
+def streaming_path(html: str) -> str:
+    return extract_main_content(html, base_url="https://example.com/")["text"]
+
+def throughput(extract, pages, repeat: int):
+    """Best-of-`repeat` pages/s and MB/s"""
+    total_bytes = sum(len(page.encode("utf-8")) for page in pages)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for page in pages:
+            extract(page)
+        best = min(best, time.perf_counter() - started)
+    return len(pages) / best, total_bytes / best / 2**20
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of saved HTML pages")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.corpus:
+        pages = load_corpus(args.corpus, args.pages)
+        if not pages:
+            sys.exit(f"No .html/.htm files under {args.corpus}")
+    else:
+        rng = random.Random(0)
+        pages = [synthetic_page(rng) for _ in range(args.pages)]
+    average_kb = sum(len(page) for page in pages) / len(pages) / 1024
+
+    print(f"{len(pages)} pages, {average_kb:.0f} KB average, {WEB_CONTENT_CHARS} chars kept\n")
+    print(f"{'extractor':<24} {'pages/s':>9} {'MB/s':>8}")
+    results = {}
+    for name, extract in (("BeautifulSoup html.parser", soup_path), ("lxml streaming", streaming_path)):
+        results[name] = throughput(extract, pages, args.repeat)
+        print(f"{name:<24} {results[name][0]:>9.1f} {results[name][1]:>8.1f}")
+    speedup = results["lxml streaming"][0] / results["BeautifulSoup html.parser"][0]
+    print(f"\nSpeedup: {speedup:.1f}x")
+
+if __name__ == "__main__":
+    main()
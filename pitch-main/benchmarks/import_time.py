@@ -0,0 +1,62 @@
+"""Measure how long a fresh interpreter takes to import an API module.
+
+Usage (from pitch-main/):
+    python benchmarks/import_time.py [--module src.pitch.api] [--runs 5] [--top 15]
+
+Each run starts a new Python process, so nothing is cached between runs.
+The slowest modules come from `python -X importtime` of the last run.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def import_once(module: str) -> tuple:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return elapsed, result.stderr
+
+def slowest_imports(importtime_log: str, top: int):
+    """(cumulative microseconds, module) for the slowest imports in a -X importtime log"""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:   self_us | cumulative_us | module"
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.pitch.api")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings = []
+    log = ""
+    for _ in range(args.runs):
+        elapsed, log = import_once(args.module)
+        timings.append(elapsed)
+
+    print(f"import {args.module}: median {statistics.median(timings) * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms over {args.runs} fresh interpreters\n")
+    print("Slowest imports (cumulative):")
+    for cumulative_us, name in slowest_imports(log, args.top):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
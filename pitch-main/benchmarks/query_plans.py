@@ -0,0 +1,164 @@
+"""Compare query plans and timings of the hot API queries before and after
+the 0002 index migration on a synthetic dataset.
+
+Usage (from pitch-main/):
+    python benchmarks/query_plans.py [--rows 1000000] [--database-url sqlite:///...]
+
+The default target is a throwaway SQLite file. Pointing --database-url at a
+scratch PostgreSQL database uses EXPLAIN ANALYZE instead of EXPLAIN QUERY PLAN.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+STATUSES = ["pending", "processing", "completed", "failed"]
+
+# The queries behind /analytics/dashboard, /analytics/recent-activity,
+# /decks, /analysis/{id}/result and the per-deck analysis lookups
+QUERIES = {
+    "dashboard grouped counts":
+        "SELECT status, count(id) FROM analyses GROUP BY status",
+    "status filter":
+        "SELECT count(id) FROM analyses WHERE status = 'failed'",
+    "recent activity":
+        "SELECT analyses.id, decks.deck_metadata FROM analyses JOIN decks ON decks.id = analyses.deck_id "
+        "ORDER BY analyses.created_at DESC LIMIT 5",
+    "latest analysis of deck":
+        "SELECT status FROM analyses WHERE deck_id = {deck_id} ORDER BY created_at DESC, id DESC LIMIT 1",
+    "result for job":
+        "SELECT analysis_results.id FROM analysis_results JOIN analyses ON analyses.id = analysis_results.analysis_id "
+        "WHERE analyses.id = {analysis_id}",
+    "deck page":
+        "SELECT id, filename FROM decks ORDER BY upload_date DESC, id DESC LIMIT 50",
+}
+
+def populate(engine, rows: int):
+    """Insert rows analyses spread over rows/10 decks, a quarter with results"""
+    deck_count = max(rows // 10, 1)
+    start = datetime(2023, 1, 1)
+    rng = random.Random(42)
+    if engine.dialect.name == "sqlite":
+        _populate_sqlite(engine, rows, deck_count, start, rng)
+    else:
+        _populate_generic(engine, rows, deck_count, start, rng)
+
+def _random_time(start, rng):
+    return start + timedelta(seconds=rng.randrange(60 * 60 * 24 * 365))
+
+def _populate_sqlite(engine, rows, deck_count, start, rng):
+    # Raw executemany keeps generating a million rows to a few seconds
+    with engine.begin() as connection:
+        cursor = connection.connection.cursor()
+        cursor.executemany(
+            "INSERT INTO decks (id, filename, file_path, deck_metadata, upload_date) VALUES (?, ?, ?, ?, ?)",
+            ((i, f"deck_{i}.pdf", f"/tmp/deck_{i}.pdf", '{"startup_name": "S%d"}' % i, _random_time(start, rng))
+             for i in range(1, deck_count + 1))
+        )
+        cursor.executemany(
+            "INSERT INTO analyses (id, deck_id, status, created_at) VALUES (?, ?, ?, ?)",
+            ((i, rng.randint(1, deck_count), rng.choice(STATUSES), _random_time(start, rng))
+             for i in range(1, rows + 1))
+        )
+        cursor.executemany(
+            "INSERT INTO analysis_results (id, analysis_id, overall_score) VALUES (?, ?, ?)",
+            ((i, i * 4, rng.random() * 100) for i in range(1, rows // 4 + 1))
+        )
+
+def _populate_generic(engine, rows, deck_count, start, rng):
+    from sqlalchemy import insert
+    from src import models
+
+    def batches(make, total, size=10000):
+        for offset in range(0, total, size):
+            yield [make(i) for i in range(offset + 1, min(offset + size, total) + 1)]
+
+    with engine.begin() as connection:
+        for batch in batches(lambda i: {
+            "id": i, "filename": f"deck_{i}.pdf", "file_path": f"/tmp/deck_{i}.pdf",
+            "deck_metadata": {"startup_name": f"S{i}"},
+            "upload_date": _random_time(start, rng),
+        }, deck_count):
+            connection.execute(insert(models.Deck.__table__), batch)
+        for batch in batches(lambda i: {
+            "id": i, "deck_id": rng.randint(1, deck_count), "status": rng.choice(STATUSES),
+            "created_at": _random_time(start, rng),
+        }, rows):
+            connection.execute(insert(models.Analysis.__table__), batch)
+        for batch in batches(lambda i: {
+            "id": i, "analysis_id": i * 4, "overall_score": rng.random() * 100,
+        }, rows // 4):
+            connection.execute(insert(models.AnalysisResult.__table__), batch)
+
+def explain(connection, sql: str) -> str:
+    from sqlalchemy import text
+    prefix = "EXPLAIN QUERY PLAN " if connection.dialect.name == "sqlite" else "EXPLAIN ANALYZE "
+    plan = connection.execute(text(prefix + sql)).all()
+    if connection.dialect.name == "sqlite":
+        return "; ".join(str(row[-1]) for row in plan)
+    return "\n      ".join(str(row[0]) for row in plan)
+
+def measure(engine, params: dict, repeat: int):
+    from sqlalchemy import text
+    report = {}
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            connection.execute(text("ANALYZE"))
+        for name, template in QUERIES.items():
+            sql = template.format(**params)
+            connection.execute(text(sql)).all()  # warm the page cache
+            started = time.perf_counter()
+            for _ in range(repeat):
+                connection.execute(text(sql)).all()
+            elapsed_ms = (time.perf_counter() - started) / repeat * 1000
+            report[name] = (elapsed_ms, explain(connection, sql))
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of analyses to generate")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query")
+    parser.add_argument("--database-url", help="scratch database (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    scratch = None
+    if not args.database_url:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        scratch.close()
+        args.database_url = f"sqlite:///{scratch.name}"
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from src import database
+
+    try:
+        database.run_migrations("0001")
+        started = time.perf_counter()
+        populate(database.engine, args.rows)
+        print(f"Generated {args.rows:,} analyses in {time.perf_counter() - started:.1f}s\n")
+
+        params = {"deck_id": max(args.rows // 20, 1), "analysis_id": args.rows // 2}
+        before = measure(database.engine, params, args.repeat)
+        started = time.perf_counter()
+        database.run_migrations()
+        print(f"Applied index migration in {time.perf_counter() - started:.1f}s\n")
+        after = measure(database.engine, params, args.repeat)
+
+        for name in QUERIES:
+            before_ms, before_plan = before[name]
+            after_ms, after_plan = after[name]
+            speedup = before_ms / after_ms if after_ms else float("inf")
+            print(f"{name}: {before_ms:.2f} ms -> {after_ms:.2f} ms ({speedup:.1f}x)")
+            print(f"  before: {before_plan}")
+            print(f"  after:  {after_plan}\n")
+    finally:
+        database.engine.dispose()
+        if scratch:
+            os.remove(scratch.name)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Recall vs. memory of the int8-quantized local vector index against the
+exact float32 index on a synthetic, clustered embedding set.
+
+Usage (from pitch-main/):
+    python benchmarks/vector_quantization.py [--rows 100000] [--dimension 1536] [--queries 200]
+
+Memory is the size of what a query scans: the float32 matrix for the exact
+index, the int8 codes plus per-row scales for the quantized one. Recall@k is
+measured against exact search; the quantized index re-scores
+`--rescore-multiplier * k` candidates in float32.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from pitch.tools.vector_backends import LocalVectorBackend
+
+def synthetic_embeddings(rows: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors around a few hundred topics, closer to real embeddings than pure noise"""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((max(rows // 500, 8), dimension), dtype=np.float32)
+    vectors = topics[rng.integers(0, len(topics), rows)] + 0.8 * rng.standard_normal((rows, dimension), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def build(path: str, vectors: np.ndarray, quantization=None, rescore_multiplier: int = 10) -> LocalVectorBackend:
+    backend = LocalVectorBackend(path, dimension=vectors.shape[1], quantization=quantization,
+                                 rescore_multiplier=rescore_multiplier)
+    for start in range(0, len(vectors), 10_000):
+        backend.upsert([
+            {"id": f"v{start + i}", "values": vector, "metadata": {}}
+            for i, vector in enumerate(vectors[start:start + 10_000])
+        ])
+    return backend
+
+def timed_queries(backend: LocalVectorBackend, queries: np.ndarray, top_k: int):
+    results, timings = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append([match["id"] for match in backend.query(query, top_k)])
+        timings.append(time.perf_counter() - started)
+    return results, statistics.median(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rescore-multiplier", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.rows, args.dimension)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, args.rows, args.queries)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape, dtype=np.float32)
+
+    scratch = tempfile.mkdtemp(prefix="vector-quantization-")
+    try:
+        exact = build(os.path.join(scratch, "exact"), vectors)
+        quantized = build(os.path.join(scratch, "int8"), vectors, "int8", args.rescore_multiplier)
+        del vectors
+
+        truth, exact_ms = timed_queries(exact, queries, args.top_k)
+        found, quantized_ms = timed_queries(quantized, queries, args.top_k)
+        recall = np.mean([len(set(t) & set(f)) / len(t) for t, f in zip(truth, found)])
+
+        exact_bytes = exact._matrix.nbytes
+        quantized_bytes = quantized._codes.nbytes + quantized._scales.nbytes
+        print(f"{args.rows:,} x {args.dimension} vectors, {args.queries} queries, top-{args.top_k}\n")
+        print(f"{'index':<10} {'scanned MB':>11} {'median ms':>10} {'recall@k':>9}")
+        print(f"{'float32':<10} {exact_bytes / 2**20:>11.1f} {exact_ms:>10.2f} {1.0:>9.4f}")
+        print(f"{'int8':<10} {quantized_bytes / 2**20:>11.1f} {quantized_ms:>10.2f} {recall:>9.4f}")
+        print(f"\nMemory reduction: {exact_bytes / quantized_bytes:.2f}x, recall loss: {(1 - recall) * 100:.2f}%")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,24 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Database
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pitch.db")
 
+def _async_database_url(url: str) -> str:
+    """Map a sync SQLAlchemy URL onto its asyncio driver"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_database_url(DATABASE_URL))
+
+# Connection pool (not used for SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
 # File Storage
 UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
 KNOWLEDGE_DIR = os.path.join(BASE_DIR, "knowledge")
@@ -35,6 +53,9 @@ ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 10 * 1024 * 1024))
 ALLOWED_FILE_TYPES = os.getenv("ALLOWED_FILE_TYPES", "application/pdf,application/vnd.ms-powerpoint,application/vnd.openxmlformats-officedocument.presentationml.presentation").split(",")
 
+# How long an Idempotency-Key on POST /analyze maps back to its original job
+from .pitch.idempotency import IDEMPOTENCY_KEY_TTL
+
 # Groq Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
@@ -42,6 +63,11 @@ if not GROQ_API_KEY:
 else:
     print(f"Groq API key found: {GROQ_API_KEY[:5]}...{GROQ_API_KEY[-4:]}")
 
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-8b-8192")
+# Bump when the analysis prompt changes so cached analyses from the old prompt are not reused
+ANALYSIS_PROMPT_VERSION = os.getenv("ANALYSIS_PROMPT_VERSION", "1")
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", 7 * 24 * 60 * 60))
+
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
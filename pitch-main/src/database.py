@@ -1,14 +1,36 @@
+import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from . import config
 
-engine = create_engine(
-    config.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Only needed for SQLite
-)
+def _engine_options(url: str) -> dict:
+    """Pool settings for server databases; SQLite keeps SQLAlchemy's defaults"""
+    if url.startswith("sqlite+aiosqlite"):
+        return {}
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}  # Only needed for SQLite
+    return {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+engine = create_engine(config.DATABASE_URL, **_engine_options(config.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API endpoints so queries don't block the event loop
+async_engine = create_async_engine(config.ASYNC_DATABASE_URL, **_engine_options(config.ASYNC_DATABASE_URL))
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 # Dependency
@@ -17,4 +39,19 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def run_migrations(revision: str = "head"):
+    """Bring the schema up to date with the Alembic migrations in src/migrations"""
+    from alembic import command
+    from alembic.config import Config
+
+    alembic_cfg = Config(os.path.join(config.BASE_DIR, "alembic.ini"))
+    alembic_cfg.set_main_option("script_location", os.path.join(config.BASE_DIR, "src", "migrations"))
+    with engine.begin() as connection:
+        alembic_cfg.attributes["connection"] = connection
+        command.upgrade(alembic_cfg, revision)
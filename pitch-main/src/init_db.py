@@ -1,10 +1,10 @@
-from database import engine
-from models import Base
+from .database import run_migrations
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    # The schema is owned by the Alembic migrations; create_all would skip them
+    run_migrations()
 
 if __name__ == "__main__":
     print("Creating database tables...")
     init_db()
-    print("Database tables created successfully!") 
\ No newline at end of file
+    print("Database tables created successfully!")
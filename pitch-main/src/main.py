@@ -1,14 +1,20 @@
-from fastapi import FastAPI, HTTPException, status, UploadFile, File, Form, WebSocket, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, status, UploadFile, File, Form, Header, Query, Response, WebSocket, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, delete, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
 from typing import List, Optional
 import json
+import base64
 from datetime import datetime
 import os
 from fastapi.responses import FileResponse
 import tempfile
 from . import models, database, websocket, config, schemas
-from .services import analysis_service
+from .services import analysis_service, analytics_service, idempotency_service, knowledge_service
+from .pitch.cache import cache, close_async_redis
+from .pitch.monitoring import setup_metrics
 
 app = FastAPI(title="Pitch Deck Analyzer API")
 
@@ -19,31 +25,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset"],
 )
 
-# Initialize database on startup
+# Per-route latency, in-flight and body size metrics, scraped from /metrics
+setup_metrics(app)
+
+# Apply schema migrations on startup
 @app.on_event("startup")
 async def startup_event():
-    models.Base.metadata.create_all(bind=database.engine)
+    database.run_migrations()
+    with database.engine.begin() as connection:
+        analytics_service.seed_counters(connection)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Write any vectors still sitting in the upsert buffer
+    await knowledge_service.vector_store.close()
+    await close_async_redis()
 
 # Dependency
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+get_db = database.get_async_db
 
 # Deck endpoints
 @app.post("/analyze")
 async def analyze_deck(
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     files: UploadFile = File(...),
-    startup_name: str = Form(...)
+    startup_name: str = Form(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
+    content = await files.read()
+
+    # A retried request with the same key maps back to the original job
+    if idempotency_key:
+        request_hash = idempotency_service.request_fingerprint(startup_name, files.filename, content)
+        existing = await idempotency_service.reserve_key(db, idempotency_key, request_hash)
+        if existing is not None:
+            if existing.request_hash != request_hash:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used with a different request"
+                )
+            if existing.response is None:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still being processed"
+                )
+            return existing.response
+
     try:
-        content = await files.read()
         if len(content) > config.MAX_FILE_SIZE:
             raise HTTPException(
                 status_code=400,
@@ -68,37 +100,104 @@ async def analyze_deck(
             deck_metadata={"startup_name": startup_name}
         )
         db.add(deck)
-        db.commit()
-        db.refresh(deck)
+        await db.commit()
+        await db.refresh(deck)
 
         analysis = models.Analysis(
             deck_id=deck.id,
             status="pending"
         )
         db.add(analysis)
-        db.commit()
-        db.refresh(analysis)
+        await db.commit()
+        await db.refresh(analysis)
 
         # background_tasks.add_task(analysis_service.perform_analysis, analysis.id, deck.file_path)
-        # Temporarily run analysis directly for debugging
-        analysis_service.perform_analysis(analysis.id, deck.file_path)
+        # Temporarily run analysis directly for debugging (off the event loop)
+        await run_in_threadpool(analysis_service.perform_analysis, analysis.id, deck.file_path)
 
-        return {"job_id": analysis.id, "deck_id": deck.id}
+        response = {"job_id": analysis.id, "deck_id": deck.id}
+        if idempotency_key:
+            await idempotency_service.complete_key(db, idempotency_key, response)
+        return response
     except Exception as e:
-        db.rollback()
+        await db.rollback()
+        if idempotency_key:
+            await idempotency_service.release_key(db, idempotency_key)
+        if isinstance(e, HTTPException):
+            raise  # validation errors keep their status
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while processing your request: {str(e)}"
         )
 
-@app.get("/decks", response_model=List[schemas.Deck])
-async def list_decks(db: Session = Depends(get_db)):
-    decks = db.query(models.Deck).all()
-    return decks
+# Columns /decks can project; "status" is the latest analysis status
+DECK_LIST_FIELDS = {
+    "id": models.Deck.id,
+    "filename": models.Deck.filename,
+    "deck_metadata": models.Deck.deck_metadata,
+    "upload_date": models.Deck.upload_date,
+}
+
+def encode_deck_cursor(upload_date: datetime, deck_id: int) -> str:
+    raw = json.dumps([upload_date.isoformat(), deck_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_deck_cursor(cursor: str):
+    try:
+        upload_date, deck_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(upload_date), int(deck_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/decks", response_model=List[schemas.DeckSummary], response_model_exclude_unset=True)
+async def list_decks(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """List decks newest first, paginated on (upload_date, id).
+
+    The next page's cursor is returned in the X-Next-Cursor header.
+    `fields` is a comma separated projection, e.g. `fields=id,filename,status`.
+    """
+    requested = [f.strip() for f in fields.split(",") if f.strip()] if fields else [*DECK_LIST_FIELDS, "status"]
+    unknown = set(requested) - set(DECK_LIST_FIELDS) - {"status"}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    columns = [models.Deck.id, models.Deck.upload_date]
+    columns += [DECK_LIST_FIELDS[f] for f in requested if f in DECK_LIST_FIELDS and f not in ("id", "upload_date")]
+    if "status" in requested:
+        latest_status = (
+            select(models.Analysis.status)
+            .where(models.Analysis.deck_id == models.Deck.id)
+            .order_by(models.Analysis.created_at.desc(), models.Analysis.id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        columns.append(latest_status.label("status"))
+
+    query = select(*columns).order_by(models.Deck.upload_date.desc(), models.Deck.id.desc())
+    if cursor:
+        upload_date, deck_id = decode_deck_cursor(cursor)
+        query = query.where(or_(
+            models.Deck.upload_date < upload_date,
+            and_(models.Deck.upload_date == upload_date, models.Deck.id < deck_id)
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_deck_cursor(rows[-1].upload_date, rows[-1].id)
+
+    return [{f: row._mapping[f] for f in requested} for row in rows]
 
 @app.get("/decks/{deck_id}", response_model=schemas.Deck)
-async def get_deck(deck_id: int, db: Session = Depends(get_db)):
-    deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
+async def get_deck(deck_id: int, db: AsyncSession = Depends(get_db)):
+    deck = await db.get(models.Deck, deck_id)
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     return deck
@@ -107,9 +206,9 @@ async def get_deck(deck_id: int, db: Session = Depends(get_db)):
 async def reanalyze_deck(
     deck_id: int,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
+    deck = await db.get(models.Deck, deck_id)
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
 
@@ -118,8 +217,8 @@ async def reanalyze_deck(
         status="pending"
     )
     db.add(analysis)
-    db.commit()
-    db.refresh(analysis)
+    await db.commit()
+    await db.refresh(analysis)
 
     background_tasks.add_task(analysis_service.perform_analysis, analysis.id, deck.file_path)
 
@@ -127,22 +226,26 @@ async def reanalyze_deck(
 
 @app.get("/decks/compare")
 async def compare_decks(
-    deck_id_1: str,
-    deck_id_2: str,
-    db: Session = Depends(get_db)
+    deck_id_1: int,
+    deck_id_2: int,
+    db: AsyncSession = Depends(get_db)
 ):
-    deck1 = db.query(models.Deck).filter(models.Deck.id == deck_id_1).first()
-    deck2 = db.query(models.Deck).filter(models.Deck.id == deck_id_2).first()
+    deck1 = await db.get(models.Deck, deck_id_1)
+    deck2 = await db.get(models.Deck, deck_id_2)
 
     if not deck1 or not deck2:
         raise HTTPException(status_code=404, detail="One or both decks not found")
 
-    result1 = db.query(models.AnalysisResult).join(models.Analysis).filter(
-        models.Analysis.deck_id == deck_id_1
-    ).first()
-    result2 = db.query(models.AnalysisResult).join(models.Analysis).filter(
-        models.Analysis.deck_id == deck_id_2
-    ).first()
+    result1 = (await db.execute(
+        select(models.AnalysisResult).join(models.Analysis).where(
+            models.Analysis.deck_id == deck_id_1
+        ).limit(1)
+    )).scalars().first()
+    result2 = (await db.execute(
+        select(models.AnalysisResult).join(models.Analysis).where(
+            models.Analysis.deck_id == deck_id_2
+        ).limit(1)
+    )).scalars().first()
 
     if not result1 or not result2:
         raise HTTPException(status_code=400, detail="Both decks must be analyzed first")
@@ -176,45 +279,62 @@ async def compare_decks(
     }
 
 @app.delete("/decks/{deck_id}")
-async def delete_deck(deck_id: int, db: Session = Depends(get_db)):
+async def delete_deck(deck_id: int, db: AsyncSession = Depends(get_db)):
     try:
-        deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
+        deck = await db.get(models.Deck, deck_id)
         if not deck:
             raise HTTPException(status_code=404, detail="Deck not found")
 
         if os.path.exists(deck.file_path):
             os.remove(deck.file_path)
 
-        db.query(models.Analysis).filter(models.Analysis.deck_id == deck_id).delete()
-
-        db.delete(deck)
-        db.commit()
+        # The bulk delete bypasses the ORM flush hooks, so adjust the dashboard counters here
+        status_counts = await db.execute(
+            select(models.Analysis.status, func.count(models.Analysis.id))
+            .where(models.Analysis.deck_id == deck_id)
+            .group_by(models.Analysis.status)
+        )
+        for statement in analytics_service.counter_updates({
+            analytics_service.status_counter(status): -count
+            for status, count in status_counts if status
+        }, db.get_bind().dialect.name):
+            await db.execute(statement)
+        await db.execute(delete(models.Analysis).where(models.Analysis.deck_id == deck_id))
+
+        await db.delete(deck)
+        await db.commit()
+        # Drop the cached analyses of the deck in one step
+        await cache.ainvalidate_tags([analysis_service.deck_tag(deck_id)])
 
         return {"message": "Deck deleted successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while deleting the deck: {str(e)}"
         )
 
 @app.get("/analysis/{job_id}/status", response_model=schemas.Analysis)
-async def get_analysis_status(job_id: int, db: Session = Depends(get_db)):
-    analysis = db.query(models.Analysis).filter(models.Analysis.id == job_id).first()
+async def get_analysis_status(job_id: int, db: AsyncSession = Depends(get_db)):
+    analysis = await db.get(models.Analysis, job_id)
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis job not found")
     return analysis
 
 @app.get("/analysis/{job_id}/result", response_model=schemas.AnalysisResult)
-async def get_analysis_result(job_id: int, db: Session = Depends(get_db)):
-    analysis_result = db.query(models.AnalysisResult).join(models.Analysis).filter(models.Analysis.id == job_id).first()
+async def get_analysis_result(job_id: int, db: AsyncSession = Depends(get_db)):
+    analysis_result = (await db.execute(
+        select(models.AnalysisResult).join(models.Analysis).where(models.Analysis.id == job_id).limit(1)
+    )).scalars().first()
     if not analysis_result:
         raise HTTPException(status_code=404, detail="Analysis result not found")
     return analysis_result
 
 @app.get("/analysis/{job_id}/report")
-async def download_analysis_report(job_id: int, db: Session = Depends(get_db)):
-    analysis_result = db.query(models.AnalysisResult).join(models.Analysis).filter(models.Analysis.id == job_id).first()
+async def download_analysis_report(job_id: int, db: AsyncSession = Depends(get_db)):
+    analysis_result = (await db.execute(
+        select(models.AnalysisResult).join(models.Analysis).where(models.Analysis.id == job_id).limit(1)
+    )).scalars().first()
     if not analysis_result:
         raise HTTPException(status_code=404, detail="Analysis result not found")
 
@@ -256,8 +376,9 @@ async def download_analysis_report(job_id: int, db: Session = Depends(get_db)):
 
 @app.post("/knowledge/upload")
 async def upload_knowledge_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     content = await file.read()
     if len(content) > config.MAX_FILE_SIZE:
@@ -277,44 +398,66 @@ async def upload_knowledge_file(
         file_type=file.content_type
     )
     db.add(knowledge_file)
-    db.commit()
-    db.refresh(knowledge_file)
+    await db.commit()
+    await db.refresh(knowledge_file)
+
+    # Make the file searchable without holding up the upload response
+    background_tasks.add_task(knowledge_service.index_knowledge_file, knowledge_file)
 
     return knowledge_file
 
 @app.get("/knowledge/search")
-async def search_knowledge(query: str, db: Session = Depends(get_db)):
-    files = db.query(models.KnowledgeFile).all()
-    return files
+async def search_knowledge(
+    response: Response,
+    query: str,
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    filters: Optional[str] = Query(None, description='JSON metadata filter, e.g. {"filename": "report.pdf"}')
+):
+    """Hybrid keyword + semantic search over knowledge file chunks.
+
+    When more results may follow, the offset of the next page is returned
+    in the X-Next-Offset header.
+    """
+    try:
+        filter_criteria = json.loads(filters) if filters else None
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=422, detail="filters must be a JSON object")
+    if filter_criteria is not None and not isinstance(filter_criteria, dict):
+        raise HTTPException(status_code=422, detail="filters must be a JSON object")
+
+    results = await knowledge_service.search(query, filter_criteria, limit=limit, offset=offset)
+    if len(results) == limit:
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return results
 
 @app.get("/knowledge/files")
-async def list_knowledge_files(db: Session = Depends(get_db)):
-    files = db.query(models.KnowledgeFile).all()
-    return files
+async def list_knowledge_files(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.KnowledgeFile))
+    return result.scalars().all()
 
 @app.get("/analytics/dashboard", response_model=schemas.AnalyticsDashboardMetrics)
-async def get_analytics_dashboard_metrics(db: Session = Depends(get_db)):
-    total_decks = db.query(models.Deck).count()
-    analysis_pending_count = db.query(models.Analysis).filter(models.Analysis.status == "pending").count()
-    analysis_processing_count = db.query(models.Analysis).filter(models.Analysis.status == "processing").count()
-    analysis_completed_count = db.query(models.Analysis).filter(models.Analysis.status == "completed").count()
-    analysis_failed_count = db.query(models.Analysis).filter(models.Analysis.status == "failed").count()
+async def get_analytics_dashboard_metrics(db: AsyncSession = Depends(get_db)):
+    counters = await analytics_service.read_counters(db)
 
     return {
-        "total_decks": total_decks,
-        "analysis_pending_count": analysis_pending_count,
-        "analysis_processing_count": analysis_processing_count,
-        "analysis_completed_count": analysis_completed_count,
-        "analysis_failed_count": analysis_failed_count,
+        "total_decks": counters.get(analytics_service.DECKS_COUNTER, 0),
+        **{
+            f"analysis_{status}_count": counters.get(analytics_service.status_counter(status), 0)
+            for status in analytics_service.ANALYSIS_STATUSES
+        },
     }
 
 @app.get("/analytics/recent-activity", response_model=List[schemas.RecentAnalysis])
-async def get_recent_activity(db: Session = Depends(get_db)):
-    recent_analyses = db.query(models.Analysis)\
-                          .join(models.Deck)\
-                          .order_by(models.Analysis.created_at.desc())\
-                          .limit(5)\
-                          .all()
+async def get_recent_activity(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(models.Analysis)
+        .join(models.Analysis.deck)
+        .options(contains_eager(models.Analysis.deck))
+        .order_by(models.Analysis.created_at.desc())
+        .limit(5)
+    )
+    recent_analyses = result.scalars().all()
 
     recent_activity_data = []
     for analysis in recent_analyses:
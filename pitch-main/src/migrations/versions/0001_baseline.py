@@ -0,0 +1,103 @@
+"""Baseline schema previously created by metadata.create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _missing(table_name):
+    return not sa.inspect(op.get_bind()).has_table(table_name)
+
+
+def upgrade():
+    # Existing databases were built with create_all, so only create what's missing
+    if _missing("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer, primary_key=True, index=True),
+            sa.Column("email", sa.String, unique=True, index=True),
+            sa.Column("hashed_password", sa.String),
+            sa.Column("is_active", sa.Boolean),
+            sa.Column("created_at", sa.DateTime),
+        )
+    if _missing("decks"):
+        op.create_table(
+            "decks",
+            sa.Column("id", sa.Integer, primary_key=True, index=True),
+            sa.Column("filename", sa.String),
+            sa.Column("file_path", sa.String),
+            sa.Column("deck_metadata", sa.JSON),
+            sa.Column("upload_date", sa.DateTime),
+            sa.Column("owner_id", sa.Integer, sa.ForeignKey("users.id")),
+        )
+    if _missing("analyses"):
+        op.create_table(
+            "analyses",
+            sa.Column("id", sa.Integer, primary_key=True, index=True),
+            sa.Column("deck_id", sa.Integer, sa.ForeignKey("decks.id")),
+            sa.Column("status", sa.String),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("completed_at", sa.DateTime, nullable=True),
+            sa.Column("error", sa.String, nullable=True),
+            sa.Column("result", sa.JSON, nullable=True),
+        )
+    if _missing("analysis_results"):
+        op.create_table(
+            "analysis_results",
+            sa.Column("id", sa.Integer, primary_key=True, index=True),
+            sa.Column("analysis_id", sa.Integer, sa.ForeignKey("analyses.id")),
+            sa.Column("overall_score", sa.Float),
+            sa.Column("pitch_analysis", sa.JSON),
+            sa.Column("market_research", sa.JSON),
+            sa.Column("financial_analysis", sa.JSON),
+            sa.Column("website_analysis", sa.JSON, nullable=True),
+            sa.Column("investment_strategy", sa.JSON, nullable=True),
+            sa.Column("due_diligence", sa.JSON, nullable=True),
+            sa.Column("created_at", sa.DateTime),
+        )
+    if _missing("knowledge_files"):
+        op.create_table(
+            "knowledge_files",
+            sa.Column("id", sa.Integer, primary_key=True, index=True),
+            sa.Column("filename", sa.String),
+            sa.Column("file_path", sa.String),
+            sa.Column("file_type", sa.String),
+            sa.Column("upload_date", sa.DateTime),
+            sa.Column("owner_id", sa.Integer, sa.ForeignKey("users.id")),
+        )
+    if _missing("idempotency_keys"):
+        op.create_table(
+            "idempotency_keys",
+            sa.Column("key", sa.String, primary_key=True),
+            sa.Column("request_hash", sa.String),
+            sa.Column("response", sa.JSON, nullable=True),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("expires_at", sa.DateTime, index=True),
+        )
+    if _missing("dashboard_counters"):
+        op.create_table(
+            "dashboard_counters",
+            sa.Column("name", sa.String, primary_key=True),
+            sa.Column("value", sa.Integer, nullable=False),
+        )
+
+
+def downgrade():
+    for table_name in (
+        "dashboard_counters",
+        "idempotency_keys",
+        "knowledge_files",
+        "analysis_results",
+        "analyses",
+        "decks",
+        "users",
+    ):
+        op.drop_table(table_name)
@@ -0,0 +1,36 @@
+"""Indexes for the hot query paths
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _create_index(name, table_name, columns):
+    # Databases built with create_all already have the indexes declared in models.py
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table_name)}
+    if name not in existing:
+        op.create_index(name, table_name, columns)
+
+
+def upgrade():
+    _create_index("ix_analyses_status_created_at", "analyses", ["status", "created_at"])
+    _create_index("ix_analyses_deck_id_created_at", "analyses", ["deck_id", "created_at"])
+    _create_index("ix_analyses_created_at", "analyses", ["created_at"])
+    _create_index("ix_analysis_results_analysis_id", "analysis_results", ["analysis_id"])
+    _create_index("ix_decks_upload_date_id", "decks", ["upload_date", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_decks_upload_date_id", table_name="decks")
+    op.drop_index("ix_analysis_results_analysis_id", table_name="analysis_results")
+    op.drop_index("ix_analyses_created_at", table_name="analyses")
+    op.drop_index("ix_analyses_deck_id_created_at", table_name="analyses")
+    op.drop_index("ix_analyses_status_created_at", table_name="analyses")
@@ -0,0 +1,33 @@
+"""Make decks.upload_date NOT NULL
+
+/decks pages on (upload_date, id), which a NULL upload_date can't take part in.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# Decks of unknown age sort as the oldest
+UNKNOWN_UPLOAD_DATE = datetime(1970, 1, 1)
+
+
+def upgrade():
+    decks = sa.table("decks", sa.column("upload_date", sa.DateTime))
+    op.execute(decks.update().where(decks.c.upload_date.is_(None)).values(upload_date=UNKNOWN_UPLOAD_DATE))
+    # Batch mode so SQLite, which can't ALTER COLUMN, gets the table rebuilt
+    with op.batch_alter_table("decks") as batch:
+        batch.alter_column("upload_date", existing_type=sa.DateTime, nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table("decks") as batch:
+        batch.alter_column("upload_date", existing_type=sa.DateTime, nullable=True)
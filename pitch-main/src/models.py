@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, column_property
 from datetime import datetime
 import uuid
 
@@ -23,17 +23,24 @@ class Deck(Base):
     filename = Column(String)
     file_path = Column(String)
     deck_metadata = Column(JSON)
-    upload_date = Column(DateTime, default=datetime.utcnow)
+    upload_date = Column(DateTime, default=datetime.utcnow, nullable=False)
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="decks")
     analyses = relationship("Analysis", back_populates="deck")
 
+    __table_args__ = (
+        # Keyset pagination of /decks
+        Index("ix_decks_upload_date_id", "upload_date", "id"),
+    )
+
 class Analysis(Base):
     __tablename__ = "analyses"
 
     id = Column(Integer, primary_key=True, index=True)
     deck_id = Column(Integer, ForeignKey("decks.id"))
-    status = Column(String)  # pending, processing, completed, failed
+    # pending, processing, completed, failed. active_history keeps the previous
+    # status available at flush time for the dashboard counters.
+    status = column_property(Column(String), active_history=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     error = Column(String, nullable=True)  # Store error messages
@@ -41,11 +48,20 @@ class Analysis(Base):
     deck = relationship("Deck", back_populates="analyses")
     results = relationship("AnalysisResult", back_populates="analysis", uselist=False)
 
+    __table_args__ = (
+        # Status filters and the grouped dashboard counts
+        Index("ix_analyses_status_created_at", "status", "created_at"),
+        # Per-deck lookups and the latest analysis of a deck
+        Index("ix_analyses_deck_id_created_at", "deck_id", "created_at"),
+        # Recent activity ordered by created_at DESC
+        Index("ix_analyses_created_at", "created_at"),
+    )
+
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
 
     id = Column(Integer, primary_key=True, index=True)
-    analysis_id = Column(Integer, ForeignKey("analyses.id"))
+    analysis_id = Column(Integer, ForeignKey("analyses.id"), index=True)
     overall_score = Column(Float)
     pitch_analysis = Column(JSON)
     market_research = Column(JSON)
@@ -65,4 +81,19 @@ class KnowledgeFile(Base):
     file_type = Column(String)
     upload_date = Column(DateTime, default=datetime.utcnow)
     owner_id = Column(Integer, ForeignKey("users.id"))
-    owner = relationship("User") 
\ No newline at end of file
+    owner = relationship("User")
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    request_hash = Column(String)  # Fingerprint of the request that claimed the key
+    response = Column(JSON, nullable=True)  # Null while the original request is in flight
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True)
+
+class DashboardCounter(Base):
+    __tablename__ = "dashboard_counters"
+
+    name = Column(String, primary_key=True)  # "decks" or "analysis:<status>"
+    value = Column(Integer, default=0, nullable=False)
@@ -1,24 +1,77 @@
-from fastapi import FastAPI, File, UploadFile, WebSocket, BackgroundTasks, Form, Depends, HTTPException, status
+from fastapi import FastAPI, File, UploadFile, WebSocket, BackgroundTasks, Form, Header, Query, Response, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import uuid
 import os
-from typing import Dict, Optional, List
+from typing import Optional, List
 import aiofiles
 import asyncio
+import json
+import time
 from datetime import datetime, timedelta
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from pydantic import BaseModel
 
-from .crew import Pitch
+from .cache import cache, close_async_redis
+from .idempotency import IDEMPOTENCY_KEY_TTL, request_fingerprint
+from .monitoring import setup_metrics
 from .status_manager import status_manager
-from .tools.vector_store import VectorStore
+from .tools.vector_store import get_vector_store
+from .tools.knowledge_ingest import KNOWLEDGE_DIR, KNOWLEDGE_WATCH_INTERVAL, get_knowledge_ingestor
+from .tools.deck_parser import KNOWLEDGE_EXTENSIONS
 
 app = FastAPI(title="Pitch Deck Analyzer")
 
+# Heavy clients (crewai/langchain, the vector backend) are created lazily and
+# warmed up in the background after startup; /ready reports when that is done.
+vector_store = get_vector_store()
+knowledge_ingestor = get_knowledge_ingestor()
+lifecycle_tasks = []
+
+warmup_state = {"status": "pending", "started_at": None, "duration_seconds": None, "error": None}
+
+def warm_up():
+    """Import the crew stack and initialize the vector store off the request path"""
+    from . import crew  # noqa: F401
+    vector_store.warm_up()
+
+async def run_warm_up():
+    warmup_state["status"] = "warming_up"
+    warmup_state["started_at"] = datetime.now().isoformat()
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(warm_up)
+        warmup_state["status"] = "ready"
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+        warmup_state["status"] = "error"
+        warmup_state["error"] = str(e)
+    finally:
+        warmup_state["duration_seconds"] = round(time.perf_counter() - started, 3)
+
+@app.on_event("startup")
+async def start_warm_up():
+    lifecycle_tasks.append(asyncio.create_task(run_warm_up()))
+    if KNOWLEDGE_WATCH_INTERVAL > 0:
+        # Index files dropped into the knowledge directory within a few seconds
+        lifecycle_tasks.append(asyncio.create_task(knowledge_ingestor.watch()))
+
+@app.on_event("shutdown")
+async def flush_vector_writes():
+    for task in lifecycle_tasks:
+        task.cancel()
+    await vector_store.close()
+    await close_async_redis()
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: 200 once warm-up has finished, 503 until then"""
+    return JSONResponse(warmup_state, status_code=200 if warmup_state["status"] == "ready" else 503)
+
 # Mount static files first
 app.mount("/static", StaticFiles(directory="src/pitch/static"), name="static")
 
@@ -35,8 +88,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Offset"],
 )
 
+# Per-route latency, in-flight and body size metrics, scraped from /metrics
+setup_metrics(app)
+
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -54,7 +111,8 @@ fake_users_db = {
         "username": "johndoe",
         "full_name": "John Doe",
         "email": "johndoe@example.com",
-        "hashed_password": pwd_context.hash("secret"),
+        # bcrypt hash of "secret", precomputed so importing the API doesn't pay for hashing
+        "hashed_password": "$2b$12$EixZaYVK1fsbw1ZfbX3OXePaWxn96p36WQoeG6Lruj3vjPGga31lW",
         "disabled": False,
     }
 }
@@ -94,9 +152,40 @@ async def home():
 async def analyze(
     background_tasks: BackgroundTasks,
     startup_name: str = Form(...),
-    files: list[UploadFile] = File(...)
+    files: list[UploadFile] = File(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """Handle file uploads and start analysis"""
+    # A retried request with the same key maps back to the original job.
+    # The key lives in Redis so every worker sees the same claim.
+    cache_key = f"idempotency:analyze:{idempotency_key}" if idempotency_key else None
+    if cache_key:
+        request_hash = await request_fingerprint(startup_name, files)
+        claimed = await cache.aadd(cache_key, {"request_hash": request_hash, "response": None}, expire=IDEMPOTENCY_KEY_TTL)
+        existing = None if claimed else await cache.aget(cache_key)
+        if existing is not None:
+            if existing["request_hash"] != request_hash:
+                return JSONResponse({
+                    "status": "error",
+                    "message": "Idempotency-Key was already used with a different request"
+                }, status_code=422)
+            if existing["response"] is None:
+                return JSONResponse({
+                    "status": "error",
+                    "message": "A request with this Idempotency-Key is still being processed"
+                }, status_code=409)
+            return JSONResponse(existing["response"])
+
+    response = await start_analysis(background_tasks, startup_name, files)
+    if cache_key:
+        if response.status_code == 200:
+            await cache.aset(cache_key, {"request_hash": request_hash, "response": json.loads(response.body)}, expire=IDEMPOTENCY_KEY_TTL)
+        else:
+            await cache.adelete(cache_key)
+    return response
+
+async def start_analysis(background_tasks: BackgroundTasks, startup_name: str, files: list[UploadFile]) -> JSONResponse:
+    """Save the uploads, index them and queue the crew run"""
     try:
         # Generate unique job ID
         job_id = str(uuid.uuid4())
@@ -110,16 +199,15 @@ async def analyze(
                     raise FileNotFoundError(f"Failed to save file {file.filename}")
                 file_paths.append(file_path)
                 
-                # Store in vector database
-                async with aiofiles.open(file_path, 'r') as f:
-                    content = await f.read()
+                # Store in vector database, chunked by page/slide
                 metadata = {
                     "filename": file.filename,
                     "startup_name": startup_name,
                     "upload_date": datetime.now().isoformat(),
                     "type": "deck"
                 }
-                await vector_store.store_pitch_deck(content, metadata)
+                # The vector write is buffered and acknowledged in the background
+                await vector_store.store_pitch_deck_file(file_path, metadata, wait=False)
                 
         except Exception as upload_error:
             return JSONResponse({
@@ -208,7 +296,8 @@ async def analyze_pitch_deck(job_id: str, file_paths: list[str], startup_name: s
                 "timestamp": datetime.now().isoformat()
             })
 
-        # Initialize crew
+        # Initialize crew (imported here so crewai/langchain load on first use)
+        from .crew import Pitch
         pitch_crew = Pitch()
         
         print(f"\nStarting analysis with:")
@@ -342,24 +431,31 @@ async def update_profile(token: str = Depends(oauth2_scheme), full_name: str = F
     return {"message": "Profile updated successfully", "user": user}
 
 @app.post("/knowledge/upload")
-async def upload_knowledge_file(token: str = Depends(oauth2_scheme), file: UploadFile = File(...)):
+async def upload_knowledge_file(background_tasks: BackgroundTasks, token: str = Depends(oauth2_scheme), file: UploadFile = File(...)):
     user = await read_users_me(token)
     
-    # Save file
-    file_path = await save_upload_file(file)
-    
-    # Read file content
-    async with aiofiles.open(file_path, 'r') as f:
-        content = await f.read()
-    
-    # Store in vector database
+    filename = os.path.basename(file.filename or "")
+    if os.path.splitext(filename.lower())[1] not in KNOWLEDGE_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported file type. Allowed: {', '.join(KNOWLEDGE_EXTENSIONS)}"
+        )
+
+    # Save into the knowledge directory; re-uploading a file replaces its chunks
+    os.makedirs(KNOWLEDGE_DIR, exist_ok=True)
+    file_path = os.path.join(KNOWLEDGE_DIR, filename)
+    async with aiofiles.open(file_path, 'wb') as out_file:
+        await out_file.write(await file.read())
+
+    # Parse (PDF/PPTX/DOCX/text), embed and index in the background
     metadata = {
-        "filename": file.filename,
+        "filename": filename,
         "uploaded_by": user["username"],
         "upload_date": datetime.now().isoformat(),
         "type": "knowledge"
     }
-    doc_id = await vector_store.store_knowledge_file(content, metadata)
+    doc_id = knowledge_ingestor.doc_id_for(file_path)
+    background_tasks.add_task(knowledge_ingestor.ingest_file, file_path, {"uploaded_by": user["username"]})
     
     return {
         "message": "Knowledge file uploaded successfully",
@@ -371,12 +467,29 @@ async def upload_knowledge_file(token: str = Depends(oauth2_scheme), file: Uploa
 
 @app.get("/knowledge/search")
 async def search_knowledge(
+    response: Response,
+    query: str,
     token: str = Depends(oauth2_scheme),
-    query: str = None,
-    filter_criteria: Dict = None
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    filters: Optional[str] = Query(None, description='JSON metadata filter, e.g. {"filename": "report.pdf"}')
 ):
+    """Hybrid keyword + semantic search over knowledge chunks.
+
+    When more results may follow, the offset of the next page is returned
+    in the X-Next-Offset header.
+    """
     user = await read_users_me(token)
-    results = await vector_store.semantic_search(query, filter_criteria)
+    try:
+        filter_criteria = json.loads(filters) if filters else None
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="filters must be a JSON object")
+    if filter_criteria is not None and not isinstance(filter_criteria, dict):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="filters must be a JSON object")
+
+    results = await vector_store.hybrid_search(query, filter_criteria, top_k=limit, offset=offset)
+    if len(results) == limit:
+        response.headers["X-Next-Offset"] = str(offset + limit)
     return results
 
 @app.get("/knowledge/files")
@@ -448,6 +561,26 @@ async def find_similar_decks(
     similar_decks = await vector_store.find_similar_decks(deck_id, top_k)
     return similar_decks
 
+SIMILAR_DECKS_BATCH_LIMIT = int(os.getenv("SIMILAR_DECKS_BATCH_LIMIT", 5000))
+
+class SimilarDecksRequest(BaseModel):
+    deck_ids: List[str]
+    top_k: int = 5
+
+@app.post("/decks/similar")
+async def find_similar_decks_batch(
+    request: SimilarDecksRequest,
+    token: str = Depends(oauth2_scheme)
+):
+    """Top-k neighbours for many decks in one call, keyed by deck id"""
+    user = await read_users_me(token)
+    if len(request.deck_ids) > SIMILAR_DECKS_BATCH_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {SIMILAR_DECKS_BATCH_LIMIT} deck ids per request"
+        )
+    return await vector_store.find_similar_decks_many(request.deck_ids, request.top_k)
+
 @app.get("/decks/compare")
 async def compare_deck_versions(
     deck_id_1: str,
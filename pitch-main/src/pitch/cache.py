@@ -1,40 +1,196 @@
 import redis
-import json
-from typing import Any, Optional
+import redis.asyncio as aioredis
+import asyncio
+import random
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
 import os
+from .serializers import CACHE_SERIALIZER, Serializer, decode, encode, get_serializer
 
 # Get Redis URL from environment variable
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))  # per pool: one sync pool, one async pool per event loop
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 5))  # seconds to wait for a free connection
+# In-process tier of get_or_set(): entries kept, and how long a copy may lag behind Redis
+CACHE_LOCAL_SIZE = int(os.getenv("CACHE_LOCAL_SIZE", 1024))
+CACHE_LOCAL_TTL = float(os.getenv("CACHE_LOCAL_TTL", 30))
+CACHE_TTL_JITTER = float(os.getenv("CACHE_TTL_JITTER", 0.1))  # +/- fraction, so entries written together don't expire together
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", 300))  # seconds an expired value is still served while it is refreshed
+CACHE_LOCK_TIMEOUT = int(os.getenv("CACHE_LOCK_TIMEOUT", 120))  # longest one loader may hold a key for other workers
 
-# Create Redis client
-redis_client = redis.from_url(REDIS_URL)
+# Create Redis client (for worker threads and other synchronous code)
+redis_pool = redis.BlockingConnectionPool.from_url(REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT)
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+# asyncio connections belong to the loop that opened them, so each loop gets its own pool
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+def get_async_redis() -> aioredis.Redis:
+    """Async Redis client for the running event loop, pooled from REDIS_URL"""
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            pool = aioredis.BlockingConnectionPool.from_url(
+                REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT
+            )
+            client = _async_clients[loop] = aioredis.Redis(connection_pool=pool)
+        return client
+
+async def close_async_redis():
+    """Close the running loop's async pool (on application shutdown)"""
+    with _async_clients_lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.connection_pool.disconnect()
+
+class LocalCache:
+    """Bounded, thread-safe LRU with a per-entry expiry (time.monotonic())"""
+
+    def __init__(self, max_entries: int = CACHE_LOCAL_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, value: Any, ttl: float):
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_matching(self, predicate: Callable[[Any], bool]):
+        """Drop every entry whose value satisfies `predicate`"""
+        with self._lock:
+            for key in [key for key, (value, _) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class LoadPolicy(NamedTuple):
+    """How get_or_set() stores what its loader returns"""
+    expire: int
+    stale: int
+    serializer: Union[str, Serializer, None]
+    tags: Tuple[str, ...] = ()
+
+def tag_key(tag: str) -> str:
+    """Redis counter holding a tag's version; bumping it invalidates every entry stored under the tag"""
+    return f"cache:tag:{tag}"
+
+def _tag_versions(tags: Tuple[str, ...], raw: List[Optional[bytes]]) -> Dict[str, int]:
+    return {tag: int(value or 0) for tag, value in zip(tags, raw)}
+
+def _is_fresh(meta: Optional[Dict[str, Any]]) -> bool:
+    return bool(meta) and meta.get("fresh_until", 0) > time.time()
 
 class Cache:
-    def __init__(self, client: redis.Redis = redis_client):
+    """Redis cache with a blocking API for worker threads and an asyncio one.
+
+    set/add/get/delete/exists (and their a-prefixed async forms) always go
+    to Redis; mget/mset/delete_many batch many keys into one round trip.
+
+    get_or_set() adds a second, in-process LRU tier in front of Redis for
+    computed values, with single-flight loading (one loader per key across
+    threads, and across workers via a Redis lock), jittered TTLs and
+    stale-while-revalidate. In-process copies may lag other workers' writes
+    by up to CACHE_LOCAL_TTL seconds.
+
+    get_or_set() entries can carry tags (e.g. "deck:42"); invalidate_tags()
+    bumps a per-tag version in O(1) and entries stored under an older
+    version are treated as misses. namespace() builds on this to give
+    groups of keys a version that can be bumped as a whole.
+
+    Values are encoded by a pluggable serializer (see pitch.serializers;
+    `serializer=` on writes overrides the default) and compressed above
+    CACHE_COMPRESS_MIN_BYTES. Reads detect the format from each value.
+    """
+
+    def __init__(self, client: redis.Redis = redis_client, async_client: Optional[aioredis.Redis] = None,
+                 local_size: int = CACHE_LOCAL_SIZE, local_ttl: float = CACHE_LOCAL_TTL,
+                 serializer: Union[str, Serializer] = CACHE_SERIALIZER):
         self.client = client
+        self.serializer = get_serializer(serializer)
+        self._async_client = async_client
+        self.local = LocalCache(local_size)
+        self.local_ttl = local_ttl
+        self._flights: Dict[str, Future] = {}
+        self._flights_lock = threading.Lock()
+        # (event loop id, key) -> loading task
+        self._async_flights: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._background: set = set()
+        self._invalidations = 0  # invalidate_tags() calls in this process, to spot loads that span one
+
+    @property
+    def aclient(self) -> aioredis.Redis:
+        return self._async_client or get_async_redis()
+
+    def _dumps(self, value: Any, serializer: Union[str, Serializer, None] = None,
+               meta: Optional[Dict[str, Any]] = None) -> bytes:
+        return encode(value, serializer or self.serializer, meta)
+
+    @staticmethod
+    def _decode(data: Optional[bytes]) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+        return decode(data) if data else (None, None)
 
-    def set(self, key: str, value: Any, expire: int = 3600) -> bool:
+    def _loads(self, data: Optional[bytes]) -> Optional[Any]:
+        return self._decode(data)[0]
+
+    def set(self, key: str, value: Any, expire: int = 3600,
+            serializer: Union[str, Serializer, None] = None) -> bool:
         """Set a value in cache with expiration"""
+        self.local.discard(key)
         try:
-            serialized = json.dumps(value)
-            return self.client.setex(key, expire, serialized)
+            return self.client.setex(key, expire, self._dumps(value, serializer))
         except Exception as e:
             print(f"Cache set error: {e}")
             return False
 
+    def add(self, key: str, value: Any, expire: int = 3600,
+            serializer: Union[str, Serializer, None] = None) -> bool:
+        """Set a value only if the key does not exist yet"""
+        try:
+            return bool(self.client.set(key, self._dumps(value, serializer), ex=expire, nx=True))
+        except Exception as e:
+            print(f"Cache add error: {e}")
+            return False
+
     def get(self, key: str) -> Optional[Any]:
         """Get a value from cache"""
         try:
-            value = self.client.get(key)
-            if value:
-                return json.loads(value)
-            return None
+            return self._loads(self.client.get(key))
         except Exception as e:
             print(f"Cache get error: {e}")
             return None
 
     def delete(self, key: str) -> bool:
         """Delete a value from cache"""
+        self.local.discard(key)
         try:
             return bool(self.client.delete(key))
         except Exception as e:
@@ -49,5 +205,458 @@ class Cache:
             print(f"Cache exists error: {e}")
             return False
 
+    def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get many values in one round trip (None for misses)"""
+        if not keys:
+            return []
+        try:
+            return [self._loads(value) for value in self.client.mget(keys)]
+        except Exception as e:
+            print(f"Cache mget error: {e}")
+            return [None] * len(keys)
+
+    def mset(self, items: Dict[str, Any], expire: int = 3600,
+             serializer: Union[str, Serializer, None] = None) -> bool:
+        """Set many values with expiration in one pipelined round trip"""
+        if not items:
+            return True
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in items.items():
+                self.local.discard(key)
+                pipe.setex(key, expire, self._dumps(value, serializer))
+            return all(pipe.execute())
+        except Exception as e:
+            print(f"Cache mset error: {e}")
+            return False
+
+    def delete_many(self, keys: List[str]) -> int:
+        """Delete many keys in one round trip; returns how many existed"""
+        if not keys:
+            return 0
+        for key in keys:
+            self.local.discard(key)
+        try:
+            return self.client.delete(*keys)
+        except Exception as e:
+            print(f"Cache delete error: {e}")
+            return 0
+
+    async def aset(self, key: str, value: Any, expire: int = 3600,
+                   serializer: Union[str, Serializer, None] = None) -> bool:
+        self.local.discard(key)
+        try:
+            return await self.aclient.setex(key, expire, self._dumps(value, serializer))
+        except Exception as e:
+            print(f"Cache set error: {e}")
+            return False
+
+    async def aadd(self, key: str, value: Any, expire: int = 3600,
+                   serializer: Union[str, Serializer, None] = None) -> bool:
+        try:
+            return bool(await self.aclient.set(key, self._dumps(value, serializer), ex=expire, nx=True))
+        except Exception as e:
+            print(f"Cache add error: {e}")
+            return False
+
+    async def aget(self, key: str) -> Optional[Any]:
+        try:
+            return self._loads(await self.aclient.get(key))
+        except Exception as e:
+            print(f"Cache get error: {e}")
+            return None
+
+    async def adelete(self, key: str) -> bool:
+        self.local.discard(key)
+        try:
+            return bool(await self.aclient.delete(key))
+        except Exception as e:
+            print(f"Cache delete error: {e}")
+            return False
+
+    async def aexists(self, key: str) -> bool:
+        try:
+            return bool(await self.aclient.exists(key))
+        except Exception as e:
+            print(f"Cache exists error: {e}")
+            return False
+
+    async def amget(self, keys: List[str]) -> List[Optional[Any]]:
+        if not keys:
+            return []
+        try:
+            return [self._loads(value) for value in await self.aclient.mget(keys)]
+        except Exception as e:
+            print(f"Cache mget error: {e}")
+            return [None] * len(keys)
+
+    async def amset(self, items: Dict[str, Any], expire: int = 3600,
+                    serializer: Union[str, Serializer, None] = None) -> bool:
+        if not items:
+            return True
+        try:
+            pipe = self.aclient.pipeline(transaction=False)
+            for key, value in items.items():
+                self.local.discard(key)
+                pipe.setex(key, expire, self._dumps(value, serializer))
+            return all(await pipe.execute())
+        except Exception as e:
+            print(f"Cache mset error: {e}")
+            return False
+
+    async def adelete_many(self, keys: List[str]) -> int:
+        if not keys:
+            return 0
+        for key in keys:
+            self.local.discard(key)
+        try:
+            return await self.aclient.delete(*keys)
+        except Exception as e:
+            print(f"Cache delete error: {e}")
+            return 0
+
+    # Two-tier, single-flight loading. Values are stored with a metadata
+    # block holding "fresh_until", and outlive it in Redis by `stale` seconds.
+
+    @staticmethod
+    def _check_tags(entry: Tuple[Optional[Any], Optional[Dict[str, Any]]], tags: Tuple[str, ...],
+                    raw_versions: List[Optional[bytes]]):
+        """A miss (None, None) when any tag was invalidated after the entry was stored"""
+        value, meta = entry
+        if meta is not None and meta.get("tags", {}) != _tag_versions(tags, raw_versions):
+            return None, None
+        return value, meta
+
+    def _fetch(self, key: str, tags: Tuple[str, ...] = ()) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+        """Value and metadata, reading the entry and its tag versions in one round trip"""
+        try:
+            if not tags:
+                return self._decode(self.client.get(key))
+            raw = self.client.mget([key, *map(tag_key, tags)])
+            return self._check_tags(self._decode(raw[0]), tags, raw[1:])
+        except Exception as e:
+            print(f"Cache get error: {e}")
+            return None, None
+
+    async def _afetch(self, key: str, tags: Tuple[str, ...] = ()) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+        try:
+            if not tags:
+                return self._decode(await self.aclient.get(key))
+            raw = await self.aclient.mget([key, *map(tag_key, tags)])
+            return self._check_tags(self._decode(raw[0]), tags, raw[1:])
+        except Exception as e:
+            print(f"Cache get error: {e}")
+            return None, None
+
+    def _current_versions(self, tags: Tuple[str, ...]) -> Dict[str, int]:
+        if not tags:
+            return {}
+        try:
+            return _tag_versions(tags, self.client.mget([tag_key(tag) for tag in tags]))
+        except Exception as e:
+            print(f"Cache get error: {e}")
+            return {}
+
+    async def _acurrent_versions(self, tags: Tuple[str, ...]) -> Dict[str, int]:
+        if not tags:
+            return {}
+        try:
+            return _tag_versions(tags, await self.aclient.mget([tag_key(tag) for tag in tags]))
+        except Exception as e:
+            print(f"Cache get error: {e}")
+            return {}
+
+    def _drop_local_tags(self, tags: List[str]):
+        self._invalidations += 1
+        doomed = set(tags)
+        self.local.discard_matching(lambda entry: not doomed.isdisjoint(entry[1].get("tags", ())))
+
+    def invalidate_tags(self, tags: List[str]) -> bool:
+        """Invalidate every entry stored under any of `tags`, in one round trip.
+
+        This worker's in-process copies of those entries are dropped at
+        once; other workers' copies age out within CACHE_LOCAL_TTL.
+        """
+        self._drop_local_tags(tags)
+        if not tags:
+            return True
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for tag in tags:
+                pipe.incr(tag_key(tag))
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Cache invalidate error: {e}")
+            return False
+
+    async def ainvalidate_tags(self, tags: List[str]) -> bool:
+        self._drop_local_tags(tags)
+        if not tags:
+            return True
+        try:
+            pipe = self.aclient.pipeline(transaction=False)
+            for tag in tags:
+                pipe.incr(tag_key(tag))
+            await pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Cache invalidate error: {e}")
+            return False
+
+    def namespace(self, name: str, version: str = "") -> "CacheNamespace":
+        return CacheNamespace(self, name, version)
+
+    def _read(self, key: str, tags: Tuple[str, ...]) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+        value, meta = self._fetch(key, tags)
+        if not meta:
+            return None
+        self.local.put(key, (value, meta), self.local_ttl)
+        return value, meta
+
+    async def _aread(self, key: str, tags: Tuple[str, ...]) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+        value, meta = await self._afetch(key, tags)
+        if not meta:
+            return None
+        self.local.put(key, (value, meta), self.local_ttl)
+        return value, meta
+
+    def _encode_loaded(self, key: str, value: Any, policy: LoadPolicy,
+                       versions: Dict[str, int], invalidations: int) -> Tuple[bytes, int]:
+        """Encoded entry for a freshly loaded value and its Redis expiry.
+
+        The value is also kept locally, unless this process invalidated
+        tags while it loaded: the local tier does not re-check tag versions.
+        """
+        ttl = policy.expire * random.uniform(1 - CACHE_TTL_JITTER, 1 + CACHE_TTL_JITTER)
+        meta = {"fresh_until": time.time() + ttl}
+        if versions:
+            meta["tags"] = versions
+        data = self._dumps(value, policy.serializer, meta)
+        if not (policy.tags and invalidations != self._invalidations):
+            self.local.put(key, (value, meta), min(self.local_ttl, ttl))
+        return data, max(int(ttl + policy.stale), 1)
+
+    def _load_shared(self, key: str, loader: Callable[[], Any], policy: LoadPolicy) -> Any:
+        """Run the loader unless another worker already is; then wait for its result instead"""
+        lock_key, token = f"{key}:lock", uuid.uuid4().hex
+        try:
+            locked = bool(self.client.set(lock_key, token, nx=True, ex=CACHE_LOCK_TIMEOUT))
+        except Exception as e:
+            print(f"Cache lock error: {e}")
+            locked, token = True, None
+        if not locked:
+            deadline, delay = time.monotonic() + CACHE_LOCK_TIMEOUT, 0.05
+            while time.monotonic() < deadline:
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+                value, meta = self._fetch(key, policy.tags)
+                if _is_fresh(meta):
+                    self.local.put(key, (value, meta), self.local_ttl)
+                    return value
+                if not self.exists(lock_key):
+                    break  # the other loader failed; load it here
+        try:
+            # Read before loading: an invalidation during the load leaves the result already stale
+            invalidations = self._invalidations
+            versions = self._current_versions(policy.tags)
+            value = loader()
+            if value is not None:
+                # A value the serializer rejects is still returned, just not cached
+                try:
+                    data, redis_ttl = self._encode_loaded(key, value, policy, versions, invalidations)
+                    self.client.setex(key, redis_ttl, data)
+                except Exception as e:
+                    print(f"Cache set error: {e}")
+            return value
+        finally:
+            if token:
+                try:
+                    if self.client.get(lock_key) == token.encode():
+                        self.client.delete(lock_key)
+                except Exception as e:
+                    print(f"Cache unlock error: {e}")
+
+    async def _aload_shared(self, key: str, loader: Callable[[], Awaitable[Any]], policy: LoadPolicy) -> Any:
+        lock_key, token = f"{key}:lock", uuid.uuid4().hex
+        try:
+            locked = bool(await self.aclient.set(lock_key, token, nx=True, ex=CACHE_LOCK_TIMEOUT))
+        except Exception as e:
+            print(f"Cache lock error: {e}")
+            locked, token = True, None
+        if not locked:
+            deadline, delay = time.monotonic() + CACHE_LOCK_TIMEOUT, 0.05
+            while time.monotonic() < deadline:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 1.0)
+                value, meta = await self._afetch(key, policy.tags)
+                if _is_fresh(meta):
+                    self.local.put(key, (value, meta), self.local_ttl)
+                    return value
+                if not await self.aexists(lock_key):
+                    break
+        try:
+            invalidations = self._invalidations
+            versions = await self._acurrent_versions(policy.tags)
+            value = await loader()
+            if value is not None:
+                try:
+                    data, redis_ttl = self._encode_loaded(key, value, policy, versions, invalidations)
+                    await self.aclient.setex(key, redis_ttl, data)
+                except Exception as e:
+                    print(f"Cache set error: {e}")
+            return value
+        finally:
+            if token:
+                try:
+                    if await self.aclient.get(lock_key) == token.encode():
+                        await self.aclient.delete(lock_key)
+                except Exception as e:
+                    print(f"Cache unlock error: {e}")
+
+    def _join_flight(self, key: str) -> Tuple[Future, bool]:
+        """The key's in-process load, and whether the caller has just become its leader"""
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = Future()
+            return flight, True
+
+    def _lead(self, key: str, flight: Future, load: Callable[[], Any]) -> Any:
+        """Run `load` for a flight this thread leads, handing its outcome to every follower"""
+        try:
+            value = load()
+            flight.set_result(value)
+            return value
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+
+    def _load(self, key: str, loader: Callable[[], Any], policy: LoadPolicy) -> Any:
+        flight, leader = self._join_flight(key)
+        if not leader:
+            return flight.result()
+        return self._lead(key, flight, lambda: self._load_shared(key, loader, policy))
+
+    def _aload(self, key: str, loader: Callable[[], Awaitable[Any]], policy: LoadPolicy) -> asyncio.Task:
+        # The load runs as its own task, so a cancelled caller does not cancel it for the others
+        flight_key = (id(asyncio.get_running_loop()), key)
+        task = self._async_flights.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(self._aload_shared(key, loader, policy))
+            self._async_flights[flight_key] = task
+            task.add_done_callback(lambda _: self._async_flights.pop(flight_key, None))
+        return task
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Any], policy: LoadPolicy):
+        # Joined before the thread starts, so concurrent stale reads start one refresh between them
+        flight, leader = self._join_flight(key)
+        if not leader:
+            return
+
+        def load():
+            # Another worker may have refreshed it already
+            value, meta = self._fetch(key, policy.tags)
+            if _is_fresh(meta):
+                self.local.put(key, (value, meta), self.local_ttl)
+                return value
+            return self._load_shared(key, loader, policy)
+
+        def refresh():
+            try:
+                self._lead(key, flight, load)
+            except Exception as e:
+                print(f"Cache refresh error for {key}: {e}")
+        threading.Thread(target=refresh, name="cache-refresh", daemon=True).start()
+
+    def _arefresh_in_background(self, key: str, loader: Callable[[], Awaitable[Any]], policy: LoadPolicy):
+        if (id(asyncio.get_running_loop()), key) in self._async_flights:
+            return
+
+        async def refresh():
+            try:
+                value, meta = await self._afetch(key, policy.tags)
+                if _is_fresh(meta):
+                    self.local.put(key, (value, meta), self.local_ttl)
+                    return
+                await self._aload(key, loader, policy)
+            except Exception as e:
+                print(f"Cache refresh error for {key}: {e}")
+        task = asyncio.ensure_future(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], expire: int = 3600,
+                   stale: int = CACHE_STALE_TTL, serializer: Union[str, Serializer, None] = None,
+                   tags: Tuple[str, ...] = ()) -> Any:
+        """Cached value of `loader()`, computing it at most once at a time per key.
+
+        A value past its (jittered) TTL is returned as is for up to `stale`
+        more seconds while one background refresh replaces it. A loader
+        returning None is not cached; an exception it raises reaches every
+        caller waiting on the same load. `tags` are checked in the same
+        round trip as the value.
+        """
+        policy = LoadPolicy(expire, stale, serializer, tuple(tags))
+        entry = self._read(key, policy.tags)
+        if entry is not None:
+            if not _is_fresh(entry[1]):
+                self._refresh_in_background(key, loader, policy)
+            return entry[0]
+        return self._load(key, loader, policy)
+
+    async def aget_or_set(self, key: str, loader: Callable[[], Awaitable[Any]], expire: int = 3600,
+                          stale: int = CACHE_STALE_TTL, serializer: Union[str, Serializer, None] = None,
+                          tags: Tuple[str, ...] = ()) -> Any:
+        """get_or_set() for coroutine loaders, e.g. `lambda: llm.ainvoke(prompt)`"""
+        policy = LoadPolicy(expire, stale, serializer, tuple(tags))
+        entry = await self._aread(key, policy.tags)
+        if entry is not None:
+            if not _is_fresh(entry[1]):
+                self._arefresh_in_background(key, loader, policy)
+            return entry[0]
+        return await asyncio.shield(self._aload(key, loader, policy))
+
+class CacheNamespace:
+    """Keys under `name`, optionally pinned to a code-side version (model, prompt, parser).
+
+    Changing `version` moves to new keys; bump() invalidates every key in
+    the namespace at once, whatever its version.
+    """
+
+    def __init__(self, cache: Cache, name: str, version: str = ""):
+        self.cache = cache
+        self.name = name
+        self.version = version
+
+    @property
+    def tag(self) -> str:
+        return f"ns:{self.name}"
+
+    def key(self, key: str) -> str:
+        return f"{self.name}:{self.version}:{key}" if self.version else f"{self.name}:{key}"
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], tags: Tuple[str, ...] = (), **options) -> Any:
+        return self.cache.get_or_set(self.key(key), loader, tags=(self.tag, *tags), **options)
+
+    async def aget_or_set(self, key: str, loader: Callable[[], Awaitable[Any]], tags: Tuple[str, ...] = (), **options) -> Any:
+        return await self.cache.aget_or_set(self.key(key), loader, tags=(self.tag, *tags), **options)
+
+    def bump(self) -> bool:
+        return self.cache.invalidate_tags([self.tag])
+
+    async def abump(self) -> bool:
+        return await self.cache.ainvalidate_tags([self.tag])
+
 # Create cache instance
-cache = Cache() 
\ No newline at end of file
+cache = Cache()
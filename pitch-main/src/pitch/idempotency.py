@@ -0,0 +1,15 @@
+import hashlib
+import os
+from fastapi import UploadFile
+
+# How long an Idempotency-Key on POST /analyze maps back to its original job (both APIs)
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+async def request_fingerprint(startup_name: str, files: list[UploadFile]) -> str:
+    """Hash the parts of an /analyze request that must match on a retry"""
+    digest = hashlib.sha256(startup_name.encode())
+    for file in files:
+        digest.update(file.filename.encode())
+        digest.update(hashlib.sha256(await file.read()).digest())
+        await file.seek(0)
+    return digest.hexdigest()
@@ -1,10 +1,18 @@
-from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, start_http_server
 import time
 from functools import wraps
 import logging
 from logging.handlers import RotatingFileHandler
 import os
 from datetime import datetime
+from typing import Optional
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9464))  # start_metrics_server(); the API itself listens on 8000
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")  # route added by setup_metrics(); empty to skip it
+UNMATCHED_ROUTE = "<unmatched>"  # label for requests no route matches, so scanners can't explode label cardinality
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
 
 # Prometheus metrics
 REQUEST_COUNT = Counter(
@@ -16,7 +24,30 @@ REQUEST_COUNT = Counter(
 REQUEST_LATENCY = Histogram(
     'http_request_duration_seconds',
     'HTTP request latency',
-    ['method', 'endpoint']
+    ['method', 'endpoint', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+
+# By method only: a request's route is known once the app has routed it, after it started
+REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'HTTP requests currently being served',
+    ['method'],
+    multiprocess_mode='livesum'
+)
+
+REQUEST_SIZE = Histogram(
+    'http_request_size_bytes',
+    'HTTP request body size',
+    ['method', 'endpoint'],
+    buckets=SIZE_BUCKETS
+)
+
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes',
+    'HTTP response body size',
+    ['method', 'endpoint'],
+    buckets=SIZE_BUCKETS
 )
 
 ANALYSIS_COUNT = Counter(
@@ -64,36 +95,115 @@ def setup_logging():
 
     return root_logger
 
-# Initialize logger
-logger = setup_logging()
+# Importing this module (the apps do, for metrics) must not reconfigure logging;
+# entry points that want the rotating file log call setup_logging() themselves
+logger = logging.getLogger(__name__)
+
+def route_template(scope) -> str:
+    """The path template ("/decks/{deck_id}") of the route that handled an ASGI request.
+
+    FastAPI's router records the matched route (including those of included
+    routers) in the scope, so this is read after the app has run.
+    """
+    return getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, in-flight requests and body sizes.
+
+    Requests are labelled by method and route template rather than raw
+    path, so ids in URLs don't create new series. Written as plain ASGI
+    (not BaseHTTPMiddleware) so streaming responses pass straight through.
+    """
+
+    def __init__(self, app, excluded_paths=(METRICS_PATH,)):
+        self.app = app
+        self.excluded_paths = set(path for path in excluded_paths if path)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
 
-# Metrics decorator
-def track_metrics(endpoint: str):
+        method = scope["method"]
+        state = {"status": 500, "request_bytes": 0, "response_bytes": 0}
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["request_bytes"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method=method)
+        in_flight.inc()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            in_flight.dec()
+            endpoint = route_template(scope)
+            status = str(state["status"])
+            REQUEST_COUNT.labels(method=method, endpoint=endpoint, status=status).inc()
+            REQUEST_LATENCY.labels(method=method, endpoint=endpoint, status=status).observe(elapsed)
+            # Bodies an endpoint never reads still count, via Content-Length
+            request_bytes = state["request_bytes"]
+            if not request_bytes:
+                for name, value in scope.get("headers", ()):
+                    if name == b"content-length":
+                        request_bytes = int(value) if value.isdigit() else 0
+            REQUEST_SIZE.labels(method=method, endpoint=endpoint).observe(request_bytes)
+            RESPONSE_SIZE.labels(method=method, endpoint=endpoint).observe(state["response_bytes"])
+
+def metrics_registry():
+    """The default registry, or a multiprocess collector when workers share PROMETHEUS_MULTIPROC_DIR"""
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    from prometheus_client import multiprocess
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+async def metrics_endpoint(request):
+    """Prometheus scrape endpoint"""
+    from starlette.responses import Response
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
+
+def setup_metrics(app, path: str = METRICS_PATH):
+    """Record request metrics for `app` and serve them on `path` (or only via start_metrics_server() when empty)"""
+    app.add_middleware(MetricsMiddleware, excluded_paths=(path,))
+    if path:
+        app.add_route(path, metrics_endpoint, include_in_schema=False)
+
+# Metrics decorator, for handlers outside an app that uses MetricsMiddleware
+def track_metrics(endpoint: str, method: Optional[str] = None):
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
+            from starlette.requests import Request
+
+            # The HTTP method comes from the Request among the handler's arguments
+            request = next((arg for arg in (*args, *kwargs.values()) if isinstance(arg, Request)), None)
+            request_method = method or (request.method if request is not None else "UNKNOWN")
+            start_time = time.perf_counter()
+            status = 500
             try:
                 response = await func(*args, **kwargs)
                 status = response.status_code if hasattr(response, 'status_code') else 200
-                REQUEST_COUNT.labels(
-                    method=kwargs.get('method', 'GET'),
-                    endpoint=endpoint,
-                    status=status
-                ).inc()
                 return response
-            except Exception as e:
-                REQUEST_COUNT.labels(
-                    method=kwargs.get('method', 'GET'),
-                    endpoint=endpoint,
-                    status=500
-                ).inc()
-                raise e
             finally:
+                REQUEST_COUNT.labels(method=request_method, endpoint=endpoint, status=str(status)).inc()
                 REQUEST_LATENCY.labels(
-                    method=kwargs.get('method', 'GET'),
-                    endpoint=endpoint
-                ).observe(time.time() - start_time)
+                    method=request_method,
+                    endpoint=endpoint,
+                    status=str(status)
+                ).observe(time.perf_counter() - start_time)
         return wrapper
     return decorator
 
@@ -134,7 +244,7 @@ async def check_system_health():
     return health_status
 
 # Start Prometheus metrics server
-def start_metrics_server(port: int = 8000):
-    """Start Prometheus metrics server"""
-    start_http_server(port)
+def start_metrics_server(port: int = METRICS_PORT):
+    """Start Prometheus metrics server on its own port"""
+    start_http_server(port, registry=metrics_registry())
     logger.info(f"Metrics server started on port {port}") 
\ No newline at end of file
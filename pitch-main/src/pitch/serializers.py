@@ -0,0 +1,128 @@
+import importlib.util
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, Optional, Tuple, Union
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CACHE_SERIALIZER = os.getenv("CACHE_SERIALIZER", "json")  # default for Cache values: "json", "msgpack" or "float32"
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 1024))  # 0 disables compression
+CACHE_COMPRESS_LEVEL = int(os.getenv("CACHE_COMPRESS_LEVEL", 3))
+
+# Encoded values start with MAGIC (0xc1 begins no JSON text and is unused in msgpack),
+# then one byte: serializer id in the high nibble, FLAG_* bits in the low one.
+# Anything else is a value written by older code as plain JSON.
+MAGIC = 0xC1
+FLAG_ZLIB = 0x1
+FLAG_META = 0x2  # a uint32-length-prefixed JSON metadata block precedes the payload
+META_LENGTH = struct.Struct("<I")
+
+class Serializer:
+    format_id = 0
+    name = ""
+    requires = ""  # optional package the serializer imports on use
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+class JSONSerializer(Serializer):
+    """orjson when installed (several times faster, numpy aware), else the json module.
+
+    Non-string dict keys are stringified, as json.dumps does.
+    """
+    format_id = 1
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+
+class MsgpackSerializer(Serializer):
+    """Binary and compact for nested values; bytes round-trip as bytes"""
+    format_id = 2
+    name = "msgpack"
+    requires = "msgpack"
+
+    def dumps(self, value: Any) -> bytes:
+        import msgpack
+        return msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        import msgpack
+        return msgpack.unpackb(data, raw=False)
+
+class Float32Serializer(Serializer):
+    """Vectors and matrices as raw float32 buffers; read back as (nested) lists"""
+    format_id = 3
+    name = "float32"
+
+    def dumps(self, value: Any) -> bytes:
+        array = np.ascontiguousarray(value, dtype=np.float32)
+        return struct.pack(f"<B{array.ndim}I", array.ndim, *array.shape) + array.tobytes()
+
+    def loads(self, data: bytes) -> Any:
+        ndim = data[0]
+        shape = struct.unpack_from(f"<{ndim}I", data, 1)
+        return np.frombuffer(data, dtype=np.float32, offset=1 + 4 * ndim).reshape(shape).tolist()
+
+SERIALIZERS: Dict[str, Serializer] = {
+    serializer.name: serializer for serializer in (JSONSerializer(), MsgpackSerializer(), Float32Serializer())
+}
+_by_id = {serializer.format_id: serializer for serializer in SERIALIZERS.values()}
+_meta_serializer = SERIALIZERS["json"]
+
+def get_serializer(serializer: Union[str, Serializer, None] = None) -> Serializer:
+    """A serializer by name (CACHE_SERIALIZER by default); ImportError if its package is missing"""
+    if not isinstance(serializer, Serializer):
+        serializer = SERIALIZERS[serializer or CACHE_SERIALIZER]
+    if serializer.requires and importlib.util.find_spec(serializer.requires) is None:
+        raise ImportError(f"The {serializer.name} serializer needs the {serializer.requires} package")
+    return serializer
+
+def encode(value: Any, serializer: Union[str, Serializer, None] = None, meta: Optional[Dict[str, Any]] = None,
+           compress_min_bytes: int = CACHE_COMPRESS_MIN_BYTES) -> bytes:
+    """Header + (optional metadata) + payload, zlib-compressed above compress_min_bytes"""
+    serializer = get_serializer(serializer)
+    flags = 0
+    prefix = b""
+    if meta is not None:
+        packed_meta = _meta_serializer.dumps(meta)
+        prefix = META_LENGTH.pack(len(packed_meta)) + packed_meta
+        flags |= FLAG_META
+    payload = serializer.dumps(value)
+    if compress_min_bytes and len(payload) >= compress_min_bytes:
+        compressed = zlib.compress(payload, CACHE_COMPRESS_LEVEL)
+        if len(compressed) < len(payload):
+            payload = compressed
+            flags |= FLAG_ZLIB
+    return bytes((MAGIC, serializer.format_id << 4 | flags)) + prefix + payload
+
+def decode(data: bytes) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """(value, metadata or None) from encode() output or legacy JSON text"""
+    if not data or data[0] != MAGIC:
+        return json.loads(data), None
+    serializer = _by_id[data[1] >> 4]
+    flags = data[1] & 0xF
+    offset, meta = 2, None
+    if flags & FLAG_META:
+        (length,) = META_LENGTH.unpack_from(data, offset)
+        offset += META_LENGTH.size
+        meta = _meta_serializer.loads(data[offset:offset + length])
+        offset += length
+    payload = data[offset:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    return serializer.loads(payload), meta
@@ -0,0 +1,91 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+# A section is (page or slide number, text); the number is None for plain text
+Section = Tuple[Optional[int], str]
+
+SECTION_HEADER = re.compile(r"^(?:Page|Slide) (\d+):$", re.MULTILINE)
+
+KNOWLEDGE_EXTENSIONS = [".txt", ".md", ".pdf", ".ppt", ".pptx", ".docx"]
+
+def parse_pdf_pages(file_path: str) -> List[Section]:
+    """Extract the text of each non-empty PDF page"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    pages = []
+    for i, page in enumerate(reader.pages):
+        page_text = page.extract_text() or ""
+        if page_text.strip():
+            pages.append((i + 1, page_text))
+    return pages
+
+def parse_ppt_slides(file_path: str) -> List[Section]:
+    """Extract the text of each non-empty slide"""
+    from pptx import Presentation
+
+    prs = Presentation(file_path)
+    slides = []
+    for i, slide in enumerate(prs.slides):
+        slide_text = [
+            shape.text for shape in slide.shapes
+            if hasattr(shape, "text") and shape.text.strip()
+        ]
+        if slide_text:
+            slides.append((i + 1, " ".join(slide_text)))
+    return slides
+
+def parse_docx(file_path: str) -> List[Section]:
+    """Extract the paragraphs and table rows of a Word document as one section"""
+    from docx import Document
+
+    document = Document(file_path)
+    lines = [paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()]
+    for table in document.tables:
+        for row in table.rows:
+            cells = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+            if cells:
+                lines.append(" | ".join(cells))
+    return [(None, "\n".join(lines))] if lines else []
+
+def extract_sections(file_path: str) -> List[Section]:
+    """Extract per-page (PDF) or per-slide (PPT/PPTX) text from a deck"""
+    file_ext = os.path.splitext(file_path.lower())[1]
+    if file_ext == ".pdf":
+        return parse_pdf_pages(file_path)
+    if file_ext in [".ppt", ".pptx"]:
+        return parse_ppt_slides(file_path)
+    raise ValueError(f"Unsupported file format: {file_ext}. Only PDF and PPT/PPTX are supported.")
+
+def split_sections(text: str) -> List[Section]:
+    """Recover sections from text rendered with "Page N:"/"Slide N:" headers.
+
+    Text without such headers comes back as a single unnumbered section.
+    """
+    headers = list(SECTION_HEADER.finditer(text))
+    if not headers:
+        return [(None, text)] if text.strip() else []
+
+    sections = []
+    preamble = text[:headers[0].start()]
+    if preamble.strip():
+        sections.append((None, preamble))
+    for header, following in zip(headers, headers[1:] + [None]):
+        end = following.start() if following else len(text)
+        body = text[header.end():end]
+        if body.strip():
+            sections.append((int(header.group(1)), body.strip()))
+    return sections
+
+def extract_knowledge_sections(file_path: str) -> List[Section]:
+    """Sections of a knowledge file: decks by page/slide, Word and text files as a whole"""
+    file_ext = os.path.splitext(file_path.lower())[1]
+    if file_ext in [".pdf", ".ppt", ".pptx"]:
+        return extract_sections(file_path)
+    if file_ext == ".docx":
+        return parse_docx(file_path)
+    if file_ext in [".txt", ".md"]:
+        with open(file_path, "rb") as f:
+            return split_sections(f.read().decode("utf-8", errors="replace"))
+    raise ValueError(f"Unsupported knowledge file format: {file_ext}")
@@ -1,13 +1,21 @@
 from crewai.tools import BaseTool
 from typing import Type, List, Union
 from pydantic import BaseModel, Field
-from pypdf import PdfReader
-from pptx import Presentation
-import requests
-from bs4 import BeautifulSoup
+from .deck_parser import parse_pdf_pages, parse_ppt_slides
+from .web_fetch import WEB_CONNECT_TIMEOUT, WEB_READ_TIMEOUT, get_page_fetcher
+from .http_cache import cached_request
+from .html_extract import extract_main_content
+from urllib.parse import urlencode
+import hashlib
 import json
 import os
 
+# Result pages that must load before slower ones are abandoned
+WEB_PAGES_NEEDED = int(os.getenv("WEB_PAGES_NEEDED", 3))
+PARSE_CACHE = os.getenv("PARSE_CACHE", "1") == "1"
+PARSE_CACHE_TTL = int(os.getenv("PARSE_CACHE_TTL", 24 * 60 * 60))
+PARSE_CACHE_VERSION = "1"  # bump when parser output changes
+
 class ParseDocumentInput(BaseModel):
     """Input schema for document parsing tool."""
     file_paths: Union[str, List[str]] = Field(..., description="Path or list of paths to document files to parse")
@@ -48,11 +56,12 @@ class DocumentParserTool(BaseTool):
                 # Check file extension
                 file_ext = os.path.splitext(abs_file_path.lower())[1]
                 if file_ext == '.pdf':
-                    text = self._parse_pdf(abs_file_path)
+                    parse = self._parse_pdf
                 elif file_ext in ['.ppt', '.pptx']:
-                    text = self._parse_ppt(abs_file_path)
+                    parse = self._parse_ppt
                 else:
                     raise ValueError(f"Unsupported file format: {file_ext}. Only PDF and PPT/PPTX are supported.")
+                text = self._cached_parse(abs_file_path, parse)
                 
                 # Add file header and content
                 file_name = os.path.basename(file_path)
@@ -78,30 +87,28 @@ class DocumentParserTool(BaseTool):
         result.extend(all_text)
         return "\n\n".join(result)
 
+    def _cached_parse(self, file_path: str, parse) -> str:
+        # Several agents parse the same deck; key by content so renamed re-uploads hit too
+        if not PARSE_CACHE:
+            return parse(file_path)
+        from ..cache import cache
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return cache.namespace("parse", PARSE_CACHE_VERSION).get_or_set(
+            digest.hexdigest(), lambda: parse(file_path), expire=PARSE_CACHE_TTL
+        )
+
     def _parse_pdf(self, file_path: str) -> str:
         try:
-            reader = PdfReader(file_path)
-            text = []
-            for i, page in enumerate(reader.pages):
-                page_text = page.extract_text()
-                if page_text.strip():  # Only include non-empty pages
-                    text.append(f"Page {i+1}:\n{page_text}")
-            return "\n\n".join(text)
+            return "\n\n".join(f"Page {page}:\n{text}" for page, text in parse_pdf_pages(file_path))
         except Exception as e:
             raise ValueError(f"Error parsing PDF: {str(e)}")
 
     def _parse_ppt(self, file_path: str) -> str:
         try:
-            prs = Presentation(file_path)
-            text = []
-            for i, slide in enumerate(prs.slides):
-                slide_text = []
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        slide_text.append(shape.text)
-                if slide_text:  # Only include slides with content
-                    text.append(f"Slide {i+1}:\n{' '.join(slide_text)}")
-            return "\n\n".join(text)
+            return "\n\n".join(f"Slide {slide}:\n{text}" for slide, text in parse_ppt_slides(file_path))
         except Exception as e:
             raise ValueError(f"Error parsing PPT/PPTX: {str(e)}")
 
@@ -127,27 +134,32 @@ class WebResearchTool(BaseTool):
                 "mkt": "en-US"
             }
             
-            response = requests.get(search_url, headers=headers, params=params)
-            results = response.json()
+            response = cached_request("GET", f"{search_url}?{urlencode(params)}", headers=headers,
+                                      timeout=(WEB_CONNECT_TIMEOUT, WEB_READ_TIMEOUT))
+            results = json.loads(response["body"])
             
             if "webPages" in results:
                 pages = results["webPages"]["value"]
                 research_results = []
                 
-                for page in pages:
+                # Fetch all pages at once over the shared connection pool; stop
+                # waiting once WEB_PAGES_NEEDED of them have loaded
+                fetched = get_page_fetcher().fetch_many_sync(
+                    [page["url"] for page in pages], enough=min(WEB_PAGES_NEEDED, len(pages))
+                )
+                for page, page_response in zip(pages, fetched):
+                    if page_response is None or page_response["status"] >= 400:
+                        continue
                     try:
-                        # Get the webpage content
-                        page_response = requests.get(page["url"])
-                        soup = BeautifulSoup(page_response.text, 'html.parser')
-                        
-                        # Extract main content (this is a simple example)
-                        content = " ".join([p.get_text() for p in soup.find_all('p')])
+                        # Parses only as much of the page as it takes to fill WEB_CONTENT_CHARS
+                        extracted = extract_main_content(page_response["text"], base_url=page_response["url"])
                         
                         research_results.append({
                             "title": page["name"],
-                            "url": page["url"],
+                            "url": extracted["canonical_url"] or page["url"],
+                            "published": extracted["date"],
                             "snippet": page["snippet"],
-                            "content": content[:500]  # First 500 chars of content
+                            "content": extracted["text"]
                         })
                     except Exception as e:
                         continue
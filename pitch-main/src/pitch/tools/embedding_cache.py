@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+import numpy as np
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+
+# "sqlite" (local file), "redis" (shared across workers) or "none"
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "sqlite")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("cache", "embeddings.sqlite"))
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", 30 * 24 * 60 * 60))  # Redis only
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFKC with collapsed whitespace"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+def embedding_key(model: str, kind: str, text: str) -> str:
+    digest = hashlib.sha256(f"{model}\0{kind}\0{normalize_text(text)}".encode()).hexdigest()
+    return f"emb:{digest}"
+
+class EmbeddingStore:
+    """Byte store for cached vectors with batch get/set"""
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        raise NotImplementedError
+
+    def mset(self, items: Dict[str, bytes]) -> None:
+        raise NotImplementedError
+
+    async def amget(self, keys: List[str]) -> List[Optional[bytes]]:
+        return await asyncio.to_thread(self.mget, keys)
+
+    async def amset(self, items: Dict[str, bytes]) -> None:
+        await asyncio.to_thread(self.mset, items)
+
+class SQLiteEmbeddingStore(EmbeddingStore):
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                )
+                found.update(rows)
+        return [found.get(key) for key in keys]
+
+    def mset(self, items: Dict[str, bytes]) -> None:
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", items.items())
+            self._conn.commit()
+
+class RedisEmbeddingStore(EmbeddingStore):
+    """Embeddings in Redis under a TTL.
+
+    The async methods use `async_client` when given. Without one they use
+    the shared per-loop client when `client` is the shared one too, and
+    otherwise run the sync methods in a thread, so both paths always reach
+    the same server.
+    """
+
+    def __init__(self, client=None, async_client=None, ttl: int = EMBEDDING_CACHE_TTL):
+        self._shared = client is None
+        if client is None:
+            from ..cache import redis_client
+            client = redis_client
+        self.client = client
+        self.async_client = async_client
+        self.ttl = ttl
+
+    def _aclient(self):
+        if self.async_client is not None:
+            return self.async_client
+        if self._shared:
+            from ..cache import get_async_redis
+            return get_async_redis()
+        return None
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        try:
+            return self.client.mget(keys) if keys else []
+        except Exception as e:
+            print(f"Embedding cache get error: {e}")
+            return [None] * len(keys)
+
+    def mset(self, items: Dict[str, bytes]) -> None:
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.setex(key, self.ttl, value)
+            pipe.execute()
+        except Exception as e:
+            print(f"Embedding cache set error: {e}")
+
+    async def amget(self, keys: List[str]) -> List[Optional[bytes]]:
+        client = self._aclient()
+        if client is None:
+            return await super().amget(keys)
+        try:
+            return await client.mget(keys) if keys else []
+        except Exception as e:
+            print(f"Embedding cache get error: {e}")
+            return [None] * len(keys)
+
+    async def amset(self, items: Dict[str, bytes]) -> None:
+        client = self._aclient()
+        if client is None:
+            await super().amset(items)
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.setex(key, self.ttl, value)
+            await pipe.execute()
+        except Exception as e:
+            print(f"Embedding cache set error: {e}")
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the embedding API.
+
+    Keys combine the embedding model, whether the text was embedded as a
+    document or a query, and a hash of the normalized text.
+    """
+
+    def __init__(self, underlying: Embeddings, store: EmbeddingStore, model: Optional[str] = None):
+        self.underlying = underlying
+        self.store = store
+        self.model = model or getattr(underlying, "model", type(underlying).__name__)
+
+    def _keys(self, kind: str, texts: List[str]) -> List[str]:
+        return [embedding_key(self.model, kind, text) for text in texts]
+
+    @staticmethod
+    def _resolve(keys: List[str], texts: List[str], cached: List[Optional[bytes]]):
+        vectors = [np.frombuffer(value, dtype=np.float32).tolist() if value else None for value in cached]
+        # Identical texts in one batch are embedded once
+        missing: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        return vectors, missing
+
+    @staticmethod
+    def _merge(keys, vectors, missing: Dict[str, str], embedded: List[List[float]]):
+        fresh = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, embedded)}
+        # Return the stored float32 values so hits and misses are identical
+        merged = [vector if vector is not None else fresh[key].tolist() for key, vector in zip(keys, vectors)]
+        return merged, {key: vector.tobytes() for key, vector in fresh.items()}
+
+    def _embed(self, kind: str, texts: List[str], embed) -> List[List[float]]:
+        keys = self._keys(kind, texts)
+        vectors, missing = self._resolve(keys, texts, self.store.mget(keys))
+        if not missing:
+            return vectors
+        merged, stored = self._merge(keys, vectors, missing, embed(list(missing.values())))
+        self.store.mset(stored)
+        return merged
+
+    async def _aembed(self, kind: str, texts: List[str], aembed) -> List[List[float]]:
+        keys = self._keys(kind, texts)
+        vectors, missing = self._resolve(keys, texts, await self.store.amget(keys))
+        if not missing:
+            return vectors
+        merged, stored = self._merge(keys, vectors, missing, await aembed(list(missing.values())))
+        await self.store.amset(stored)
+        return merged
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("document", texts, self.underlying.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text], lambda texts: [self.underlying.embed_query(texts[0])])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed("document", texts, self.underlying.aembed_documents)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        async def aembed(texts):
+            return [await self.underlying.aembed_query(texts[0])]
+        return (await self._aembed("query", [text], aembed))[0]
+
+_shared_embeddings: Optional[Embeddings] = None
+_shared_lock = threading.Lock()
+
+def get_embeddings() -> Embeddings:
+    """Process-wide OpenAI embeddings behind the configured cache"""
+    global _shared_embeddings
+    with _shared_lock:
+        if _shared_embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+
+            embeddings = OpenAIEmbeddings()
+            if EMBEDDING_CACHE == "sqlite":
+                embeddings = CachedEmbeddings(embeddings, SQLiteEmbeddingStore())
+            elif EMBEDDING_CACHE == "redis":
+                embeddings = CachedEmbeddings(embeddings, RedisEmbeddingStore())
+            _shared_embeddings = embeddings
+        return _shared_embeddings
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+WEB_DOMAIN_CONCURRENCY = int(os.getenv("WEB_DOMAIN_CONCURRENCY", 2))  # requests in flight per domain
+WEB_DOMAIN_RATE = float(os.getenv("WEB_DOMAIN_RATE", 2))  # request starts per second per domain
+WEB_BACKOFF_BASE = float(os.getenv("WEB_BACKOFF_BASE", 2))  # seconds after the first 429/503, doubled per repeat
+WEB_BACKOFF_MAX = float(os.getenv("WEB_BACKOFF_MAX", 60))
+WEB_RESPECT_ROBOTS = os.getenv("WEB_RESPECT_ROBOTS", "1") == "1"
+WEB_ROBOTS_AGENT = os.getenv("WEB_ROBOTS_AGENT", "PitchAnalyzer")  # product token matched against robots.txt groups
+WEB_ROBOTS_TTL = int(os.getenv("WEB_ROBOTS_TTL", 24 * 60 * 60))
+WEB_MAX_CRAWL_DELAY = float(os.getenv("WEB_MAX_CRAWL_DELAY", 10))  # cap on a site's Crawl-delay
+
+def domain_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (seconds or an HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+class DomainState:
+    def __init__(self, concurrency: int, interval: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = interval
+        self.next_start = 0.0
+        self.backoff_until = 0.0
+        self.failures = 0
+
+class DomainScheduler:
+    """Per-domain concurrency limit, request spacing and backoff.
+
+    Each domain gets `concurrency` slots and at most `rate` request starts
+    per second. After a 429/503 the domain is paused (Retry-After, or an
+    exponential backoff) for every caller, not just the one that was
+    throttled. Must be used from a single event loop.
+    """
+
+    def __init__(self, concurrency: int = WEB_DOMAIN_CONCURRENCY, rate: float = WEB_DOMAIN_RATE,
+                 backoff_base: float = WEB_BACKOFF_BASE, backoff_max: float = WEB_BACKOFF_MAX):
+        self.concurrency = concurrency
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._domains: Dict[str, DomainState] = {}
+
+    def _state(self, domain: str) -> DomainState:
+        state = self._domains.get(domain)
+        if state is None:
+            state = self._domains[domain] = DomainState(self.concurrency, self.interval)
+        return state
+
+    def set_crawl_delay(self, domain: str, delay: float):
+        state = self._state(domain)
+        state.interval = max(self.interval, min(delay, WEB_MAX_CRAWL_DELAY))
+
+    async def _wait_turn(self, state: DomainState):
+        while True:
+            now = time.monotonic()
+            start = max(state.next_start, state.backoff_until)
+            if start <= now:
+                state.next_start = now + state.interval
+                return
+            await asyncio.sleep(start - now)
+
+    def slot(self, domain: str) -> "_Slot":
+        """async with scheduler.slot(domain): ... one request to the domain"""
+        return _Slot(self, self._state(domain))
+
+    def throttled(self, domain: str, retry_after: Optional[float] = None) -> float:
+        """Record a 429/503; returns the pause applied to the domain"""
+        state = self._state(domain)
+        state.failures += 1
+        delay = retry_after if retry_after is not None else self.backoff_base * 2 ** (state.failures - 1)
+        delay = min(delay, self.backoff_max)
+        state.backoff_until = max(state.backoff_until, time.monotonic() + delay)
+        return delay
+
+    def succeeded(self, domain: str):
+        self._state(domain).failures = 0
+
+class _Slot:
+    def __init__(self, scheduler: DomainScheduler, state: DomainState):
+        self.scheduler = scheduler
+        self.state = state
+
+    async def __aenter__(self):
+        await self.state.semaphore.acquire()
+        try:
+            await self.scheduler._wait_turn(self.state)
+        except BaseException:
+            self.state.semaphore.release()
+            raise
+
+    async def __aexit__(self, *exc):
+        self.state.semaphore.release()
+
+class RobotsCache:
+    """robots.txt rules per domain, fetched once and kept for WEB_ROBOTS_TTL.
+
+    `fetch` is a coroutine returning (status, text) for a robots.txt URL.
+    Concurrent checks for a domain share one fetch. Following RFC 9309, a
+    missing robots.txt (4xx) allows everything and 401/403 disallow
+    everything. Unreachable sites are allowed and retried after a minute,
+    so a flaky robots.txt does not empty the research results.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Tuple[int, str]]], scheduler: Optional[DomainScheduler] = None,
+                 agent: str = WEB_ROBOTS_AGENT, ttl: int = WEB_ROBOTS_TTL):
+        self.fetch = fetch
+        self.scheduler = scheduler
+        self.agent = agent
+        self.ttl = ttl
+        self._rules: Dict[str, Tuple[RobotFileParser, float]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    async def _load(self, scheme: str, domain: str) -> RobotFileParser:
+        parser = RobotFileParser()
+        ttl = self.ttl
+        try:
+            status, text = await self.fetch(f"{scheme}://{domain}/robots.txt")
+            if status in (401, 403):
+                parser.disallow_all = True
+            elif status >= 500:
+                parser.allow_all, ttl = True, 60
+            elif status >= 400:
+                parser.allow_all = True
+            else:
+                parser.parse(text.splitlines())
+                delay = parser.crawl_delay(self.agent)
+                if delay and self.scheduler:
+                    self.scheduler.set_crawl_delay(domain, float(delay))
+        except Exception as e:
+            print(f"robots.txt fetch error for {domain}: {e!r}")
+            parser.allow_all, ttl = True, 60
+        self._rules[domain] = (parser, time.monotonic() + ttl)
+        return parser
+
+    async def allowed(self, url: str) -> bool:
+        parts = urlsplit(url)
+        domain = parts.netloc.lower()
+        cached = self._rules.get(domain)
+        if cached and cached[1] > time.monotonic():
+            parser = cached[0]
+        else:
+            pending = self._pending.get(domain)
+            if pending is None:
+                pending = self._pending[domain] = asyncio.ensure_future(self._load(parts.scheme or "https", domain))
+                pending.add_done_callback(lambda _: self._pending.pop(domain, None))
+            parser = await asyncio.shield(pending)
+        return parser.can_fetch(self.agent, url)
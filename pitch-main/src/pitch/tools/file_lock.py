@@ -0,0 +1,38 @@
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so a single worker is assumed
+    fcntl = None
+
+class FileLock:
+    """Exclusive advisory lock on `path` (created if missing), held across processes on the host.
+
+    Use as a context manager, or acquire()/release() when the lock is
+    taken from a worker thread or must not wait.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._handle = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        handle = open(self.path, "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                return False
+        self._handle = handle
+        return True
+
+    def release(self):
+        handle, self._handle = self._handle, None
+        if handle is not None:
+            handle.close()  # closing the descriptor drops the lock
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,105 @@
+import os
+import re
+from typing import Any, Dict, Optional, Union
+from urllib.parse import urljoin
+from lxml import etree
+
+WEB_CONTENT_CHARS = int(os.getenv("WEB_CONTENT_CHARS", 500))  # main-content text kept per page
+FEED_CHUNK_BYTES = 16 * 1024
+MIN_PARAGRAPH_CHARS = 25  # shorter <p>s are usually bylines, captions or "Share this" links
+
+# Subtrees that never hold main content
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "nav", "header", "footer", "aside", "form"}
+CONTENT_TAGS = {"p"}
+DATE_META = {"article:published_time", "og:published_time", "date", "dc.date", "pubdate", "publishdate", "datepublished"}
+WHITESPACE = re.compile(r"\s+")
+
+def _clean(text: str) -> str:
+    return WHITESPACE.sub(" ", text).strip()
+
+def extract_main_content(html: Union[str, bytes], base_url: Optional[str] = None,
+                         max_chars: int = WEB_CONTENT_CHARS, encoding: Optional[str] = None) -> Dict[str, Any]:
+    """Title, date, canonical URL and main paragraph text of an HTML page.
+
+    The page is fed to lxml's pull parser in chunks and parsing stops once
+    `max_chars` of paragraph text have been collected, so the rest of a long
+    page is never parsed. Paragraphs inside script, style, nav, header,
+    footer, aside and form subtrees are skipped, and finished elements are
+    cleared as the parse goes to keep memory flat.
+
+    Returns {"title", "date", "canonical_url", "text", "truncated"}.
+    """
+    if isinstance(html, str):
+        html, encoding = html.encode("utf-8"), "utf-8"
+    parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding, recover=True, no_network=True)
+    result = {"title": None, "date": None, "canonical_url": None, "text": "", "truncated": False}
+    paragraphs, length = [], 0
+    skip_depth = content_depth = 0
+
+    def handle(event: str, element) -> bool:
+        """Process one parse event; True once enough text has been collected"""
+        nonlocal skip_depth, content_depth, length
+        tag = element.tag if isinstance(element.tag, str) else ""
+        if event == "start":
+            if tag in SKIPPED_TAGS:
+                skip_depth += 1
+            elif tag in CONTENT_TAGS:
+                content_depth += 1
+            elif tag == "meta":
+                key = (element.get("property") or element.get("name") or element.get("itemprop") or "").lower()
+                if key in DATE_META and not result["date"]:
+                    result["date"] = element.get("content")
+                elif key == "og:title" and not result["title"]:
+                    result["title"] = _clean(element.get("content") or "") or None
+                elif key == "og:url" and not result["canonical_url"]:
+                    result["canonical_url"] = element.get("content")
+            elif tag == "link" and "canonical" in (element.get("rel") or "").lower().split():
+                result["canonical_url"] = element.get("href")
+            elif tag == "time" and not result["date"]:
+                result["date"] = element.get("datetime")
+            return False
+
+        if tag in SKIPPED_TAGS:
+            skip_depth -= 1
+        elif tag == "title" and not result["title"]:
+            result["title"] = _clean(element.text or "") or None
+        elif tag in CONTENT_TAGS:
+            content_depth -= 1
+            if skip_depth == 0:
+                text = _clean("".join(element.itertext()))
+                if len(text) >= MIN_PARAGRAPH_CHARS:
+                    paragraphs.append(text)
+                    length += len(text) + 1
+        if content_depth == 0:
+            # Nothing reads a finished element again, except <p> text from its children
+            element.clear(keep_tail=False)
+            parent = element.getparent()
+            while parent is not None and element.getprevious() is not None:
+                del parent[0]
+        return length > max_chars
+
+    done = False
+    for start in range(0, len(html), FEED_CHUNK_BYTES):
+        parser.feed(html[start:start + FEED_CHUNK_BYTES])
+        for event, element in parser.read_events():
+            if handle(event, element):
+                done = True
+                break
+        if done:
+            break
+    if not done:
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            pass  # e.g. an empty document
+        for event, element in parser.read_events():
+            if handle(event, element):
+                done = True
+                break
+
+    text = " ".join(paragraphs)
+    result["truncated"] = done or len(text) > max_chars
+    result["text"] = text[:max_chars]
+    if result["canonical_url"] and base_url:
+        result["canonical_url"] = urljoin(base_url, result["canonical_url"])
+    return result
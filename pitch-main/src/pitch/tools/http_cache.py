@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+WEB_CACHE = os.getenv("WEB_CACHE", "1") == "1"
+WEB_CACHE_PATH = os.getenv("WEB_CACHE_PATH", os.path.join("cache", "http.sqlite"))
+WEB_CACHE_MAX_BYTES = int(os.getenv("WEB_CACHE_MAX_BYTES", 256 * 1024 * 1024))  # compressed bodies
+WEB_CACHE_TTL = int(os.getenv("WEB_CACHE_TTL", 6 * 60 * 60))  # when the response sets no lifetime
+
+MAX_AGE = re.compile(r"(?:s-maxage|max-age)\s*=\s*(\d+)")
+
+def cache_key(method: str, url: str, body: Optional[bytes] = None) -> str:
+    """Responses are keyed by URL; request bodies (e.g. search API POSTs) are part of the key"""
+    if method.upper() == "GET" and not body:
+        return url
+    return f"{method.upper()} {url} {hashlib.sha256(body or b'').hexdigest()}"
+
+def freshness_lifetime(headers: Dict[str, str], default_ttl: int) -> Optional[float]:
+    """Seconds a response stays fresh, 0 to always revalidate, None if it must not be stored"""
+    headers = {name.lower(): value for name, value in headers.items()}
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0
+    max_age = MAX_AGE.search(cache_control)
+    if max_age:
+        return float(max_age.group(1))
+    if "expires" in headers:
+        try:
+            return max(parsedate_to_datetime(headers["expires"]).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return 0
+    return default_ttl
+
+class HTTPCache:
+    """On-disk HTTP response cache with revalidation and size-bounded LRU eviction.
+
+    Bodies are zlib-compressed in a SQLite file. Fresh entries are served
+    without a request; stale ones that carry an ETag or Last-Modified are
+    revalidated with a conditional request, and a 304 renews them.
+    """
+
+    def __init__(self, path: str = WEB_CACHE_PATH, max_bytes: int = WEB_CACHE_MAX_BYTES, default_ttl: int = WEB_CACHE_TTL):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # a lost write only costs a refetch
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT, body BLOB, size INTEGER, "
+            "etag TEXT, last_modified TEXT, fresh_until REAL, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_last_access ON responses (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached response as {"url", "status", "headers", "body", "fresh", "etag", "last_modified"}"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, etag, last_modified, fresh_until FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        url, status, headers, body, etag, last_modified, fresh_until = row
+        return {
+            "url": url,
+            "status": status,
+            "headers": json.loads(headers),
+            "body": zlib.decompress(body),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": fresh_until > time.time(),
+        }
+
+    @staticmethod
+    def revalidation_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, key: str, url: str, status: int, headers: Dict[str, str], body: bytes, ttl: Optional[float] = None) -> bool:
+        """Store a response; returns False when its headers forbid caching"""
+        lifetime = freshness_lifetime(headers, self.default_ttl) if ttl is None else ttl
+        if lifetime is None:
+            return False
+        lowered = {name.lower(): value for name, value in headers.items()}
+        # The stored body is already decoded and re-compressed by us
+        stored_headers = {name: value for name, value in lowered.items() if name not in ("content-encoding", "content-length", "transfer-encoding")}
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(stored_headers), compressed, len(compressed),
+                 lowered.get("etag"), lowered.get("last-modified"), now + lifetime, now),
+            )
+            self._total_bytes += len(compressed) - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+        return True
+
+    def refresh(self, key: str, headers: Dict[str, str], ttl: Optional[float] = None):
+        """Renew an entry after a 304 Not Modified"""
+        lifetime = freshness_lifetime(headers, self.default_ttl) if ttl is None else ttl
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET fresh_until = ?, last_access = ? WHERE key = ?",
+                (time.time() + (lifetime or 0), time.time(), key),
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is back under 90% of its budget"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access")
+        doomed = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            doomed.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+_shared_cache: Optional[HTTPCache] = None
+_shared_lock = threading.Lock()
+
+def get_http_cache() -> Optional[HTTPCache]:
+    """Process-wide HTTP cache, or None when WEB_CACHE=0"""
+    global _shared_cache
+    if not WEB_CACHE:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = HTTPCache()
+        return _shared_cache
+
+_session = None
+
+def cached_request(method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                   data: Optional[bytes] = None, timeout=None, ttl: Optional[float] = None) -> Dict[str, Any]:
+    """Synchronous request through the HTTP cache over a pooled requests.Session.
+
+    Returns {"url", "status", "headers", "body", "cached"}. Only successful
+    responses are stored; `ttl` overrides the lifetime from the headers
+    (useful for APIs that send no caching headers).
+    """
+    import requests
+
+    global _session
+    if _session is None:
+        _session = requests.Session()
+
+    cache = get_http_cache()
+    key = cache_key(method, url, data)
+    entry = cache.get(key) if cache else None
+    if entry and entry["fresh"]:
+        return {**entry, "cached": True}
+
+    request_headers = dict(headers or {})
+    if entry:
+        request_headers.update(HTTPCache.revalidation_headers(entry))
+    response = _session.request(method, url, headers=request_headers, data=data, timeout=timeout)
+    if entry and response.status_code == 304:
+        cache.refresh(key, dict(response.headers), ttl)
+        return {**entry, "cached": True}
+    if cache and response.status_code == 200:
+        cache.put(key, response.url, response.status_code, dict(response.headers), response.content, ttl)
+    return {
+        "url": response.url,
+        "status": response.status_code,
+        "headers": dict(response.headers),
+        "body": response.content,
+        "cached": False,
+    }
@@ -0,0 +1,247 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from .file_lock import FileLock
+from .vector_backends import matches_filter
+
+KEYWORD_INDEX_PATH = os.getenv("KEYWORD_INDEX_PATH", os.path.join("vector_index", "keywords.jsonl"))
+RRF_K = int(os.getenv("RRF_K", 60))
+# Local cross-encoder (sentence-transformers) used to rerank fused results; empty disables reranking
+RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", 50))
+
+# Keeps tokens like "gdpr", "series-a", "2.5" or "o'neil" intact
+TOKEN = re.compile(r"[a-z0-9]+(?:[.\-'][a-z0-9]+)*")
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+class BM25Index:
+    """In-process inverted index with Okapi BM25 scoring.
+
+    Records use the vector backend shape ({"id", "metadata"}) with the
+    indexed text in metadata["text"]; search results are
+    {"id", "score", "metadata"}. With a `path`, additions and deletions
+    are appended to a JSON-lines log and replayed on load. The log is
+    shared by every worker process: each search first applies whatever
+    was appended since, so uploads through one worker are found by all.
+    Appends and compaction hold an exclusive lock on `<path>.lock`, so no
+    worker appends to a log that is being replaced.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._log_id = None  # (device, inode) of the log replayed so far
+        self._log_offset = 0
+        self._changes = 0  # writes through this instance; the version of an index without a log
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self._sync() > 2 * max(len(self), 1):
+                self.compact()
+
+    @property
+    def _lock_path(self) -> str:
+        return self.path + ".lock"
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    @property
+    def version(self) -> Any:
+        """Changes whenever any worker adds to or deletes from the index.
+
+        For a logged index this is the log's identity and size, so it is
+        the same in every process (compaction also changes it).
+        """
+        if not self.path:
+            return self._changes
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_dev, stat.st_ino, stat.st_size)
+
+    def _reset(self):
+        self._postings, self._lengths, self._metadata = {}, {}, {}
+        self._total_length = 0
+
+    def _sync(self) -> int:
+        """Apply log records appended since the last sync; returns how many were read.
+
+        Records this process wrote are read back too, which is harmless:
+        replaying the log in order always gives the same index.
+        """
+        try:
+            log = open(self.path, "rb")
+        except FileNotFoundError:
+            return 0
+        with log:
+            stat = os.fstat(log.fileno())
+            log_id = (stat.st_dev, stat.st_ino)
+            if log_id != self._log_id or stat.st_size < self._log_offset:
+                # First load, or another process compacted the log: replay it all
+                self._reset()
+                self._log_id, self._log_offset = log_id, 0
+            if stat.st_size == self._log_offset:
+                return 0
+            log.seek(self._log_offset)
+            data = log.read()
+        end = data.rfind(b"\n") + 1  # a line still being written is left for the next sync
+        lines = data[:end].splitlines()
+        for line in lines:
+            record = json.loads(line)
+            if record.get("deleted"):
+                self._remove(record["id"])
+            else:
+                self._add(record["id"], record["metadata"])
+        self._log_offset += end
+        return len(lines)
+
+    def _add(self, record_id: str, metadata: Dict[str, Any]):
+        self._remove(record_id)
+        terms = Counter(tokenize(metadata.get("text", "")))
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[record_id] = tf
+        length = sum(terms.values())
+        self._lengths[record_id] = length
+        self._metadata[record_id] = metadata
+        self._total_length += length
+
+    def _remove(self, record_id: str):
+        metadata = self._metadata.pop(record_id, None)
+        if metadata is None:
+            return
+        for term in set(tokenize(metadata.get("text", ""))):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(record_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(record_id)
+
+    def add(self, records: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for record in records:
+                self._add(record["id"], record.get("metadata") or {})
+            self._changes += 1
+            if self.path and records:
+                with FileLock(self._lock_path), open(self.path, "a") as log:
+                    log.write("".join(
+                        json.dumps({"id": record["id"], "metadata": record.get("metadata") or {}}) + "\n"
+                        for record in records
+                    ))
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            doomed = {record_id for record_id in (ids or []) if record_id in self._metadata}
+            if filter:
+                doomed.update(
+                    record_id for record_id, metadata in self._metadata.items()
+                    if matches_filter(metadata, filter, record_id)
+                )
+            for record_id in doomed:
+                self._remove(record_id)
+            self._changes += 1
+            if self.path and doomed:
+                with FileLock(self._lock_path), open(self.path, "a") as log:
+                    log.write("".join(json.dumps({"id": record_id, "deleted": True}) + "\n" for record_id in doomed))
+
+    def compact(self):
+        """Rewrite the log with only the live records, including other workers' latest appends"""
+        with self._lock, FileLock(self._lock_path):
+            self._sync()
+            with open(self.path + ".tmp", "w") as log:
+                for record_id, metadata in self._metadata.items():
+                    log.write(json.dumps({"id": record_id, "metadata": metadata}) + "\n")
+                log.flush()
+                stat = os.fstat(log.fileno())
+            os.replace(self.path + ".tmp", self.path)
+            self._log_id, self._log_offset = (stat.st_dev, stat.st_ino), stat.st_size
+
+    def search(self, query: str, top_k: int = 10, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self.path:
+                self._sync()
+            count = len(self._lengths)
+            if count == 0:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for record_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[record_id] / average_length)
+                    scores[record_id] = scores.get(record_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            if filter:
+                scores = {
+                    record_id: score for record_id, score in scores.items()
+                    if matches_filter(self._metadata[record_id], filter, record_id)
+                }
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [
+                {"id": record_id, "score": score, "metadata": dict(self._metadata[record_id])}
+                for record_id, score in best
+            ]
+
+def reciprocal_rank_fusion(result_lists: Dict[str, List[Dict[str, Any]]], k: int = RRF_K) -> List[Dict[str, Any]]:
+    """Merge ranked result lists by summing 1 / (k + rank).
+
+    `result_lists` maps a source name (e.g. "dense", "keyword") to its
+    ranked results; each fused result records its rank in every source
+    that returned it as "<source>_rank".
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for source, results in result_lists.items():
+        for rank, result in enumerate(results, start=1):
+            entry = fused.setdefault(result["id"], {"id": result["id"], "score": 0.0, "metadata": result["metadata"]})
+            entry["score"] += 1.0 / (k + rank)
+            entry[f"{source}_rank"] = rank
+    return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+def get_reranker():
+    """The configured cross-encoder, or None when reranking is disabled or unavailable"""
+    global _reranker
+    if not RERANK_MODEL:
+        return None
+    with _reranker_lock:
+        if _reranker is None:
+            try:
+                from sentence_transformers import CrossEncoder
+                _reranker = CrossEncoder(RERANK_MODEL)
+            except Exception as e:
+                print(f"Reranker unavailable: {e}")
+                _reranker = False
+        return _reranker or None
+
+def rerank(query: str, results: List[Dict[str, Any]], top_n: int = RERANK_TOP_N) -> List[Dict[str, Any]]:
+    """Reorder the first `top_n` results by cross-encoder relevance"""
+    reranker = get_reranker()
+    if reranker is None or not results:
+        return results
+    head, tail = results[:top_n], results[top_n:]
+    scores = reranker.predict([(query, result["metadata"].get("text", "")) for result in head])
+    for result, score in zip(head, scores):
+        result["rerank_score"] = float(score)
+    head.sort(key=lambda result: result["rerank_score"], reverse=True)
+    return head + tail
@@ -1,11 +1,13 @@
 from crewai.tools import BaseTool
-from typing import Type, Any, Optional
+from typing import Type
 from pydantic import BaseModel, Field
-import os
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
+import time
+from .knowledge_ingest import KNOWLEDGE_WATCH_INTERVAL, get_knowledge_ingestor
+from .query_cache import QueryCache
+from .vector_store import get_vector_store
+
+# Shared by every agent's tool instance and across jobs in this process
+query_cache = QueryCache()
 
 class KnowledgeBaseInput(BaseModel):
     """Input schema for knowledge base tool."""
@@ -18,37 +20,45 @@ class KnowledgeBaseTool(BaseTool):
         "competitor analysis, industry reports, and other relevant documents"
     )
     args_schema: Type[BaseModel] = KnowledgeBaseInput
-    vector_store: Optional[Any] = None
-
-    def __init__(self):
-        super().__init__()
-        self._initialize_vectorstore()
-
-    def _initialize_vectorstore(self):
-        """Initialize the vector store with documents from the knowledge directory"""
-        knowledge_dir = os.path.join(os.path.dirname(__file__), "../../../knowledge")
-        if os.path.exists(knowledge_dir):
-            loader = DirectoryLoader(knowledge_dir, glob="**/*.txt", loader_cls=TextLoader)
-            documents = loader.load()
-            
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            texts = text_splitter.split_documents(documents)
-            
-            embeddings = OpenAIEmbeddings()
-            self.vector_store = FAISS.from_documents(texts, embeddings)
+
+    def _refresh(self):
+        """Pick up new knowledge files when no background watcher is running (e.g. a standalone crew run)"""
+        ingestor = get_knowledge_ingestor()
+        if not ingestor.watching and time.time() - ingestor.last_sync > KNOWLEDGE_WATCH_INTERVAL:
+            ingestor.sync_blocking()
 
     def _run(self, query: str) -> str:
         """Search the knowledge base for relevant information"""
-        if not self.vector_store:
+        self._refresh()
+        store = get_vector_store()
+        version = store.index_version
+        cached = query_cache.get(query, version)
+        if cached is not None:
+            return cached
+
+        # Near-duplicate queries ("market size of X" / "X market size") reuse a cached answer
+        try:
+            embedding = store.embeddings.embed_query(query)
+        except Exception as e:
+            print(f"Query embedding error: {e}")
+            embedding = None
+        if embedding is not None:
+            cached = query_cache.get_similar(embedding, version)
+            if cached is not None:
+                return cached
+
+        docs = store.hybrid_search_sync(query, top_k=3, query_embedding=embedding)
+        if not docs:
             return "Knowledge base is not initialized or empty."
-            
-        docs = self.vector_store.similarity_search(query, k=3)
+
         results = []
-        
         for doc in docs:
-            results.append(f"Source: {doc.metadata.get('source', 'Unknown')}\n{doc.page_content}")
-            
-        return "\n\n---\n\n".join(results)
+            metadata = doc["metadata"]
+            source = metadata.get("filename", "Unknown")
+            if metadata.get("page") is not None:
+                source = f"{source} (page {metadata['page']})"
+            results.append(f"Source: {source}\n{metadata.get('text', '')}")
+
+        answer = "\n\n---\n\n".join(results)
+        query_cache.put(query, answer, version, embedding)
+        return answer
@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from .deck_parser import KNOWLEDGE_EXTENSIONS, extract_knowledge_sections
+from .file_lock import FileLock
+from .vector_store import VectorStore, get_vector_store, knowledge_doc_id
+
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", os.path.join(os.path.dirname(__file__), "../../../knowledge"))
+KNOWLEDGE_MANIFEST_PATH = os.getenv("KNOWLEDGE_MANIFEST_PATH", os.path.join("vector_index", "knowledge_manifest.json"))
+KNOWLEDGE_WATCH_INTERVAL = float(os.getenv("KNOWLEDGE_WATCH_INTERVAL", 5))  # seconds; 0 disables the watcher
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class KnowledgeIngestor:
+    """Keeps the knowledge chunks in a VectorStore in step with a directory.
+
+    A JSON manifest records, per file, the size/mtime/hash it was indexed at
+    and the document id it was stored under. New and changed files are
+    (re)indexed; the chunks of changed and removed files are deleted. sync()
+    only stats unchanged files, so it is cheap to run every few seconds.
+
+    Every worker process may run its own watcher: ingestion holds an
+    exclusive lock on `<manifest>.lock` and re-reads the manifest under it,
+    so each change is indexed once and workers never overwrite each
+    other's manifest entries.
+    """
+
+    def __init__(self, vector_store: VectorStore, directory: str = KNOWLEDGE_DIR,
+                 manifest_path: str = KNOWLEDGE_MANIFEST_PATH):
+        self.vector_store = vector_store
+        self.directory = os.path.abspath(directory)
+        self.manifest_path = manifest_path
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        self.last_sync = 0.0
+        self.watching = False
+        # A thread lock rather than an asyncio one: ingestion runs from the API's loop and from sync_blocking()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._load_manifest()
+
+    def _load_manifest(self):
+        """Pick up what other workers have indexed since the last read"""
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def _save_manifest(self):
+        with open(self.manifest_path + ".tmp", "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.directory)
+
+    def _version_metadata(self, relative: str, stat: os.stat_result) -> Dict[str, Any]:
+        return {"filename": relative, "upload_date": datetime.fromtimestamp(stat.st_mtime).isoformat()}
+
+    def doc_id_for(self, path: str) -> str:
+        """The document id the current version of a file is (or will be) stored under"""
+        return knowledge_doc_id(self._version_metadata(self._relative(path), os.stat(path)))
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        found = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if os.path.splitext(name.lower())[1] in KNOWLEDGE_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    found[self._relative(path)] = os.stat(path)
+        return found
+
+    async def _ingest(self, relative: str, stat: os.stat_result, extra_metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        entry = self.manifest.get(relative)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["doc_id"]
+
+        path = os.path.join(self.directory, relative)
+        digest = await asyncio.to_thread(file_digest, path)
+        if entry and entry["sha256"] == digest:
+            # Touched but unchanged
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            return entry["doc_id"]
+
+        sections = await asyncio.to_thread(extract_knowledge_sections, path)
+        metadata = {
+            **(extra_metadata or {}),
+            **self._version_metadata(relative, stat),
+            "sha256": digest,
+        }
+        doc_id = await self.vector_store.store_knowledge_file("", metadata, sections=sections)
+        # The new version is stored before the old one goes, so the file never drops out of search
+        if entry and entry["doc_id"] != doc_id:
+            await self.vector_store.delete_document(entry["doc_id"])
+        self.manifest[relative] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+            "doc_id": doc_id,
+        }
+        return doc_id
+
+    async def _remove(self, relative: str):
+        entry = self.manifest.pop(relative, None)
+        if entry:
+            await self.vector_store.delete_document(entry["doc_id"])
+
+    async def _locked(self, work, blocking: bool = True):
+        if not blocking:
+            if not self._lock.acquire(blocking=False):
+                return None
+        else:
+            await asyncio.to_thread(self._lock.acquire)
+        try:
+            # Then the lock shared with other worker processes
+            file_lock = FileLock(self.manifest_path + ".lock")
+            if not await asyncio.to_thread(file_lock.acquire, blocking):
+                return None
+            try:
+                await asyncio.to_thread(self._load_manifest)
+                return await work()
+            finally:
+                file_lock.release()
+        finally:
+            self._lock.release()
+
+    async def ingest_file(self, path: str, extra_metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Index (or re-index) one file inside the knowledge directory, e.g. right after an upload"""
+        relative = self._relative(path)
+
+        async def work():
+            try:
+                doc_id = await self._ingest(relative, os.stat(path), extra_metadata)
+            finally:
+                await asyncio.to_thread(self._save_manifest)
+            return doc_id
+        return await self._locked(work)
+
+    async def sync(self, blocking: bool = True) -> Optional[Dict[str, int]]:
+        """Index new and changed files and drop the chunks of removed ones.
+
+        With blocking=False, returns None at once if another sync or upload
+        is already in progress.
+        """
+        async def work():
+            counts = {"indexed": 0, "removed": 0, "failed": 0}
+            try:
+                files = await asyncio.to_thread(self._scan)
+                for relative, stat in files.items():
+                    known = self.manifest.get(relative, {}).get("doc_id")
+                    try:
+                        if await self._ingest(relative, stat) != known:
+                            counts["indexed"] += 1
+                    except Exception as e:
+                        print(f"Knowledge ingestion error for {relative}: {e}")
+                        counts["failed"] += 1
+                for relative in set(self.manifest) - set(files):
+                    await self._remove(relative)
+                    counts["removed"] += 1
+            finally:
+                await asyncio.to_thread(self._save_manifest)
+            self.last_sync = time.time()
+            return counts
+        return await self._locked(work, blocking)
+
+    def sync_blocking(self) -> Dict[str, int]:
+        """sync() for synchronous callers without a watcher.
+
+        Runs on the loop that owns the VectorStore's write buffer (the API's,
+        when called from a worker thread there), so queued upserts are never
+        resolved from another loop; otherwise on a private event loop thread.
+        Skips (rather than waits) when ingestion is already in progress, since
+        the caller may be blocking the loop that would finish it.
+        """
+        buffer = self.vector_store.write_buffer
+        owner = buffer.loop if buffer is not None else None
+        if owner is not None and owner.is_running():
+            try:
+                current = asyncio.get_running_loop()
+            except RuntimeError:
+                current = None
+            if current is owner:
+                return {}  # Called on the owning loop itself: waiting here would deadlock it
+            return asyncio.run_coroutine_threadsafe(self.sync(blocking=False), owner).result() or {}
+
+        result = {}
+
+        def run():
+            result.update(asyncio.run(self.sync(blocking=False)) or {})
+        worker = threading.Thread(target=run, name="knowledge-sync")
+        worker.start()
+        worker.join()
+        return result
+
+    async def watch(self, interval: float = KNOWLEDGE_WATCH_INTERVAL):
+        """Poll the knowledge directory until cancelled"""
+        self.watching = True
+        try:
+            await self._watch(interval)
+        finally:
+            self.watching = False
+
+    async def _watch(self, interval: float):
+        while True:
+            try:
+                counts = await self.sync()
+                if counts["indexed"] or counts["removed"]:
+                    print(f"Knowledge base synced: {counts}")
+            except Exception as e:
+                print(f"Knowledge sync error: {e}")
+            await asyncio.sleep(interval)
+
+_shared_ingestor: Optional[KnowledgeIngestor] = None
+_shared_lock = threading.Lock()
+
+def get_knowledge_ingestor() -> KnowledgeIngestor:
+    """Process-wide ingestor for KNOWLEDGE_DIR over the shared VectorStore"""
+    global _shared_ingestor
+    with _shared_lock:
+        if _shared_ingestor is None:
+            _shared_ingestor = KnowledgeIngestor(get_vector_store())
+        return _shared_ingestor
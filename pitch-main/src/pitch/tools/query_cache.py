@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+import numpy as np
+from .embedding_cache import normalize_text
+
+QUERY_CACHE_SIZE = int(os.getenv("KNOWLEDGE_QUERY_CACHE_SIZE", 512))
+QUERY_CACHE_TTL = int(os.getenv("KNOWLEDGE_QUERY_CACHE_TTL", 60 * 60))
+# Cosine similarity of query embeddings above which two queries share a cached result
+QUERY_CACHE_SIMILARITY = float(os.getenv("KNOWLEDGE_QUERY_CACHE_SIMILARITY", 0.95))
+
+class QueryCache:
+    """LRU + TTL cache of search results with near-duplicate query lookup.
+
+    Exact hits are keyed by the normalized, lower-cased query. Entries stored
+    with a query embedding can also be found by get_similar(). Every lookup
+    passes the current index version; a new version empties the cache.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl: int = QUERY_CACHE_TTL,
+                 similarity_threshold: float = QUERY_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Any = None
+        # Stacked unit embeddings of the entries that have one, rebuilt after changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(query: str) -> str:
+        return normalize_text(query).lower()
+
+    def _sync_version(self, version: Any):
+        if version != self._version:
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def _live(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] <= time.monotonic():
+            del self._entries[key]
+            self._matrix = None
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, query: str, version: Any = None) -> Optional[Any]:
+        with self._lock:
+            self._sync_version(version)
+            entry = self._live(self._key(query))
+            return entry["value"] if entry else None
+
+    def get_similar(self, embedding: List[float], version: Any = None) -> Optional[Any]:
+        """Result cached for the most similar earlier query, if it clears the threshold"""
+        with self._lock:
+            self._sync_version(version)
+            if self._matrix is None:
+                self._matrix_keys = [key for key, entry in self._entries.items() if entry["embedding"] is not None]
+                self._matrix = (
+                    np.stack([self._entries[key]["embedding"] for key in self._matrix_keys])
+                    if self._matrix_keys else np.empty((0, len(embedding)), dtype=np.float32)
+                )
+            if len(self._matrix_keys) == 0:
+                return None
+            query = np.asarray(embedding, dtype=np.float32)
+            scores = self._matrix @ (query / (np.linalg.norm(query) or 1.0))
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                return None
+            entry = self._live(self._matrix_keys[best])
+            return entry["value"] if entry else None
+
+    def put(self, query: str, value: Any, version: Any = None, embedding: Optional[List[float]] = None):
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype=np.float32)
+            embedding = embedding / (np.linalg.norm(embedding) or 1.0)
+        with self._lock:
+            self._sync_version(version)
+            key = self._key(query)
+            self._entries[key] = {"value": value, "embedding": embedding, "expires_at": time.monotonic() + self.ttl}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
@@ -1,10 +1,102 @@
+import hashlib
+import json
+import os
+import re
+from typing import Any, Optional
 from crewai_tools import SerperDevTool
+from .embedding_cache import normalize_text
+from .http_cache import cached_request
+from .web_fetch import WEB_CONNECT_TIMEOUT, WEB_READ_TIMEOUT
+
+SERPER_SEARCH_URL = os.getenv("SERPER_SEARCH_URL", "https://google.serper.dev/search")
+SERPER_CACHE = os.getenv("SERPER_CACHE", "1") == "1"
+SERPER_LOCALE = os.getenv("SERPER_LOCALE", "")  # e.g. "us-en": Serper's gl and hl parameters
+# How long results stay cached, per query class
+SERPER_NEWS_TTL = int(os.getenv("SERPER_NEWS_TTL", 60 * 60))
+SERPER_FACTS_TTL = int(os.getenv("SERPER_FACTS_TTL", 7 * 24 * 60 * 60))
+
+# Queries about recent events; anything else is treated as looking up (slow-changing) company facts
+NEWS_QUERY = re.compile(
+    r"\b(news|latest|recent|today|this (week|month|year)|announce[sd]?|funding|raised?|round|acquir\w*|launch\w*|20\d\d)\b"
+)
+
+class SearchFailed(Exception):
+    """Serper answered with an error instead of results; `results` is its response"""
+
+    def __init__(self, results: dict):
+        super().__init__(results)
+        self.results = results
+
+def query_class(query: str) -> str:
+    return "news" if NEWS_QUERY.search(query.lower()) else "facts"
+
+def search_cache_key(query: str, locale: str = "", n_results: Optional[int] = None) -> str:
+    normalized = normalize_text(query).lower()
+    return hashlib.sha256(f"{normalized}\0{locale}\0{n_results or ''}".encode()).hexdigest()
 
 class WebResearchTool(SerperDevTool):
     """Tool for conducting web research about startups and industries"""
-    
+
     name: str = "Web Research"
     description: str = (
         "Tool for conducting web research about startups and industries. "
         "This tool searches the internet to find relevant information."
     )
+    n_results: Optional[int] = None  # Serper's "num"; its default (10) when unset
+
+    def _search(self, search_query: str, locale: str, ttl: int) -> dict:
+        payload = {"q": search_query}
+        if self.n_results:
+            payload["num"] = self.n_results
+        if locale:
+            payload["gl"], _, payload["hl"] = locale.partition("-")
+        headers = {
+            "X-API-KEY": os.environ["SERPER_API_KEY"],
+            "content-type": "application/json"
+        }
+        response = cached_request(
+            "POST", SERPER_SEARCH_URL, headers=headers, data=json.dumps(payload).encode(),
+            timeout=(WEB_CONNECT_TIMEOUT, WEB_READ_TIMEOUT), ttl=ttl
+        )
+        if response["status"] != 200:
+            return {"error": f"Serper search failed with HTTP {response['status']}"}
+        try:
+            return json.loads(response["body"])
+        except ValueError as e:
+            return {"error": f"Serper returned an unreadable response: {e}"}
+
+    def _run(self, search_query: str, **kwargs: Any) -> Any:
+        # Same request and output as SerperDevTool; concurrent identical queries share one API call
+        locale = SERPER_LOCALE
+        ttl = SERPER_NEWS_TTL if query_class(search_query) == "news" else SERPER_FACTS_TTL
+        key = search_cache_key(search_query, locale, self.n_results)
+
+        def search():
+            results = self._search(search_query, locale, ttl)
+            if "organic" not in results:
+                # Raised rather than returned: API errors aren't cached, but reach every caller sharing this search
+                raise SearchFailed(results)
+            return results
+
+        try:
+            if SERPER_CACHE:
+                from ..cache import cache
+                results = cache.namespace("serper").get_or_set(key, search, expire=ttl)
+            else:
+                results = search()
+        except SearchFailed as e:
+            return e.results
+
+        entries = []
+        for result in results["organic"]:
+            try:
+                entries.append("\n".join([
+                    f"Title: {result['title']}",
+                    f"Link: {result['link']}",
+                    f"Snippet: {result['snippet']}",
+                    "---"
+                ]))
+            except KeyError:
+                continue
+        content = "\n".join(entries)
+        return f"\nSearch results: {content}\n"
@@ -0,0 +1,152 @@
+import asyncio
+import functools
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Vectors written per coalesced flush, and how long the first pending vector may wait for company
+UPSERT_BUFFER_SIZE = int(os.getenv("UPSERT_BUFFER_SIZE", 500))
+UPSERT_FLUSH_INTERVAL = float(os.getenv("UPSERT_FLUSH_INTERVAL", 0.1))
+
+def _relay(target: asyncio.Future, source: asyncio.Future):
+    """Copy the outcome of `source` onto `target`, a future of another (possibly closed) loop"""
+    loop = target.get_loop()
+    if loop.is_closed():
+        return
+
+    def settle():
+        if target.done():
+            return
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+    loop.call_soon_threadsafe(settle)
+
+class UpsertBuffer:
+    """Coalesces vector upserts from concurrent requests into batched writes.
+
+    submit() queues vectors and returns a future that resolves to the number
+    of vectors written (or raises the write error) once the batch holding
+    them has been flushed. A background task flushes when UPSERT_BUFFER_SIZE
+    vectors are pending or UPSERT_FLUSH_INTERVAL seconds after the first one
+    arrived; flush() and close() drain the buffer on demand (e.g. at
+    shutdown).
+
+    The buffer belongs to one event loop at a time. Once that loop has
+    stopped, the next submit() moves to the caller's loop and carries the
+    vectors still queued along; their original futures are settled when
+    the new loop writes them (if the old loop is still open to receive
+    the result). Submitting from a second loop while the first is still
+    running raises RuntimeError.
+    """
+
+    def __init__(self, write: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+                 max_batch: int = UPSERT_BUFFER_SIZE, max_delay: float = UPSERT_FLUSH_INTERVAL):
+        self._write = write
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[Tuple[List[Dict[str, Any]], asyncio.Future]] = []
+        self._pending_count = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return self._pending_count
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """The event loop the background task runs on, while it is running"""
+        if self._worker is None or self._worker.done():
+            return None
+        return self._loop
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            if self._loop is not None and self._loop is not loop:
+                if self._loop.is_running():
+                    raise RuntimeError("UpsertBuffer is in use by another running event loop")
+                if self._worker is not None and not self._loop.is_closed():
+                    # Stopped but not closed: don't let the old worker wake up later
+                    self._loop.call_soon_threadsafe(self._worker.cancel)
+                self._pending = [(batch, self._transfer(future, loop)) for batch, future in self._pending]
+            self._loop = loop
+            self._has_items = asyncio.Event()
+            self._full = asyncio.Event()
+            self._write_lock = asyncio.Lock()
+            if self._pending:
+                self._has_items.set()
+            self._worker = loop.create_task(self._run())
+
+    @staticmethod
+    def _transfer(future: asyncio.Future, loop: asyncio.AbstractEventLoop) -> asyncio.Future:
+        """A future on `loop` whose outcome is relayed to `future`"""
+        moved = loop.create_future()
+        moved.add_done_callback(functools.partial(_relay, future))
+        return moved
+
+    async def submit(self, vectors: List[Dict[str, Any]]) -> asyncio.Future:
+        self._ensure_worker()
+        future = self._loop.create_future()
+        if not vectors:
+            future.set_result(0)
+            return future
+        self._pending.append((vectors, future))
+        self._pending_count += len(vectors)
+        self._has_items.set()
+        if self._pending_count >= self.max_batch:
+            self._full.set()
+        return future
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            if self._pending_count < self.max_batch:
+                # Give concurrent requests a moment to join this batch
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            await self._write_pending()
+
+    async def _write_pending(self):
+        async with self._write_lock:
+            pending, self._pending, self._pending_count = self._pending, [], 0
+            self._has_items.clear()
+            self._full.clear()
+            if not pending:
+                return
+            # The last write of an id wins, as it would with separate upserts
+            vectors = list({vector["id"]: vector for batch, _ in pending for vector in batch}.values())
+            try:
+                await self._write(vectors)
+            except Exception as e:
+                print(f"Vector upsert error ({len(vectors)} vectors): {e}")
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for batch, future in pending:
+                    if not future.done():
+                        future.set_result(len(batch))
+
+    async def flush(self):
+        """Write everything queued so far"""
+        if not self._pending:
+            return
+        self._ensure_worker()
+        while self._pending:
+            await self._write_pending()
+
+    async def close(self):
+        """Flush and stop the background task"""
+        await self.flush()
+        if self._worker is not None and self._loop is asyncio.get_running_loop():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
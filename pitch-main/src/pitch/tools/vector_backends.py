@@ -0,0 +1,500 @@
+import json
+import os
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+QUERY_CONCURRENCY = int(os.getenv("VECTOR_QUERY_CONCURRENCY", 8))  # Parallel remote queries in query_many
+QUERY_BLOCK_SIZE = int(os.getenv("VECTOR_QUERY_BLOCK_SIZE", 64))  # Local queries scored per matrix product
+# Quantized local index: candidates per result re-scored exactly against the float32 vectors
+RESCORE_MULTIPLIER = int(os.getenv("VECTOR_RESCORE_MULTIPLIER", 10))
+QUANTIZED_BLOCK_ROWS = 256  # int8 rows widened to float32 at a time while scanning; small enough to stay in cache
+
+# Backends store unit-normalized vectors and score matches by cosine similarity.
+# Records are plain dicts: {"id", "values", "metadata"} from fetch and
+# {"id", "score", "metadata"} from query.
+
+class VectorBackend:
+    """Storage and nearest-neighbour lookup behind VectorStore"""
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+    def query(self, vector: List[float], top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def query_many(self, vectors: List[List[float]], top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Matches for several query vectors, in the order given"""
+        return [self.query(vector, top_k, filter) for vector in vectors]
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[Dict[str, Any]] = None) -> None:
+        raise NotImplementedError
+
+class PineconeBackend(VectorBackend):
+    """Remote Pinecone serverless index"""
+
+    def __init__(self, index_name: str = "pitch-analyzer", dimension: int = 1536):
+        from pinecone import Pinecone, ServerlessSpec
+
+        self.pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        if index_name not in self.pc.list_indexes().names():
+            self.pc.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(
+                    cloud="aws",
+                    region="us-west-2"
+                )
+            )
+        self.index = self.pc.Index(index_name)
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        self.index.upsert(vectors=vectors)
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        response = self.index.fetch(ids=ids)
+        return {
+            vector_id: {"id": vector_id, "values": list(vector.values), "metadata": dict(vector.metadata or {})}
+            for vector_id, vector in (response.vectors or {}).items()
+        }
+
+    def query(self, vector: List[float], top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        response = self.index.query(vector=vector, filter=filter, top_k=top_k, include_metadata=True)
+        return [
+            {"id": match.id, "score": match.score, "metadata": dict(match.metadata or {})}
+            for match in response.matches
+        ]
+
+    def query_many(self, vectors: List[List[float]], top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        # Pinecone has no multi-vector query, so overlap the round trips instead
+        with ThreadPoolExecutor(max_workers=QUERY_CONCURRENCY) as pool:
+            return list(pool.map(lambda vector: self.query(vector, top_k, filter), vectors))
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[Dict[str, Any]] = None) -> None:
+        if ids:
+            self.index.delete(ids=ids)
+        if filter:
+            self.index.delete(filter=filter)
+
+def _predicate(op: str, operand: Any):
+    """Python predicate for a Pinecone-style filter operator"""
+    if op == "$eq":
+        return lambda value: value == operand
+    if op == "$ne":
+        return lambda value: value != operand
+    if op == "$in":
+        return lambda value: value in operand
+    if op == "$nin":
+        return lambda value: value not in operand
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        compare = {
+            "$gt": lambda a, b: a > b,
+            "$gte": lambda a, b: a >= b,
+            "$lt": lambda a, b: a < b,
+            "$lte": lambda a, b: a <= b,
+        }[op]
+
+        def ordered(value):
+            try:
+                return value is not None and compare(value, operand)
+            except TypeError:
+                return False
+        return ordered
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]], record_id: Optional[str] = None) -> bool:
+    """Evaluate a Pinecone-style metadata filter against a single record"""
+    for key, condition in (filter or {}).items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause, record_id) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause, record_id) for clause in condition):
+                return False
+        else:
+            value = record_id if key == "id" else metadata.get(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            if not all(_predicate(op, operand)(value) for op, operand in condition.items()):
+                return False
+    return True
+
+def quantize_int8(matrix: np.ndarray):
+    """Symmetric per-row int8 codes and the float32 scales that restore them"""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+class LocalVectorBackend(VectorBackend):
+    """Exact cosine search over an in-process NumPy matrix.
+
+    With a `path`, the index is persisted as an append-only float32 matrix
+    (vectors.f32, memory-mapped on load) plus a JSON-lines log of ids and
+    metadata (records.jsonl). Overwritten and deleted rows are skipped at
+    query time and dropped by compact(). Without a path everything stays
+    in memory.
+
+    With quantization="int8" (requires a path) queries scan int8 codes
+    (vectors.i8 plus per-row scales in scales.f32, about a quarter of the
+    float32 size) and re-score the best `rescore_multiplier * top_k`
+    candidates exactly against the float32 rows, which are only read from
+    disk for those candidates.
+
+    Writes append the vector bytes before the records that point to them,
+    so a crash mid-upsert leaves at most surplus vector bytes or a torn
+    last record line, both trimmed on load. compact() marks the point
+    where both rewritten files are complete, and an interrupted
+    compaction is finished or discarded on load. Only one process may
+    write to a path; others would not see its changes until they reload.
+    """
+
+    def __init__(self, path: Optional[str] = None, dimension: int = 1536,
+                 quantization: Optional[str] = None, rescore_multiplier: int = RESCORE_MULTIPLIER):
+        if quantization not in (None, "int8"):
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        if quantization and not path:
+            raise ValueError("A quantized index needs a path to keep the float32 vectors for re-scoring")
+        self.path = path
+        self.dimension = dimension
+        self.quantization = quantization
+        self.rescore_multiplier = max(rescore_multiplier, 1)
+        self._lock = threading.RLock()
+        self._row_ids: List[Optional[str]] = []  # None for overwritten/deleted rows
+        self._row_metadata: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._field_cache: Dict[str, np.ndarray] = {}
+        self._matrix = np.empty((0, dimension), dtype=np.float32)
+        self._codes = np.empty((0, dimension), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def _records_path(self) -> str:
+        return os.path.join(self.path, "records.jsonl")
+
+    @property
+    def _compact_marker_path(self) -> str:
+        return os.path.join(self.path, "compact.pending")
+
+    @property
+    def _codes_path(self) -> str:
+        return os.path.join(self.path, "vectors.i8")
+
+    @property
+    def _scales_path(self) -> str:
+        return os.path.join(self.path, "scales.f32")
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _load(self):
+        self._recover_compaction()
+        if os.path.exists(self._records_path):
+            self._read_records()
+        damaged = self._trim_vectors()
+        self._remap()
+        if self.quantization and self._codes_outdated():
+            self._write_codes()
+        if damaged or len(self._row_ids) > 2 * max(len(self._rows), 1):
+            self.compact()
+
+    def _recover_compaction(self):
+        """Finish a compaction that got as far as its marker, otherwise discard its temp files"""
+        finished = os.path.exists(self._compact_marker_path)
+        for target in (self._vectors_path, self._records_path):
+            if os.path.exists(target + ".tmp"):
+                if finished:
+                    os.replace(target + ".tmp", target)
+                else:
+                    os.remove(target + ".tmp")
+        if finished:
+            os.remove(self._compact_marker_path)
+
+    def _read_records(self):
+        """Replay records.jsonl, cutting off a last line torn by a crash mid-write"""
+        complete = 0
+        with open(self._records_path, "rb") as records:
+            for line in records:
+                if not line.endswith(b"\n"):
+                    break
+                record = json.loads(line)
+                if record.get("deleted"):
+                    self._forget(record["id"])
+                else:
+                    self._remember(record["id"], record["metadata"])
+                complete += len(line)
+        if complete < os.path.getsize(self._records_path):
+            print(f"Dropping a torn record at the end of {self._records_path}")
+            with open(self._records_path, "r+b") as records:
+                records.truncate(complete)
+
+    def _trim_vectors(self) -> bool:
+        """Make vectors.f32 hold exactly one row per record; True if records had to be dropped"""
+        row_bytes = self.dimension * 4
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        rows = len(self._row_ids)
+        if size == rows * row_bytes:
+            return False
+        available = min(size // row_bytes, rows)
+        if size > rows * row_bytes:
+            # Vectors written by an upsert whose records never made it to disk
+            with open(self._vectors_path, "r+b") as vectors:
+                vectors.truncate(available * row_bytes)
+            return False
+        print(f"Vector index at {self.path} is missing {rows - available} rows; dropping their records")
+        if os.path.exists(self._vectors_path):
+            with open(self._vectors_path, "r+b") as vectors:
+                vectors.truncate(available * row_bytes)
+        for vector_id in self._row_ids[available:]:
+            if vector_id is not None:
+                del self._rows[vector_id]
+        del self._row_ids[available:]
+        del self._row_metadata[available:]
+        return True
+
+    def _codes_outdated(self) -> bool:
+        rows = len(self._row_ids)
+        try:
+            return not (
+                os.path.getsize(self._codes_path) == rows * self.dimension
+                and os.path.getsize(self._scales_path) == rows * 4
+            )
+        except OSError:
+            # Either file missing, e.g. after a crash between the two renames in _write_codes
+            return True
+
+    def _write_codes(self):
+        """(Re)build the int8 files from the float32 vectors, a block at a time"""
+        with open(self._codes_path + ".tmp", "wb") as codes_out, open(self._scales_path + ".tmp", "wb") as scales_out:
+            for start in range(0, len(self._matrix), 16384):
+                codes, scales = quantize_int8(np.asarray(self._matrix[start:start + 16384]))
+                codes_out.write(codes.tobytes())
+                scales_out.write(scales.tobytes())
+        os.replace(self._codes_path + ".tmp", self._codes_path)
+        os.replace(self._scales_path + ".tmp", self._scales_path)
+        self._remap()
+
+    def _remap(self):
+        """Memory-map the vectors file (and int8 codes) after they changed on disk"""
+        rows = len(self._row_ids)
+        if rows == 0 or not os.path.exists(self._vectors_path):
+            self._matrix = np.empty((0, self.dimension), dtype=np.float32)
+            self._codes = np.empty((0, self.dimension), dtype=np.int8)
+            self._scales = np.empty(0, dtype=np.float32)
+            return
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+        if self.quantization and not self._codes_outdated():
+            self._codes = np.memmap(self._codes_path, dtype=np.int8, mode="r", shape=(rows, self.dimension))
+            self._scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(rows,))
+
+    def _remember(self, vector_id: str, metadata: Dict[str, Any]) -> int:
+        self._forget(vector_id)
+        row = len(self._row_ids)
+        self._row_ids.append(vector_id)
+        self._row_metadata.append(metadata)
+        self._rows[vector_id] = row
+        return row
+
+    def _forget(self, vector_id: str):
+        row = self._rows.pop(vector_id, None)
+        if row is not None:
+            self._row_ids[row] = None
+            self._row_metadata[row] = {}
+
+    def _normalize(self, values) -> np.ndarray:
+        matrix = np.asarray(values, dtype=np.float32).reshape(-1, self.dimension)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        if not vectors:
+            return
+        matrix = self._normalize([vector["values"] for vector in vectors])
+        with self._lock:
+            for vector in vectors:
+                self._remember(vector["id"], vector.get("metadata") or {})
+            self._field_cache = {}
+            if self.path:
+                with open(self._vectors_path, "ab") as out:
+                    out.write(matrix.tobytes())
+                if self.quantization:
+                    codes, scales = quantize_int8(matrix)
+                    with open(self._codes_path, "ab") as out:
+                        out.write(codes.tobytes())
+                    with open(self._scales_path, "ab") as out:
+                        out.write(scales.tobytes())
+                with open(self._records_path, "a") as records:
+                    for vector in vectors:
+                        records.write(json.dumps({"id": vector["id"], "metadata": vector.get("metadata") or {}}) + "\n")
+                self._remap()
+            else:
+                self._matrix = np.vstack([self._matrix, matrix])
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            doomed = set(ids or [])
+            if filter:
+                doomed.update(self._row_ids[row] for row in np.flatnonzero(self._filter_mask(filter)))
+            doomed = [vector_id for vector_id in doomed if vector_id in self._rows]
+            for vector_id in doomed:
+                self._forget(vector_id)
+            self._field_cache = {}
+            if self.path and doomed:
+                with open(self._records_path, "a") as records:
+                    for vector_id in doomed:
+                        records.write(json.dumps({"id": vector_id, "deleted": True}) + "\n")
+
+    def compact(self):
+        """Rewrite the index without overwritten or deleted rows"""
+        with self._lock:
+            live = [row for row, vector_id in enumerate(self._row_ids) if vector_id is not None]
+            matrix = np.array(self._matrix[live], dtype=np.float32)
+            ids = [self._row_ids[row] for row in live]
+            metadata = [self._row_metadata[row] for row in live]
+            if self.path:
+                # Release the old mappings
+                self._matrix = np.empty((0, self.dimension), dtype=np.float32)
+                self._codes = np.empty((0, self.dimension), dtype=np.int8)
+                self._scales = np.empty(0, dtype=np.float32)
+                with open(self._vectors_path + ".tmp", "wb") as out:
+                    out.write(matrix.tobytes())
+                    out.flush()
+                    os.fsync(out.fileno())
+                with open(self._records_path + ".tmp", "w") as records:
+                    for vector_id, meta in zip(ids, metadata):
+                        records.write(json.dumps({"id": vector_id, "metadata": meta}) + "\n")
+                    records.flush()
+                    os.fsync(records.fileno())
+                # From here on a crash is rolled forward by _recover_compaction
+                open(self._compact_marker_path, "w").close()
+                os.replace(self._vectors_path + ".tmp", self._vectors_path)
+                os.replace(self._records_path + ".tmp", self._records_path)
+                os.remove(self._compact_marker_path)
+            self._row_ids, self._row_metadata = ids, metadata
+            self._rows = {vector_id: row for row, vector_id in enumerate(ids)}
+            self._field_cache = {}
+            if self.path:
+                self._remap()
+                if self.quantization:
+                    self._write_codes()
+            else:
+                self._matrix = matrix
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            found = {}
+            for vector_id in ids:
+                row = self._rows.get(vector_id)
+                if row is not None:
+                    found[vector_id] = {
+                        "id": vector_id,
+                        "values": self._matrix[row].tolist(),
+                        "metadata": dict(self._row_metadata[row]),
+                    }
+            return found
+
+    def _field(self, name: str) -> np.ndarray:
+        """Object array of one metadata field across all rows, cached until the next write"""
+        values = self._field_cache.get(name)
+        if values is None:
+            if name == "id":
+                source = self._row_ids
+            else:
+                source = [metadata.get(name) for metadata in self._row_metadata]
+            values = np.empty(len(source), dtype=object)
+            values[:] = source
+            self._field_cache[name] = values
+        return values
+
+    def _filter_mask(self, filter: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Boolean mask of live rows matching a Pinecone-style metadata filter"""
+        mask = np.fromiter((vector_id is not None for vector_id in self._row_ids), dtype=bool, count=len(self._row_ids))
+        for key, condition in (filter or {}).items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._filter_mask(clause)
+            elif key == "$or":
+                mask &= np.logical_or.reduce([self._filter_mask(clause) for clause in condition])
+            else:
+                values = self._field(key)
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                for op, operand in condition.items():
+                    if op == "$eq" and not isinstance(operand, (list, dict)):
+                        mask &= values == operand
+                    else:
+                        mask &= np.frompyfunc(_predicate(op, operand), 1, 1)(values).astype(bool)
+        return mask
+
+    def _match(self, row: int, score: float) -> Dict[str, Any]:
+        return {"id": self._row_ids[row], "score": float(score), "metadata": dict(self._row_metadata[row])}
+
+    def query(self, vector: List[float], top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self.query_many([vector], top_k, filter)[0]
+
+    def query_many(self, vectors: List[List[float]], top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Score a block of queries with one matrix product instead of one pass per query"""
+        queries = self._normalize(vectors)
+        with self._lock:
+            if not self._rows or len(queries) == 0:
+                return [[] for _ in range(len(queries))]
+            rows = np.flatnonzero(self._filter_mask(filter))
+            if len(rows) == 0:
+                return [[] for _ in range(len(queries))]
+            k = min(top_k, len(rows))
+            results = []
+            if self.quantization:
+                for start in range(0, len(queries), QUERY_BLOCK_SIZE):
+                    results.extend(self._query_quantized(rows, queries[start:start + QUERY_BLOCK_SIZE], k))
+                return results
+            if len(rows) == len(self._row_ids):
+                matrix = self._matrix
+            else:
+                matrix = self._matrix[rows]
+            for start in range(0, len(queries), QUERY_BLOCK_SIZE):
+                scores = (matrix @ queries[start:start + QUERY_BLOCK_SIZE].T).T
+                best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                for row_scores, candidates in zip(scores, best):
+                    candidates = candidates[np.argsort(-row_scores[candidates])]
+                    results.append([self._match(rows[i], row_scores[i]) for i in candidates])
+            return results
+
+    def _approximate_scores(self, rows: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Cosine scores from the int8 codes, widening one block of rows at a time"""
+        all_rows = len(rows) == len(self._row_ids)
+        scores = np.empty((len(queries), len(rows)), dtype=np.float32)
+        widened = np.empty((QUANTIZED_BLOCK_ROWS, self.dimension), dtype=np.float32)
+        for start in range(0, len(rows), QUANTIZED_BLOCK_ROWS):
+            end = min(start + QUANTIZED_BLOCK_ROWS, len(rows))
+            block = slice(start, end) if all_rows else rows[start:end]
+            codes = widened[:end - start]
+            codes[...] = self._codes[block]
+            scores[:, start:end] = (queries @ codes.T) * self._scales[block]
+        return scores
+
+    def _query_quantized(self, rows: np.ndarray, queries: np.ndarray, k: int) -> List[List[Dict[str, Any]]]:
+        scores = self._approximate_scores(rows, queries)
+        depth = min(len(rows), k * self.rescore_multiplier)
+        candidates = np.argpartition(-scores, depth - 1, axis=1)[:, :depth]
+        results = []
+        for query, candidate in zip(queries, candidates):
+            # Exact float32 re-scoring; sorted rows keep the memmap reads sequential
+            candidate_rows = np.sort(rows[candidate])
+            exact = self._matrix[candidate_rows] @ query
+            best = np.argpartition(-exact, k - 1)[:k]
+            best = best[np.argsort(-exact[best])]
+            results.append([self._match(candidate_rows[i], exact[i]) for i in best])
+        return results
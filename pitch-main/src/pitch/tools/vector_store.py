@@ -1,72 +1,268 @@
-from pinecone import Pinecone, ServerlessSpec
-from langchain_openai import OpenAIEmbeddings
+import asyncio
 import os
-from typing import List, Dict, Any
+import threading
+import numpy as np
+from typing import List, Dict, Any, Optional
 import json
+from .deck_parser import Section, extract_sections, split_sections
+from .vector_backends import VectorBackend, PineconeBackend, LocalVectorBackend
+from .upsert_buffer import UpsertBuffer
+from .hybrid_search import KEYWORD_INDEX_PATH, BM25Index, reciprocal_rank_fusion, rerank
 
-class VectorStore:
-    def __init__(self):
-        self.pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        self.embeddings = OpenAIEmbeddings()
-        
-        # Initialize or get existing index
-        index_name = "pitch-analyzer"
-        if index_name not in self.pc.list_indexes().names():
-            self.pc.create_index(
-                name=index_name,
-                dimension=1536,  # OpenAI embeddings dimension
-                metric="cosine",
-                spec=ServerlessSpec(
-                    cloud="aws",
-                    region="us-west-2"
-                )
-            )
-        self.index = self.pc.Index(index_name)
-
-    async def store_knowledge_file(self, file_content: str, metadata: Dict[str, Any]) -> str:
-        """Store a knowledge file in the vector database"""
-        # Generate embedding for the content
-        embedding = await self.embeddings.aembed_query(file_content)
-        
-        # Create a unique ID for the document
-        doc_id = f"kb_{metadata['filename']}_{metadata['upload_date']}"
-        
-        # Store in Pinecone
-        self.index.upsert(
-            vectors=[{
-                "id": doc_id,
-                "values": embedding,
-                "metadata": metadata
-            }]
+# "pinecone" for the hosted index, "local" for the on-disk NumPy index
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_index")
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "")  # "int8" for the local backend
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", 1536))  # OpenAI embeddings dimension
+
+# Chunking and batching of document ingestion
+CHUNK_SIZE = int(os.getenv("VECTOR_CHUNK_SIZE", 1000))
+CHUNK_OVERLAP = int(os.getenv("VECTOR_CHUNK_OVERLAP", 200))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", 4))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", 100))
+UPSERT_BATCH_BYTES = int(os.getenv("UPSERT_BATCH_BYTES", 2 * 1024 * 1024))  # Pinecone request limit
+FETCH_BATCH_SIZE = int(os.getenv("FETCH_BATCH_SIZE", 200))
+# Coalesce upserts from concurrent requests through an UpsertBuffer ("0" writes each request directly)
+UPSERT_BUFFER = os.getenv("UPSERT_BUFFER", "1") == "1"
+
+# Chunks of one deck version whose best match in the other scores below this have diverged
+SECTION_DIVERGENCE_THRESHOLD = float(os.getenv("SECTION_DIVERGENCE_THRESHOLD", 0.9))
+
+# Results taken from each of dense and keyword search before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 50))
+
+def chunk_sections(sections: List[Section]) -> List[Dict[str, Any]]:
+    """Split page/slide sections into embedding-sized chunks.
+
+    Each chunk keeps the page (or slide) it came from so search hits can be
+    traced back to the deck.
+    """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = []
+    for page, text in sections:
+        for piece in splitter.split_text(text):
+            chunks.append({"page": page, "text": piece})
+    return chunks
+
+def upsert_batches(vectors: List[Dict[str, Any]]):
+    """Group vectors into upsert requests bounded by count and approximate size"""
+    batch, batch_bytes = [], 0
+    for vector in vectors:
+        size = 4 * len(vector["values"]) + len(json.dumps(vector.get("metadata", {}))) + len(vector["id"])
+        if batch and (len(batch) >= UPSERT_BATCH_SIZE or batch_bytes + size > UPSERT_BATCH_BYTES):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+def _unit_rows(values: List[List[float]]) -> np.ndarray:
+    matrix = np.asarray(values, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def _section_summary(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    metadata = chunk["metadata"]
+    return {
+        "chunk_index": metadata.get("chunk_index"),
+        "page": metadata.get("page"),
+        "preview": metadata.get("text", "")[:200],
+    }
+
+def knowledge_doc_id(metadata: Dict[str, Any]) -> str:
+    """Unique ID for a knowledge document version"""
+    return f"kb_{metadata['filename']}_{metadata['upload_date']}"
+
+def _knowledge_search_plan(filter_criteria: Optional[Dict[str, Any]], top_k: int, offset: int):
+    """Candidates to take from each retriever, and the filter restricting them to knowledge chunks"""
+    chunk_filter = {"type": "knowledge_chunk"}
+    if filter_criteria:
+        chunk_filter = {"$and": [filter_criteria, chunk_filter]}
+    return max(offset + top_k, HYBRID_CANDIDATES), chunk_filter
+
+def create_backend(kind: str = VECTOR_BACKEND) -> VectorBackend:
+    if kind == "local":
+        return LocalVectorBackend(
+            path=VECTOR_INDEX_DIR, dimension=EMBEDDING_DIMENSION, quantization=VECTOR_QUANTIZATION or None
         )
+    if kind == "pinecone":
+        return PineconeBackend(index_name="pitch-analyzer", dimension=EMBEDDING_DIMENSION)
+    raise ValueError(f"Unknown vector backend: {kind}")
+
+class VectorStore:
+    """Chunked document storage and search over a vector backend.
+
+    The backend and embedding client are created on first use (or by
+    warm_up()), so constructing a VectorStore makes no network calls.
+    """
+
+    def __init__(self, backend: Optional[VectorBackend] = None, keyword_index: Optional[BM25Index] = None):
+        self._backend = backend
+        self._embeddings = None
+        self._keyword_index = keyword_index
+        self._init_lock = threading.Lock()
+        self.write_buffer = UpsertBuffer(self._write_vectors) if UPSERT_BUFFER else None
+
+    @property
+    def backend(self) -> VectorBackend:
+        if self._backend is None:
+            with self._init_lock:
+                if self._backend is None:
+                    self._backend = create_backend()
+        return self._backend
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from .embedding_cache import get_embeddings
+            self._embeddings = get_embeddings()
+        return self._embeddings
+
+    @property
+    def keyword_index(self) -> BM25Index:
+        """BM25 index over knowledge chunks, used alongside dense search"""
+        if self._keyword_index is None:
+            with self._init_lock:
+                if self._keyword_index is None:
+                    self._keyword_index = BM25Index(path=KEYWORD_INDEX_PATH)
+        return self._keyword_index
+
+    @property
+    def index_version(self) -> Any:
+        """Changes whenever any worker stores or deletes knowledge documents, so readers can invalidate caches.
+
+        Taken from the keyword index log, which every knowledge write
+        appends to after its vectors are written.
+        """
+        return self.keyword_index.version
+
+    @property
+    def ready(self) -> bool:
+        return self._backend is not None and self._embeddings is not None
+
+    def warm_up(self):
+        """Create the backend and embedding client ahead of the first request"""
+        self.backend
+        self.embeddings
+        self.keyword_index
+
+    async def _backend_call(self, method: str, *args):
+        # Resolve the backend inside the worker thread so a cold start never blocks the loop
+        return await asyncio.to_thread(lambda: getattr(self.backend, method)(*args))
+
+    async def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in batches, a few batches in flight at a time"""
+        semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self.embeddings.aembed_documents(batch)
+
+        batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+        results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+        return [embedding for batch in results for embedding in batch]
+
+    async def _write_vectors(self, vectors: List[Dict[str, Any]]):
+        for batch in upsert_batches(vectors):
+            await self._backend_call("upsert", batch)
+
+    async def _upsert(self, vectors: List[Dict[str, Any]], wait: bool = True):
+        """Write vectors, through the shared write buffer when enabled.
+
+        With wait=False the call returns once the vectors are queued; write
+        errors are then only logged.
+        """
+        if self.write_buffer is None:
+            await self._write_vectors(vectors)
+            return
+        acknowledgement = await self.write_buffer.submit(vectors)
+        if wait:
+            await acknowledgement
+        else:
+            # Retrieve the outcome so a failed write isn't reported as an unhandled exception
+            acknowledgement.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+    async def flush(self):
+        """Wait until all buffered upserts have been written"""
+        if self.write_buffer is not None:
+            await self.write_buffer.flush()
+
+    async def close(self):
+        """Flush buffered upserts and stop the background writer (call at shutdown)"""
+        if self.write_buffer is not None:
+            await self.write_buffer.close()
+
+    async def _store_document(self, doc_id: str, sections: List[Section], metadata: Dict[str, Any], doc_type: str, wait: bool = True) -> str:
+        """Store a document as one vector per chunk plus a document-level vector.
+
+        The document vector is the normalized mean of its chunk embeddings, so
+        whole-document lookups keep working without re-embedding (and without
+        truncating) the full text.
+        """
+        chunks = chunk_sections(sections)
+        if not chunks:
+            return doc_id
+
+        embeddings = await self._embed_texts([chunk["text"] for chunk in chunks])
+        vectors = []
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+            chunk_metadata = {
+                **metadata,
+                "type": f"{doc_type}_chunk",
+                "doc_id": doc_id,
+                "chunk_index": i,
+                "text": chunk["text"],
+            }
+            if chunk["page"] is not None:
+                chunk_metadata["page"] = chunk["page"]
+            vectors.append({"id": f"{doc_id}#{i}", "values": embedding, "metadata": chunk_metadata})
+        records = [{"id": vector["id"], "metadata": vector["metadata"]} for vector in vectors]
+
+        mean = np.mean(np.asarray(embeddings, dtype=np.float32), axis=0)
+        mean /= np.linalg.norm(mean) or 1.0
+        vectors.append({
+            "id": doc_id,
+            "values": mean.tolist(),
+            "metadata": {**metadata, "type": doc_type, "chunk_count": len(chunks)}
+        })
+
+        await self._upsert(vectors, wait=wait)
+        if doc_type == "knowledge":
+            await asyncio.to_thread(self.keyword_index.add, records)
         return doc_id
 
-    async def store_pitch_deck(self, deck_content: str, metadata: Dict[str, Any]) -> str:
-        """Store a pitch deck in the vector database"""
-        embedding = await self.embeddings.aembed_query(deck_content)
+    async def store_knowledge_file(self, file_content: str, metadata: Dict[str, Any], sections: Optional[List[Section]] = None, wait: bool = True) -> str:
+        """Store a knowledge file in the vector database (wait=False returns before the write)"""
+        doc_id = knowledge_doc_id(metadata)
+        sections = sections if sections is not None else split_sections(file_content)
+        return await self._store_document(doc_id, sections, metadata, "knowledge", wait=wait)
+
+    async def store_pitch_deck(self, deck_content: str, metadata: Dict[str, Any], sections: Optional[List[Section]] = None, wait: bool = True) -> str:
+        """Store a pitch deck in the vector database (wait=False returns before the write)"""
         doc_id = f"deck_{metadata['filename']}_{metadata['upload_date']}"
-        
-        self.index.upsert(
-            vectors=[{
-                "id": doc_id,
-                "values": embedding,
-                "metadata": metadata
-            }]
-        )
-        return doc_id
+        sections = sections if sections is not None else split_sections(deck_content)
+        return await self._store_document(doc_id, sections, {**metadata, "deck_id": doc_id}, "deck", wait=wait)
+
+    async def store_pitch_deck_file(self, file_path: str, metadata: Dict[str, Any], wait: bool = True) -> str:
+        """Parse a PDF/PPTX deck by page or slide and store it"""
+        sections = await asyncio.to_thread(extract_sections, file_path)
+        return await self.store_pitch_deck("", metadata, sections=sections, wait=wait)
 
     async def store_analysis_result(self, analysis_content: str, metadata: Dict[str, Any]) -> str:
         """Store an analysis result in the vector database"""
         embedding = await self.embeddings.aembed_query(analysis_content)
         doc_id = f"analysis_{metadata['deck_id']}_{metadata['timestamp']}"
         
-        self.index.upsert(
-            vectors=[{
-                "id": doc_id,
-                "values": embedding,
-                "metadata": metadata
-            }]
-        )
+        await self._upsert([{
+            "id": doc_id,
+            "values": embedding,
+            "metadata": metadata
+        }])
         return doc_id
 
     async def semantic_search(self, query: str, filter_criteria: Dict[str, Any] = None, top_k: int = 5) -> List[Dict[str, Any]]:
@@ -74,50 +270,158 @@ class VectorStore:
         # Generate embedding for the query
         query_embedding = await self.embeddings.aembed_query(query)
         
-        # Search in Pinecone
-        results = self.index.query(
-            vector=query_embedding,
-            filter=filter_criteria,
-            top_k=top_k,
-            include_metadata=True
+        return await self._backend_call("query", query_embedding, top_k, filter_criteria)
+
+    async def hybrid_search(self, query: str, filter_criteria: Dict[str, Any] = None, top_k: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """Search knowledge chunks with BM25 and dense retrieval fused by reciprocal rank.
+
+        Exact terms (company names, regulations) are found by the keyword
+        index even when the embedding misses them. If a cross-encoder is
+        configured (RERANK_MODEL) the fused head is reranked. Returns the
+        page `offset:offset + top_k`; if dense search fails the keyword
+        results are still returned.
+        """
+        depth, chunk_filter = _knowledge_search_plan(filter_criteria, top_k, offset)
+
+        async def dense():
+            try:
+                return await self.semantic_search(query, chunk_filter, depth)
+            except Exception as e:
+                print(f"Dense search error: {e}")
+                return []
+
+        dense_results, keyword_results = await asyncio.gather(
+            dense(), asyncio.to_thread(self.keyword_index.search, query, depth, chunk_filter)
         )
-        
-        return results.matches
+        fused = reciprocal_rank_fusion({"dense": dense_results, "keyword": keyword_results})
+        fused = await asyncio.to_thread(rerank, query, fused)
+        return fused[offset:offset + top_k]
+
+    def hybrid_search_sync(self, query: str, filter_criteria: Dict[str, Any] = None, top_k: int = 10, offset: int = 0,
+                           query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Blocking hybrid_search for synchronous callers such as crew tools"""
+        depth, chunk_filter = _knowledge_search_plan(filter_criteria, top_k, offset)
+        try:
+            if query_embedding is None:
+                query_embedding = self.embeddings.embed_query(query)
+            dense_results = self.backend.query(query_embedding, depth, chunk_filter)
+        except Exception as e:
+            print(f"Dense search error: {e}")
+            dense_results = []
+        keyword_results = self.keyword_index.search(query, depth, chunk_filter)
+        fused = rerank(query, reciprocal_rank_fusion({"dense": dense_results, "keyword": keyword_results}))
+        return fused[offset:offset + top_k]
+
+    async def delete_document(self, doc_id: str, chunk_count: Optional[int] = None):
+        """Delete a stored document's vector, its chunk vectors and its keyword entries.
+
+        Vectors are deleted by id (serverless Pinecone indexes cannot delete
+        by metadata); without `chunk_count` it is read from the document vector.
+        """
+        await self.flush()
+        if chunk_count is None:
+            document = (await self._fetch([doc_id])).get(doc_id)
+            chunk_count = int(document["metadata"].get("chunk_count", 0)) if document else 0
+        ids = [doc_id] + [f"{doc_id}#{i}" for i in range(chunk_count)]
+        for start in range(0, len(ids), FETCH_BATCH_SIZE):
+            await self._backend_call("delete", ids[start:start + FETCH_BATCH_SIZE])
+        await asyncio.to_thread(self.keyword_index.delete, None, {"doc_id": doc_id})
+
+    async def _fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch vectors in batches small enough for one backend request each"""
+        batches = [ids[i:i + FETCH_BATCH_SIZE] for i in range(0, len(ids), FETCH_BATCH_SIZE)]
+        found = {}
+        for fetched in await asyncio.gather(*(self._backend_call("fetch", batch) for batch in batches)):
+            found.update(fetched)
+        return found
+
+    async def _fetch_chunks(self, document: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Chunk vectors of a stored document, in chunk order"""
+        chunk_count = int(document["metadata"].get("chunk_count", 0))
+        ids = [f"{document['id']}#{i}" for i in range(chunk_count)]
+        chunks = await self._fetch(ids)
+        return [chunks[chunk_id] for chunk_id in ids if chunk_id in chunks]
 
     async def find_similar_decks(self, deck_id: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Find similar pitch decks"""
-        # Get the vector for the deck
-        deck_vector = self.index.fetch(ids=[deck_id])
-        if not deck_vector.vectors:
-            return []
-            
-        # Search for similar decks
-        results = self.index.query(
-            vector=deck_vector.vectors[deck_id].values,
-            filter={"type": "deck"},
-            top_k=top_k,
-            include_metadata=True
+        return (await self.find_similar_decks_many([deck_id], top_k)).get(deck_id, [])
+
+    async def find_similar_decks_many(self, deck_ids: List[str], top_k: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+        """Top-k similar decks for each deck id, excluding the deck itself.
+
+        All deck vectors are fetched in a few batched requests and queried
+        together; unknown deck ids map to an empty list.
+        """
+        deck_ids = list(dict.fromkeys(deck_ids))
+        decks = await self._fetch(deck_ids)
+        found = [deck_id for deck_id in deck_ids if deck_id in decks]
+        matches = await self._backend_call(
+            "query_many", [decks[deck_id]["values"] for deck_id in found], top_k + 1, {"type": "deck"}
         )
-        
-        return results.matches
+
+        similar = {deck_id: [] for deck_id in deck_ids}
+        for deck_id, deck_matches in zip(found, matches):
+            similar[deck_id] = [match for match in deck_matches if match["id"] != deck_id][:top_k]
+        return similar
 
     async def compare_versions(self, deck_id_1: str, deck_id_2: str) -> Dict[str, Any]:
-        """Compare two versions of a pitch deck"""
-        # Get both vectors
-        vectors = self.index.fetch(ids=[deck_id_1, deck_id_2])
-        if not vectors.vectors:
+        """Compare two versions of a pitch deck.
+
+        The overall score is the cosine similarity of the two document vectors.
+        Each chunk of the first version is aligned with its closest chunk in the
+        second; chunks without a close counterpart on either side are reported
+        as diverged.
+        """
+        vectors = await self._fetch([deck_id_1, deck_id_2])
+        if deck_id_1 not in vectors or deck_id_2 not in vectors:
             return {"error": "One or both decks not found"}
-            
-        # Calculate similarity
-        similarity = self.index.query(
-            vector=vectors.vectors[deck_id_1].values,
-            filter={"id": deck_id_2},
-            top_k=1,
-            include_metadata=True
-        )
-        
-        return {
-            "similarity_score": similarity.matches[0].score if similarity.matches else 0,
-            "deck1_metadata": vectors.vectors[deck_id_1].metadata,
-            "deck2_metadata": vectors.vectors[deck_id_2].metadata
-        } 
\ No newline at end of file
+
+        deck_1, deck_2 = vectors[deck_id_1], vectors[deck_id_2]
+        similarity = _unit_rows([deck_1["values"]]) @ _unit_rows([deck_2["values"]]).T
+        comparison = {
+            "similarity_score": float(similarity[0, 0]),
+            "deck1_metadata": deck_1["metadata"],
+            "deck2_metadata": deck_2["metadata"],
+            "section_alignment": [],
+            "diverged_sections": [],
+            "new_sections": [],
+        }
+
+        chunks_1, chunks_2 = await asyncio.gather(self._fetch_chunks(deck_1), self._fetch_chunks(deck_2))
+        if not chunks_1 or not chunks_2:
+            # Decks stored before chunked ingestion only have a document vector
+            return comparison
+
+        scores = _unit_rows([c["values"] for c in chunks_1]) @ _unit_rows([c["values"] for c in chunks_2]).T
+        best_in_2 = scores.argmax(axis=1)
+        for i, chunk in enumerate(chunks_1):
+            match = chunks_2[best_in_2[i]]
+            score = float(scores[i, best_in_2[i]])
+            alignment = {
+                **_section_summary(chunk),
+                "matched_chunk_index": match["metadata"].get("chunk_index"),
+                "matched_page": match["metadata"].get("page"),
+                "similarity": score,
+            }
+            comparison["section_alignment"].append(alignment)
+            if score < SECTION_DIVERGENCE_THRESHOLD:
+                comparison["diverged_sections"].append(alignment)
+
+        best_in_1 = scores.max(axis=0)
+        comparison["new_sections"] = [
+            {**_section_summary(chunk), "similarity": float(best_in_1[j])}
+            for j, chunk in enumerate(chunks_2)
+            if best_in_1[j] < SECTION_DIVERGENCE_THRESHOLD
+        ]
+        return comparison
+
+_shared_store: Optional[VectorStore] = None
+_shared_lock = threading.Lock()
+
+def get_vector_store() -> VectorStore:
+    """Process-wide VectorStore, shared by the API and the crew tools"""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = VectorStore()
+        return _shared_store
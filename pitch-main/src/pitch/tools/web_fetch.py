@@ -0,0 +1,221 @@
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from .fetch_scheduler import WEB_RESPECT_ROBOTS, DomainScheduler, RobotsCache, domain_of, retry_after_seconds
+from .http_cache import HTTPCache, cache_key, get_http_cache
+
+WEB_CONNECT_TIMEOUT = float(os.getenv("WEB_CONNECT_TIMEOUT", 5))
+WEB_READ_TIMEOUT = float(os.getenv("WEB_READ_TIMEOUT", 10))
+WEB_MAX_PAGE_BYTES = int(os.getenv("WEB_MAX_PAGE_BYTES", 1024 * 1024))
+WEB_MAX_CONNECTIONS = int(os.getenv("WEB_MAX_CONNECTIONS", 20))
+# Overall limit for one fetch_many call; pages still loading then are cancelled
+WEB_FETCH_DEADLINE = float(os.getenv("WEB_FETCH_DEADLINE", 15))
+USER_AGENT = os.getenv("WEB_USER_AGENT", "Mozilla/5.0 (compatible; PitchAnalyzer/0.1)")
+WEB_FETCH_RETRIES = int(os.getenv("WEB_FETCH_RETRIES", 1))  # retries of a 429/503, after the domain's backoff
+
+class FetchDisallowed(Exception):
+    """The site's robots.txt does not allow fetching the URL"""
+
+def decode_body(body: bytes, encoding: Optional[str]) -> str:
+    try:
+        return body.decode(encoding or "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+class PageFetcher:
+    """Pooled async HTTP client for fetching many pages at once.
+
+    The client lives on a private event-loop thread, so synchronous callers
+    such as crew tools (which may run on the API's own loop) can use it via
+    fetch_many_sync() and still share keep-alive connections between calls.
+    Pages are read up to WEB_MAX_PAGE_BYTES; anything beyond is dropped.
+    Complete successful responses go through the on-disk HTTP cache, whose
+    SQLite calls run in worker threads so they never stall the loop.
+
+    Network requests are paced per domain by a DomainScheduler and checked
+    against robots.txt, and concurrent fetches of the same URL share one
+    request, so parallel crew runs do not get the app throttled.
+    """
+
+    def __init__(self, max_bytes: int = WEB_MAX_PAGE_BYTES, cache: Optional[HTTPCache] = None,
+                 scheduler: Optional[DomainScheduler] = None, respect_robots: bool = WEB_RESPECT_ROBOTS):
+        self.max_bytes = max_bytes
+        self.cache = cache if cache is not None else get_http_cache()
+        self.scheduler = scheduler or DomainScheduler()
+        self.robots = RobotsCache(self._fetch_robots, self.scheduler) if respect_robots else None
+        # (url, headers) -> [task, waiters]; only touched from the fetcher's loop thread
+        self._inflight: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="page-fetcher", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Only touched from the fetcher's loop thread
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(WEB_READ_TIMEOUT, connect=WEB_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=WEB_MAX_CONNECTIONS, max_keepalive_connections=WEB_MAX_CONNECTIONS),
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._client
+
+    @staticmethod
+    def _cached_page(entry: Dict[str, Any]) -> Dict[str, Any]:
+        content_type = entry["headers"].get("content-type", "")
+        charset = content_type.split("charset=")[-1].split(";")[0].strip() if "charset=" in content_type else None
+        return {
+            "url": entry["url"],
+            "status": entry["status"],
+            "headers": entry["headers"],
+            "body": entry["body"],
+            "text": decode_body(entry["body"], charset),
+            "truncated": False,
+            "cached": True,
+        }
+
+    async def _fetch_robots(self, url: str) -> Tuple[int, str]:
+        async with self.scheduler.slot(domain_of(url)):
+            response = await self.client.get(url)
+        return response.status_code, response.text[:512 * 1024]
+
+    async def _request(self, url: str, headers: Dict[str, str], key: str,
+                       entry: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        chunks, size, truncated = [], 0, False
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if entry and response.status_code == 304:
+                await asyncio.to_thread(self.cache.refresh, key, dict(response.headers))
+                return self._cached_page(entry)
+
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.max_bytes:
+                    truncated = True
+                    break
+            body = b"".join(chunks)[:self.max_bytes]
+            if self.cache and response.status_code == 200 and not truncated:
+                await asyncio.to_thread(self.cache.put, key, str(response.url), response.status_code, dict(response.headers), body)
+            return {
+                "url": str(response.url),
+                "status": response.status_code,
+                "headers": dict(response.headers),
+                "body": body,
+                "text": decode_body(body, response.encoding),
+                "truncated": truncated,
+                "cached": False,
+            }
+
+    async def _fetch_network(self, url: str, headers: Dict[str, str], key: str,
+                             entry: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if self.robots and not await self.robots.allowed(url):
+            raise FetchDisallowed(url)
+        domain = domain_of(url)
+        for attempt in range(WEB_FETCH_RETRIES + 1):
+            async with self.scheduler.slot(domain):
+                page = await self._request(url, headers, key, entry)
+            if page["status"] not in (429, 503):
+                self.scheduler.succeeded(domain)
+                return page
+            # Pauses the whole domain; the retry waits for it in slot()
+            self.scheduler.throttled(domain, retry_after_seconds(page["headers"].get("retry-after")))
+        return page
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """GET a page: {"url", "status", "headers", "body", "text", "truncated", "cached"}
+
+        Raises FetchDisallowed when robots.txt excludes the URL.
+        """
+        key = cache_key("GET", url)
+        entry = await asyncio.to_thread(self.cache.get, key) if self.cache else None
+        if entry and entry["fresh"]:
+            return self._cached_page(entry)
+
+        headers = dict(headers or {})
+        flight_key = (url, tuple(sorted(headers.items())))
+        if entry:
+            headers.update(HTTPCache.revalidation_headers(entry))
+        flight = self._inflight.get(flight_key)
+        if flight is None:
+            task = asyncio.ensure_future(self._fetch_network(url, headers, key, entry))
+            flight = self._inflight[flight_key] = [task, 0]
+            task.add_done_callback(lambda _: self._inflight.pop(flight_key, None))
+        flight[1] += 1
+        try:
+            return await asyncio.shield(flight[0])
+        finally:
+            flight[1] -= 1
+            # The last caller to give up (e.g. fetch_many cancelling stragglers) cancels the request
+            if flight[1] == 0 and not flight[0].done():
+                flight[0].cancel()
+
+    async def fetch_many(self, urls: List[str], enough: Optional[int] = None,
+                         deadline: float = WEB_FETCH_DEADLINE) -> List[Optional[Dict[str, Any]]]:
+        """Fetch pages concurrently, in the order given (None for failures).
+
+        Once `enough` pages have loaded successfully, or `deadline` seconds
+        have passed, the remaining requests are cancelled. Pages that had
+        already finished by then are kept, so more than `enough` may be
+        returned, but which of the others survive is best-effort.
+        """
+        enough = len(urls) if enough is None else enough
+
+        async def fetch_one(index: int, url: str):
+            try:
+                return index, await self.fetch(url)
+            except FetchDisallowed:
+                return index, None
+            except Exception as e:
+                print(f"Page fetch error for {url}: {e!r}")
+                return index, None
+
+        tasks = [asyncio.ensure_future(fetch_one(i, url)) for i, url in enumerate(urls)]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+        succeeded = 0
+        try:
+            for done in asyncio.as_completed(tasks, timeout=deadline):
+                index, page = await done
+                results[index] = page
+                if page is not None and page["status"] < 400:
+                    succeeded += 1
+                    if succeeded >= enough:
+                        break
+        except asyncio.TimeoutError:
+            print(f"Page fetch deadline of {deadline}s reached")
+        finally:
+            # Keep pages that finished alongside the last one awaited, then cancel the stragglers
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    index, page = task.result()
+                    results[index] = page
+                else:
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return results
+
+    def fetch_many_sync(self, urls: List[str], enough: Optional[int] = None,
+                        deadline: float = WEB_FETCH_DEADLINE) -> List[Optional[Dict[str, Any]]]:
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.fetch_many(urls, enough, deadline), loop).result()
+
+_shared_fetcher: Optional[PageFetcher] = None
+_shared_lock = threading.Lock()
+
+def get_page_fetcher() -> PageFetcher:
+    """Process-wide fetcher, so every tool instance shares one connection pool"""
+    global _shared_fetcher
+    with _shared_lock:
+        if _shared_fetcher is None:
+            _shared_fetcher = PageFetcher()
+        return _shared_fetcher
@@ -18,6 +18,16 @@ class Deck(DeckBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class DeckSummary(BaseModel):
+    # Deck listing entry; every field is optional so /decks can project columns
+    id: Optional[int] = None
+    filename: Optional[str] = None
+    deck_metadata: Optional[Any] = None
+    createdAt: Optional[datetime] = Field(None, alias="upload_date")
+    status: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
 class AnalysisBase(BaseModel):
     status: str
 
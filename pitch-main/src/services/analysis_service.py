@@ -1,17 +1,41 @@
 import os
 import json
+import hashlib
 from sqlalchemy.orm import Session
 from datetime import datetime # Import datetime
 from .. import database, models, config # Import config
+from . import analytics_service  # Keeps dashboard counters in step with status changes
 # Assuming you have an AI client initialized elsewhere or will initialize it here
 # import openai # Import openai
 from groq import Groq # Import Groq
 # Import libraries for reading different file types
 from pptx import Presentation # For .pptx
 from pypdf import PdfReader # For .pdf
+from ..pitch.cache import cache
 
 print("analysis_service.py is being loaded") # Added print statement
 
+# LLM outputs keyed by deck content; a new model or prompt version starts a fresh set of keys
+analysis_cache = cache.namespace("analysis", f"{config.GROQ_MODEL}:{config.ANALYSIS_PROMPT_VERSION}")
+
+# Changes here need a new ANALYSIS_PROMPT_VERSION
+ANALYSIS_PROMPT = """Analyze the following pitch deck content and provide a detailed analysis in JSON format.
+The response should include:
+1. overall_score (0-100)
+2. pitch_analysis (clarity, storytelling, value proposition)
+3. market_research (market size, competition, growth potential)
+4. financial_analysis (revenue model, projections, funding needs)
+5. generated_report (detailed analysis in markdown format)
+
+Pitch deck content:
+{content}
+
+Respond with a valid JSON object containing these sections."""
+
+def deck_tag(deck_id: int) -> str:
+    """Cache tag of everything derived from one deck"""
+    return f"deck:{deck_id}"
+
 def read_file_content(file_path: str) -> str:
     """Read content from PDF or PPTX file."""
     print(f"Reading file: {file_path}")
@@ -54,74 +78,69 @@ def perform_analysis(analysis_id: int, file_path: str):
         file_content = read_file_content(file_path)
         print(f"Successfully read file content, length: {len(file_content)}")
 
-        # Prepare the prompt
-        prompt = """Analyze the following pitch deck content and provide a detailed analysis in JSON format.
-The response should include:
-1. overall_score (0-100)
-2. pitch_analysis (clarity, storytelling, value proposition)
-3. market_research (market size, competition, growth potential)
-4. financial_analysis (revenue model, projections, funding needs)
-5. generated_report (detailed analysis in markdown format)
-
-Pitch deck content:
-{content}
-
-Respond with a valid JSON object containing these sections."""
-
-        # Initialize Groq client
-        print("Initializing Groq client...")
-        try:
-            client = Groq(api_key=config.GROQ_API_KEY)
-            print("Successfully initialized Groq client")
-        except Exception as client_error:
-            print(f"Error initializing Groq client: {str(client_error)}")
-            raise
-
-        # Make API call
-        print("Preparing to make Groq API call...")
-        try:
-            print("Creating chat completion request...")
-            response = client.chat.completions.create(
-                model="llama3-8b-8192",  # Updated to use supported model
-                response_format={"type": "json_object"},
-                messages=[
-                    {"role": "system", "content": "You are a pitch deck analysis AI that provides detailed, structured analysis in JSON format."},
-                    {"role": "user", "content": prompt.format(content=file_content)}
-                ],
-                temperature=0.7,
-                max_tokens=4096
-            )
-            print("Successfully made Groq API call")
-        except Exception as api_error:
-            print(f"Error during Groq API call: {str(api_error)}")
-            raise
+        def run_model() -> dict:
+            # Initialize Groq client
+            print("Initializing Groq client...")
+            try:
+                client = Groq(api_key=config.GROQ_API_KEY)
+                print("Successfully initialized Groq client")
+            except Exception as client_error:
+                print(f"Error initializing Groq client: {str(client_error)}")
+                raise
+
+            # Make API call
+            print("Preparing to make Groq API call...")
+            try:
+                print("Creating chat completion request...")
+                response = client.chat.completions.create(
+                    model=config.GROQ_MODEL,
+                    response_format={"type": "json_object"},
+                    messages=[
+                        {"role": "system", "content": "You are a pitch deck analysis AI that provides detailed, structured analysis in JSON format."},
+                        {"role": "user", "content": ANALYSIS_PROMPT.format(content=file_content)}
+                    ],
+                    temperature=0.7,
+                    max_tokens=4096
+                )
+                print("Successfully made Groq API call")
+            except Exception as api_error:
+                print(f"Error during Groq API call: {str(api_error)}")
+                raise
         
-        print("Received response from Groq API")
+            print("Received response from Groq API")
         
-        if not response:
-            print("Response object is None")
-            raise ValueError("Groq API returned None response")
+            if not response:
+                print("Response object is None")
+                raise ValueError("Groq API returned None response")
         
-        if not hasattr(response, 'choices'):
-            print(f"Response object has no 'choices' attribute. Response type: {type(response)}")
-            raise ValueError("Groq API response has no 'choices' attribute")
+            if not hasattr(response, 'choices'):
+                print(f"Response object has no 'choices' attribute. Response type: {type(response)}")
+                raise ValueError("Groq API response has no 'choices' attribute")
             
-        if not response.choices:
-            print("Response.choices is empty")
-            raise ValueError("Groq API returned empty choices")
-
-        # Extract and parse the response
-        print("Extracting response content...")
-        ai_response_text = response.choices[0].message.content
-        print(f"Raw AI response: {ai_response_text[:200]}...")  # Print first 200 chars
+            if not response.choices:
+                print("Response.choices is empty")
+                raise ValueError("Groq API returned empty choices")
+
+            # Extract and parse the response
+            print("Extracting response content...")
+            ai_response_text = response.choices[0].message.content
+            print(f"Raw AI response: {ai_response_text[:200]}...")  # Print first 200 chars
         
-        try:
-            print("Parsing JSON response...")
-            analysis_result = json.loads(ai_response_text)
-            print("Successfully parsed JSON response")
-        except json.JSONDecodeError as e:
-            print(f"Error parsing JSON response: {e}")
-            raise ValueError(f"Invalid JSON response from AI: {e}")
+            try:
+                print("Parsing JSON response...")
+                analysis_result = json.loads(ai_response_text)
+                print("Successfully parsed JSON response")
+            except json.JSONDecodeError as e:
+                print(f"Error parsing JSON response: {e}")
+                raise ValueError(f"Invalid JSON response from AI: {e}")
+            return analysis_result
+
+        # A deck's content is analyzed once per model and prompt version (retries reuse it);
+        # delete_deck invalidates the deck's tag
+        digest = hashlib.sha256(file_content.encode()).hexdigest()
+        analysis_result = analysis_cache.get_or_set(
+            f"{analysis.deck_id}:{digest}", run_model, expire=config.ANALYSIS_CACHE_TTL, tags=(deck_tag(analysis.deck_id),)
+        )
 
         # Create AnalysisResult record
         print("Creating AnalysisResult record...")
@@ -0,0 +1,148 @@
+from collections import Counter
+from typing import Dict
+from sqlalchemy import event, select, update, insert, func, literal, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from .. import models
+
+# Dashboard counters are kept in the dashboard_counters table and adjusted in
+# the same transaction as the deck/analysis rows they count, so reading them
+# costs one small query regardless of table size.
+
+DECKS_COUNTER = "decks"
+ANALYSIS_STATUSES = ("pending", "processing", "completed", "failed")
+
+counters_table = models.DashboardCounter.__table__
+
+def status_counter(status: str) -> str:
+    return f"analysis:{status}"
+
+def _flushed_status(analysis: models.Analysis):
+    """Status of an analysis as currently stored in the database"""
+    history = get_history(analysis, "status")
+    values = history.deleted or history.unchanged
+    return values[0] if values else None
+
+def _counter_deltas(session: Session) -> Counter:
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, models.Deck):
+            deltas[DECKS_COUNTER] += 1
+        elif isinstance(obj, models.Analysis) and obj.status:
+            deltas[status_counter(obj.status)] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, models.Deck):
+            deltas[DECKS_COUNTER] -= 1
+        elif isinstance(obj, models.Analysis):
+            status = _flushed_status(obj)
+            if status:
+                deltas[status_counter(status)] -= 1
+
+    for obj in session.dirty:
+        if isinstance(obj, models.Analysis):
+            history = get_history(obj, "status")
+            if not history.has_changes():
+                continue
+            for status in history.deleted:
+                if status:
+                    deltas[status_counter(status)] -= 1
+            for status in history.added:
+                if status:
+                    deltas[status_counter(status)] += 1
+    return deltas
+
+def _dialect_insert(dialect: str):
+    """INSERT construct with ON CONFLICT support for the dialect, or None"""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+def counter_updates(deltas: Dict[str, int], dialect: str = ""):
+    """Statements applying the given deltas to the counters table.
+
+    On SQLite and PostgreSQL these are upserts, so a status outside
+    ANALYSIS_STATUSES gets its counter on first use; elsewhere only
+    seeded counters are updated.
+    """
+    dialect_insert = _dialect_insert(dialect)
+    statements = []
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        if dialect_insert is None:
+            statements.append(
+                update(counters_table)
+                .where(counters_table.c.name == name)
+                .values(value=counters_table.c.value + delta)
+            )
+        else:
+            statements.append(
+                dialect_insert(counters_table)
+                .values(name=name, value=delta)
+                .on_conflict_do_update(index_elements=[counters_table.c.name], set_={"value": counters_table.c.value + delta})
+            )
+    return statements
+
+@event.listens_for(Session, "after_flush")
+def _apply_counter_deltas(session: Session, flush_context):
+    # new/dirty/deleted and attribute history still describe the flush here
+    deltas = _counter_deltas(session)
+    if any(deltas.values()):
+        connection = session.connection()
+        for statement in counter_updates(deltas, connection.dialect.name):
+            connection.execute(statement)
+
+def grouped_counts_query():
+    """Single grouped query producing (name, value) rows for every counter"""
+    decks = select(
+        literal(DECKS_COUNTER).label("name"),
+        func.count(models.Deck.id).label("value")
+    )
+    analyses = select(
+        (literal("analysis:") + models.Analysis.status).label("name"),
+        func.count(models.Analysis.id).label("value")
+    ).group_by(models.Analysis.status)
+    return union_all(decks, analyses)
+
+def seed_counters(connection: Connection, rebuild: bool = False):
+    """Populate the counters table from the grouped query.
+
+    Runs at startup when the table is empty; pass rebuild=True to recount
+    from scratch after out-of-band changes to the counted tables.
+    """
+    if not rebuild and connection.execute(select(func.count()).select_from(counters_table)).scalar():
+        return
+    counts = {DECKS_COUNTER: 0, **{status_counter(status): 0 for status in ANALYSIS_STATUSES}}
+    for name, value in connection.execute(grouped_counts_query()):
+        if name is not None:
+            counts[name] = value
+    rows = [{"name": name, "value": value} for name, value in counts.items()]
+    if rebuild:
+        connection.execute(counters_table.delete())
+        connection.execute(insert(counters_table), rows)
+        return
+    # Workers starting together can all find the table empty; whoever seeds first wins
+    dialect_insert = _dialect_insert(connection.dialect.name)
+    if dialect_insert is not None:
+        connection.execute(dialect_insert(counters_table).on_conflict_do_nothing(index_elements=[counters_table.c.name]), rows)
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(counters_table), rows)
+    except IntegrityError:
+        pass
+
+async def read_counters(db: AsyncSession) -> Dict[str, int]:
+    """Current counter values, falling back to the grouped query if unseeded"""
+    rows = (await db.execute(select(counters_table.c.name, counters_table.c.value))).all()
+    if not rows:
+        rows = (await db.execute(grouped_counts_query())).all()
+    return {name: value for name, value in rows if name is not None}
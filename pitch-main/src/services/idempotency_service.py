@@ -0,0 +1,57 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, config
+
+def request_fingerprint(*parts) -> str:
+    """Hash the parts of a request that must match when an Idempotency-Key is reused."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+async def reserve_key(db: AsyncSession, key: str, request_hash: str) -> Optional[models.IdempotencyKey]:
+    """Claim an idempotency key for a new request.
+
+    Returns None when this call claimed the key, otherwise the record of the
+    request that already holds it. The primary key on `key` makes the claim
+    safe across workers sharing the database.
+    """
+    now = datetime.utcnow()
+    existing = await db.get(models.IdempotencyKey, key)
+    if existing is not None and existing.expires_at <= now:
+        await db.delete(existing)
+        await db.commit()
+        existing = None
+    if existing is not None:
+        return existing
+
+    db.add(models.IdempotencyKey(
+        key=key,
+        request_hash=request_hash,
+        expires_at=now + timedelta(seconds=config.IDEMPOTENCY_KEY_TTL)
+    ))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another worker claimed the key between our lookup and insert
+        await db.rollback()
+        return await db.get(models.IdempotencyKey, key)
+    return None
+
+async def complete_key(db: AsyncSession, key: str, response: dict):
+    """Store the response that retries with this key should receive."""
+    record = await db.get(models.IdempotencyKey, key)
+    if record is not None:
+        record.response = response
+        await db.commit()
+
+async def release_key(db: AsyncSession, key: str):
+    """Drop a claimed key so a retry after a failure starts a fresh job."""
+    await db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.key == key))
+    await db.commit()
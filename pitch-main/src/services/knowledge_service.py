@@ -0,0 +1,23 @@
+from typing import Any, Dict, List, Optional
+from .. import models
+from ..pitch.tools.knowledge_ingest import get_knowledge_ingestor
+from ..pitch.tools.vector_store import get_vector_store
+
+# The vector backend and embedding client are created on first use
+vector_store = get_vector_store()
+knowledge_ingestor = get_knowledge_ingestor()
+
+async def index_knowledge_file(knowledge_file: models.KnowledgeFile) -> Optional[str]:
+    """Chunk, embed and keyword-index an uploaded knowledge file, replacing any earlier version"""
+    metadata = {
+        "knowledge_file_id": knowledge_file.id,
+        "file_type": knowledge_file.file_type or "",
+    }
+    try:
+        return await knowledge_ingestor.ingest_file(knowledge_file.file_path, metadata)
+    except Exception as e:
+        print(f"Knowledge indexing error for {knowledge_file.filename}: {e}")
+        return None
+
+async def search(query: str, filter_criteria: Dict[str, Any] = None, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+    return await vector_store.hybrid_search(query, filter_criteria, top_k=limit, offset=offset)
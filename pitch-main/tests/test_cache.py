@@ -0,0 +1,220 @@
+import threading
+import time
+
+import pytest
+
+from pitch import cache as cache_module
+from pitch.cache import Cache, LocalCache
+from pitch.serializers import encode
+
+class StubRedis:
+    """The slice of the redis.Redis API that Cache uses, kept in a dict (expiry is ignored)"""
+
+    def __init__(self):
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value.encode() if isinstance(value, str) else value
+            return True
+
+    def setex(self, key, expire, value):
+        return self.set(key, value)
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self.data.get(key, 0)) + 1
+            self.data[key] = str(value).encode()
+            return value
+
+    def pipeline(self, transaction=True):
+        return StubPipeline(self)
+
+class StubPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((getattr(self.client, name), args))
+
+    def execute(self):
+        return [method(*args) for method, args in self.calls]
+
+class Loader:
+    """Counts calls; returns `value` (or raises `error`) once `release` is set"""
+
+    def __init__(self, value="loaded", error=None, wait=False):
+        self.value, self.error = value, error
+        self.calls = 0
+        self.release = threading.Event()
+        if not wait:
+            self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return self.value
+
+@pytest.fixture
+def redis_stub():
+    return StubRedis()
+
+@pytest.fixture
+def cache(redis_stub):
+    return Cache(client=redis_stub)
+
+def wait_for_refreshes():
+    for thread in threading.enumerate():
+        if thread.name == "cache-refresh":
+            thread.join(5)
+
+def test_local_cache_evicts_least_recently_used_and_expired(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    local = LocalCache(max_entries=2)
+    local.put("a", 1, ttl=10)
+    local.put("b", 2, ttl=10)
+    local.get("a")
+    local.put("c", 3, ttl=10)
+    assert (local.get("a"), local.get("b"), local.get("c")) == (1, None, 3)
+
+    now[0] += 11
+    assert local.get("a") is None
+
+def test_loaded_value_is_cached_in_both_tiers(cache, redis_stub):
+    loader = Loader()
+    assert cache.get_or_set("k", loader) == "loaded"
+    assert cache.get_or_set("k", loader) == "loaded"
+    assert loader.calls == 1
+    assert "k" in redis_stub.data and "k:lock" not in redis_stub.data
+
+    cache.local.clear()
+    assert cache.get_or_set("k", loader) == "loaded"
+    assert loader.calls == 1
+
+def test_none_is_not_cached(cache, redis_stub):
+    loader = Loader(value=None)
+    assert cache.get_or_set("k", loader) is None
+    assert cache.get_or_set("k", loader) is None
+    assert loader.calls == 2
+    assert "k" not in redis_stub.data
+
+def run_concurrently(count, target):
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+def test_concurrent_misses_share_one_load(cache):
+    loader = Loader(wait=True)
+    threads, results = run_concurrently(8, lambda: cache.get_or_set("k", loader))
+    time.sleep(0.1)
+    loader.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["loaded"] * 8
+    assert loader.calls == 1
+
+def test_loader_error_reaches_every_waiting_caller(cache, redis_stub):
+    loader = Loader(error=ValueError("upstream down"), wait=True)
+    threads, results = run_concurrently(4, lambda: cache.get_or_set("k", loader))
+    time.sleep(0.1)
+    loader.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [str(result) for result in results] == ["upstream down"] * 4
+    assert loader.calls == 1
+    assert not redis_stub.data  # neither a value nor the lock is left behind
+
+def test_waits_for_another_workers_load(cache, redis_stub):
+    redis_stub.set("k:lock", "other-worker")
+
+    def other_worker_finishes():
+        time.sleep(0.1)
+        redis_stub.set("k", encode("theirs", meta={"fresh_until": time.time() + 60}))
+        redis_stub.delete("k:lock")
+    threading.Thread(target=other_worker_finishes).start()
+    loader = Loader()
+
+    assert cache.get_or_set("k", loader) == "theirs"
+    assert loader.calls == 0
+
+def test_loads_itself_when_the_other_worker_gives_up(cache, redis_stub):
+    redis_stub.set("k:lock", "other-worker")
+    threading.Timer(0.1, redis_stub.delete, args=("k:lock",)).start()
+    loader = Loader()
+
+    assert cache.get_or_set("k", loader) == "loaded"
+    assert loader.calls == 1
+
+def test_stale_value_is_served_while_one_refresh_runs(redis_stub):
+    cache = Cache(client=redis_stub, local_size=0)
+    redis_stub.set("k", encode("old", meta={"fresh_until": time.time() - 1}))
+    loader = Loader(value="new", wait=True)
+
+    assert cache.get_or_set("k", loader, expire=60) == "old"
+    assert cache.get_or_set("k", loader, expire=60) == "old"
+    loader.release.set()
+    wait_for_refreshes()
+
+    assert loader.calls == 1
+    assert cache.get_or_set("k", loader, expire=60) == "new"
+
+def test_invalidated_tags_miss_and_other_entries_survive(cache):
+    first, second = Loader(value="deck 1"), Loader(value="deck 2")
+    cache.get_or_set("a", first, tags=("deck:1",))
+    cache.get_or_set("b", second, tags=("deck:2",))
+    cache.invalidate_tags(["deck:1"])
+
+    assert cache.local.get("a") is None and cache.local.get("b") is not None
+    cache.get_or_set("a", first, tags=("deck:1",))
+    cache.get_or_set("b", second, tags=("deck:2",))
+    assert (first.calls, second.calls) == (2, 1)
+
+    cache.local.clear()  # the Redis copy is checked against the tag version too
+    cache.get_or_set("a", first, tags=("deck:1",))
+    assert first.calls == 2
+    cache.invalidate_tags(["deck:1"])
+    cache.local.clear()
+    cache.get_or_set("a", first, tags=("deck:1",))
+    assert first.calls == 3
+
+def test_load_spanning_an_invalidation_is_stored_as_stale(cache):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        if len(calls) == 1:
+            cache.invalidate_tags(["deck:1"])  # the deck changes while its value is computed
+        return f"version {len(calls)}"
+
+    assert cache.get_or_set("a", loader, tags=("deck:1",)) == "version 1"
+    assert cache.get_or_set("a", loader, tags=("deck:1",)) == "version 2"
+    assert cache.get_or_set("a", loader, tags=("deck:1",)) == "version 2"
@@ -0,0 +1,134 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pitch.tools import http_cache
+from pitch.tools.http_cache import HTTPCache, cached_request
+
+class Origin(BaseHTTPRequestHandler):
+    """Serves /<name> from `pages`: {"body", "etag", "last_modified", "cache_control"}"""
+
+    pages = {}
+    requests = []
+
+    def do_GET(self):
+        page = self.pages[self.path]
+        self.requests.append((self.path, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+        not_modified = (
+            (page.get("etag") and self.headers.get("If-None-Match") == page["etag"])
+            or (page.get("last_modified") and self.headers.get("If-Modified-Since") == page["last_modified"])
+        )
+        self.send_response(304 if not_modified else 200)
+        for header, key in (("ETag", "etag"), ("Last-Modified", "last_modified"), ("Cache-Control", "cache_control")):
+            if page.get(key):
+                self.send_header(header, page[key])
+        if not_modified:
+            self.end_headers()
+            return
+        self.send_header("Content-Length", str(len(page["body"])))
+        self.end_headers()
+        self.wfile.write(page["body"])
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def origin():
+    Origin.pages, Origin.requests = {}, []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Origin)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = HTTPCache(path=str(tmp_path / "http.sqlite"))
+    monkeypatch.setattr(http_cache, "WEB_CACHE", True)
+    monkeypatch.setattr(http_cache, "_shared_cache", cache)
+    return cache
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the cache module"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(http_cache.time, "time", lambda: now[0])
+    return now
+
+def test_fresh_response_is_served_without_a_request(origin, cache, clock):
+    Origin.pages["/a"] = {"body": b"fresh", "cache_control": "max-age=60"}
+    first = cached_request("GET", f"{origin}/a")
+    clock[0] += 30
+    second = cached_request("GET", f"{origin}/a")
+
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["body"] == b"fresh"
+    assert len(Origin.requests) == 1
+
+def test_ttl_overrides_response_lifetime(origin, cache, clock):
+    Origin.pages["/a"] = {"body": b"api", "cache_control": "no-cache", "etag": '"v1"'}
+    cached_request("GET", f"{origin}/a", ttl=60)
+    clock[0] += 30
+    assert cached_request("GET", f"{origin}/a", ttl=60)["cached"]
+    clock[0] += 60
+    cached_request("GET", f"{origin}/a", ttl=60)
+
+    assert len(Origin.requests) == 2
+
+def test_stale_entry_is_revalidated_with_etag(origin, cache, clock):
+    Origin.pages["/a"] = {"body": b"v1", "etag": '"v1"', "cache_control": "max-age=10"}
+    cached_request("GET", f"{origin}/a")
+    clock[0] += 20
+    revalidated = cached_request("GET", f"{origin}/a")
+
+    assert revalidated["cached"] and revalidated["body"] == b"v1"
+    assert Origin.requests[-1] == ("/a", '"v1"', None)
+    # The 304 renewed the entry
+    clock[0] += 5
+    cached_request("GET", f"{origin}/a")
+    assert len(Origin.requests) == 2
+
+def test_stale_entry_is_revalidated_with_last_modified(origin, cache, clock):
+    last_modified = "Wed, 01 May 2024 09:00:00 GMT"
+    Origin.pages["/a"] = {"body": b"page", "last_modified": last_modified, "cache_control": "no-cache"}
+    cached_request("GET", f"{origin}/a")
+    revalidated = cached_request("GET", f"{origin}/a")
+
+    assert revalidated["cached"] and revalidated["body"] == b"page"
+    assert Origin.requests[-1] == ("/a", None, last_modified)
+
+def test_changed_resource_replaces_entry(origin, cache, clock):
+    Origin.pages["/a"] = {"body": b"v1", "etag": '"v1"', "cache_control": "no-cache"}
+    cached_request("GET", f"{origin}/a")
+    Origin.pages["/a"] = {"body": b"v2", "etag": '"v2"', "cache_control": "no-cache"}
+    changed = cached_request("GET", f"{origin}/a")
+
+    assert not changed["cached"] and changed["body"] == b"v2"
+    assert cache.get(f"{origin}/a")["etag"] == '"v2"'
+
+def test_no_store_is_not_cached(origin, cache, clock):
+    Origin.pages["/a"] = {"body": b"secret", "cache_control": "no-store"}
+    cached_request("GET", f"{origin}/a")
+    cached_request("GET", f"{origin}/a")
+
+    assert cache.get(f"{origin}/a") is None
+    assert len(Origin.requests) == 2
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    body = os.urandom(1000)  # incompressible, so each entry costs ~1000 bytes
+    cache = HTTPCache(path=str(tmp_path / "http.sqlite"), max_bytes=2500)
+    cache.put("a", "a", 200, {}, body)
+    clock[0] += 1
+    cache.put("b", "b", 200, {}, body)
+    clock[0] += 1
+    cache.get("a")
+    clock[0] += 1
+    cache.put("c", "c", 200, {}, body)
+
+    assert cache.get("b") is None
+    assert cache.get("a")["body"] == body and cache.get("c")["body"] == body
+    # The size accounting survives a reopen
+    assert HTTPCache(path=str(tmp_path / "http.sqlite"), max_bytes=2500)._total_bytes == cache._total_bytes
@@ -0,0 +1,93 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from pitch.tools.vector_backends import LocalVectorBackend
+
+DIM = 4
+
+def vector(vector_id, *values, **metadata):
+    return {"id": vector_id, "values": list(values), "metadata": metadata}
+
+@pytest.fixture(params=[None, "int8"])
+def open_index(tmp_path, request):
+    return lambda: LocalVectorBackend(path=str(tmp_path), dimension=DIM, quantization=request.param)
+
+def test_upserts_survive_a_reload(open_index):
+    index = open_index()
+    index.upsert([vector("a", 1, 0, 0, 0, kind="x"), vector("b", 0, 1, 0, 0)])
+    index.upsert([vector("c", 0, 0, 1, 0)])
+    index.delete(ids=["b"])
+
+    reloaded = open_index()
+    assert len(reloaded) == 2
+    assert reloaded.fetch(["a"])["a"]["metadata"] == {"kind": "x"}
+    assert reloaded.query([0, 0, 1, 0], top_k=1)[0]["id"] == "c"
+    assert reloaded.fetch(["b"]) == {}
+
+def test_overwrite_keeps_the_latest_vector(open_index):
+    index = open_index()
+    index.upsert([vector("a", 1, 0, 0, 0)])
+    index.upsert([vector("a", 0, 1, 0, 0)])
+
+    assert open_index().fetch(["a"])["a"]["values"] == [0, 1, 0, 0]
+
+def test_compaction_drops_dead_rows(tmp_path, open_index):
+    index = open_index()
+    index.upsert([vector("a", 1, 0, 0, 0), vector("b", 0, 1, 0, 0)])
+    index.upsert([vector("a", 0, 0, 1, 0)])
+    index.delete(ids=["b"])
+    index.compact()
+
+    assert os.path.getsize(tmp_path / "vectors.f32") == DIM * 4
+    assert len((tmp_path / "records.jsonl").read_text().splitlines()) == 1
+    assert open_index().query([0, 0, 1, 0], top_k=5)[0]["id"] == "a"
+
+def test_torn_record_and_surplus_vectors_are_trimmed(tmp_path, open_index):
+    index = open_index()
+    index.upsert([vector("a", 1, 0, 0, 0)])
+    # A crash after the vector append, halfway through its record
+    with open(tmp_path / "vectors.f32", "ab") as out:
+        out.write(np.ones(DIM, dtype=np.float32).tobytes())
+    with open(tmp_path / "records.jsonl", "a") as records:
+        records.write('{"id": "b", "meta')
+
+    reloaded = open_index()
+    assert len(reloaded) == 1
+    assert os.path.getsize(tmp_path / "vectors.f32") == DIM * 4
+    reloaded.upsert([vector("c", 0, 1, 0, 0)])
+    assert sorted(open_index().fetch(["a", "b", "c"])) == ["a", "c"]
+
+def test_records_without_vectors_are_dropped(tmp_path, open_index):
+    index = open_index()
+    index.upsert([vector("a", 1, 0, 0, 0), vector("b", 0, 1, 0, 0)])
+    with open(tmp_path / "vectors.f32", "r+b") as vectors:
+        vectors.truncate(DIM * 4 + 3)
+
+    reloaded = open_index()
+    assert sorted(reloaded.fetch(["a", "b"])) == ["a"]
+    assert [json.loads(line)["id"] for line in (tmp_path / "records.jsonl").read_text().splitlines()] == ["a"]
+
+def test_interrupted_compaction_is_finished_or_discarded(tmp_path, open_index):
+    index = open_index()
+    index.upsert([vector("a", 1, 0, 0, 0), vector("b", 0, 1, 0, 0)])
+    index.delete(ids=["b"])
+    live_vectors = np.array([1, 0, 0, 0], dtype=np.float32).tobytes()
+    live_records = json.dumps({"id": "a", "metadata": {}}) + "\n"
+
+    # Crash before the marker: the half-written temp files are thrown away
+    (tmp_path / "vectors.f32.tmp").write_bytes(live_vectors[:5])
+    assert sorted(open_index().fetch(["a", "b"])) == ["a"]
+    assert not (tmp_path / "vectors.f32.tmp").exists()
+
+    # Crash between the two renames: the records file is brought up to date
+    os.replace(tmp_path / "vectors.f32", tmp_path / "old.f32")
+    (tmp_path / "vectors.f32").write_bytes(live_vectors)
+    (tmp_path / "records.jsonl.tmp").write_text(live_records)
+    (tmp_path / "compact.pending").touch()
+    reloaded = open_index()
+    assert reloaded.fetch(["a"])["a"]["values"] == [1, 0, 0, 0]
+    assert (tmp_path / "records.jsonl").read_text() == live_records
+    assert not (tmp_path / "compact.pending").exists()
@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pytest
+
+from pitch.serializers import FLAG_META, FLAG_ZLIB, MAGIC, SERIALIZERS, decode, encode, get_serializer
+
+def test_header_names_serializer_and_flags():
+    data = encode({"a": 1}, "json", compress_min_bytes=0)
+    assert data[0] == MAGIC
+    assert data[1] >> 4 == SERIALIZERS["json"].format_id
+    assert data[1] & 0xF == 0
+    assert decode(data) == ({"a": 1}, None)
+
+def test_metadata_round_trips_alongside_value():
+    data = encode([1, 2, 3], "json", meta={"fresh_until": 12.5, "tags": {"deck:1": 3}})
+    assert data[1] & FLAG_META
+    assert decode(data) == ([1, 2, 3], {"fresh_until": 12.5, "tags": {"deck:1": 3}})
+
+def test_payloads_are_compressed_from_the_threshold():
+    value = {"text": "pitch " * 200}
+    small = encode({"text": "pitch"}, "json", compress_min_bytes=64)
+    large = encode(value, "json", compress_min_bytes=64)
+    disabled = encode(value, "json", compress_min_bytes=0)
+
+    assert not small[1] & FLAG_ZLIB
+    assert large[1] & FLAG_ZLIB and len(large) < len(disabled)
+    assert not disabled[1] & FLAG_ZLIB
+    assert decode(large)[0] == value
+
+@pytest.mark.parametrize("shape", [(5,), (3, 4), (2, 0)])
+def test_float32_keeps_shape(shape):
+    array = np.arange(np.prod(shape), dtype=np.float32).reshape(shape) / 3
+    value, _ = decode(encode(array, "float32"))
+    assert np.asarray(value, dtype=np.float32).shape == shape
+    np.testing.assert_array_equal(np.asarray(value, dtype=np.float32), array)
+
+def test_legacy_json_values_still_decode():
+    assert decode(json.dumps({"score": 7}).encode()) == ({"score": 7}, None)
+
+def test_missing_package_fails_when_the_serializer_is_chosen(monkeypatch):
+    monkeypatch.setattr(SERIALIZERS["msgpack"], "requires", "no_such_package")
+    with pytest.raises(ImportError):
+        get_serializer("msgpack")
+    with pytest.raises(ImportError):
+        encode({"a": 1}, "msgpack")
+
+def test_msgpack_round_trips_bytes():
+    pytest.importorskip("msgpack")
+    assert decode(encode({"blob": b"\x00\xff"}, "msgpack"))[0] == {"blob": b"\x00\xff"}
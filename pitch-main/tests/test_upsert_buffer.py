@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+import pytest
+
+from pitch.tools.upsert_buffer import UpsertBuffer
+
+class Writer:
+    """Records each batch it is asked to write; raises `error` instead when set"""
+
+    def __init__(self):
+        self.batches = []
+        self.error = None
+
+    async def __call__(self, vectors):
+        if self.error:
+            raise self.error
+        self.batches.append([vector["id"] for vector in vectors])
+
+def vectors(*ids):
+    return [{"id": vector_id, "values": [1.0]} for vector_id in ids]
+
+def test_concurrent_submits_share_one_write():
+    writer = Writer()
+    buffer = UpsertBuffer(writer, max_batch=100, max_delay=0.05)
+
+    async def main():
+        futures = await asyncio.gather(buffer.submit(vectors("a", "b")), buffer.submit(vectors("b", "c")))
+        return await asyncio.gather(*futures)
+
+    assert asyncio.run(main()) == [2, 2]
+    assert writer.batches == [["a", "b", "c"]]
+
+def test_full_batch_is_written_without_waiting():
+    writer = Writer()
+    buffer = UpsertBuffer(writer, max_batch=2, max_delay=60)
+
+    async def main():
+        return await asyncio.wait_for(await buffer.submit(vectors("a", "b")), 5)
+
+    assert asyncio.run(main()) == 2
+
+def test_write_error_reaches_every_submitter():
+    writer = Writer()
+    writer.error = ValueError("backend down")
+    buffer = UpsertBuffer(writer, max_batch=100, max_delay=0.01)
+
+    async def main():
+        futures = [await buffer.submit(vectors("a")), await buffer.submit(vectors("b"))]
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    assert [str(outcome) for outcome in asyncio.run(main())] == ["backend down", "backend down"]
+
+def test_flush_and_close_drain_the_buffer():
+    writer = Writer()
+    buffer = UpsertBuffer(writer, max_batch=100, max_delay=60)
+
+    async def main():
+        first = await buffer.submit(vectors("a"))
+        await buffer.flush()
+        assert first.done() and writer.batches == [["a"]]
+        second = await buffer.submit(vectors("b"))
+        await buffer.close()
+        assert second.result() == 1 and buffer.loop is None
+
+    asyncio.run(main())
+    assert writer.batches == [["a"], ["b"]]
+
+def test_pending_vectors_move_to_the_next_loop():
+    writer = Writer()
+    buffer = UpsertBuffer(writer, max_batch=100, max_delay=60)
+    old_loop = asyncio.new_event_loop()
+    try:
+        queued = old_loop.run_until_complete(buffer.submit(vectors("a")))
+        # The old loop has stopped with "a" still queued; the next loop writes it
+        asyncio.run(buffer.close())
+        assert writer.batches == [["a"]]
+        # ...and settles the old loop's future once that loop runs again
+        assert old_loop.run_until_complete(asyncio.wait_for(queued, 5)) == 1
+    finally:
+        old_loop.close()
+
+def test_second_running_loop_is_refused():
+    buffer = UpsertBuffer(Writer(), max_batch=100, max_delay=0.01)
+    owner = asyncio.new_event_loop()
+    thread = threading.Thread(target=owner.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(buffer.submit(vectors("a")), owner).result(5)
+        with pytest.raises(RuntimeError):
+            asyncio.run(buffer.submit(vectors("b")))
+        asyncio.run_coroutine_threadsafe(buffer.close(), owner).result(5)
+    finally:
+        owner.call_soon_threadsafe(owner.stop)
+        thread.join(5)
+        owner.close()